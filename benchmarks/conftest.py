@@ -0,0 +1,259 @@
+"""Offline benchmarks of the hot paths, with stored baselines.
+
+Run them with ``python -m pytest benchmarks``; they are not part of the test
+suite. Each benchmark records the median and spread of its wall time over a
+few repeats and the peak memory traced by ``tracemalloc`` (Python and NumPy
+allocations; memory allocated inside numba kernels is not traced).
+
+Baselines are machine-specific and not shipped: ``--save-baseline`` records
+one in ``benchmarks/baseline.json``. Later runs are compared with it when it
+was recorded on a similar machine (same CPU model, core count and Python
+major.minor). A benchmark fails when its median time exceeds the baseline's by
+more than ``--tolerance`` plus the noise of both runs (a multiple of their
+spreads), or when it uses more memory than the baseline by more than
+``--tolerance``. A benchmark without a comparable baseline is skipped after it
+runs, with the reason.
+"""
+
+import datetime
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+BASELINE = Path(__file__).parent / "baseline.json"  # local, not committed
+# Absolute slack, so that the tiniest benchmarks do not fail on noise.
+TIME_SLACK = 1e-3
+# Allowed noise on the median time, in spreads (median absolute deviations).
+NOISE_SPREADS = 4
+MEMORY_SLACK = 2**20
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption(
+        "--baseline", default=str(BASELINE), help="Baseline file to compare with."
+    )
+    group.addoption(
+        "--save-baseline",
+        action="store_true",
+        help="Record the results as the new baseline instead of comparing.",
+    )
+    group.addoption(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed relative regression over the baseline (default 0.5).",
+    )
+    group.addoption(
+        "--repeat", type=int, default=7, help="Timed runs per benchmark (default 7)."
+    )
+
+
+def _cpu_model():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def _machine():
+    """Coarse key of the machines whose results are comparable."""
+    return {
+        "cpu": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "python": ".".join(platform.python_version_tuple()[:2]),
+    }
+
+
+def _environment():
+    """Details of the machine a baseline was recorded on, for the record."""
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+def pytest_configure(config):
+    config._bench_results = {}
+    config._bench_baseline = None
+    config._bench_skip = None
+    path = Path(config.getoption("--baseline"))
+    if config.getoption("--save-baseline"):
+        return
+    if not path.exists():
+        config._bench_skip = f"No baseline at {path}; record one with --save-baseline."
+        return
+    baseline = json.loads(path.read_text())
+    if baseline["machine"] == _machine():
+        config._bench_baseline = baseline["benchmarks"]
+    else:
+        config._bench_skip = (
+            f"The baseline at {path} was recorded on {baseline['machine']}, "
+            f"not {_machine()}; record one with --save-baseline."
+        )
+
+
+@pytest.fixture
+def bench(request):
+    """Time ``func(*args, **kwargs)`` and trace its peak memory.
+
+    The first call is a warm-up (numba compilation, caches). Returns the
+    record, and fails if it regresses over the baseline, or skips if there is
+    no baseline to compare with.
+    """
+    config = request.config
+
+    def run(func, *args, **kwargs):
+        func(*args, **kwargs)
+        times = []
+        for _ in range(config.getoption("--repeat")):
+            start = time.perf_counter()
+            func(*args, **kwargs)
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        median = statistics.median(times)
+        record = {
+            "time": median,
+            "spread": statistics.median(abs(t - median) for t in times),
+            "best": min(times),
+            "peak_bytes": peak,
+        }
+        config._bench_results[request.node.nodeid] = record
+
+        if config.getoption("--save-baseline"):
+            return record
+        if config._bench_skip is not None:
+            pytest.skip(config._bench_skip)
+        baseline = config._bench_baseline.get(request.node.nodeid)
+        if baseline is None:
+            pytest.skip(f"No baseline for {request.node.nodeid}.")
+        factor = 1 + config.getoption("--tolerance")
+        noise = NOISE_SPREADS * (baseline["spread"] + record["spread"])
+        if record["time"] > baseline["time"] * factor + noise + TIME_SLACK:
+            pytest.fail(
+                f"median {record['time']:.4f}s, "
+                f"baseline {baseline['time']:.4f}s +- {baseline['spread']:.4f}s",
+                pytrace=False,
+            )
+        if record["peak_bytes"] > baseline["peak_bytes"] * factor + MEMORY_SLACK:
+            pytest.fail(
+                f"peak {record['peak_bytes']} bytes, "
+                f"baseline {baseline['peak_bytes']} bytes",
+                pytrace=False,
+            )
+        return record
+
+    return run
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = getattr(config, "_bench_results", {})
+    if not results:
+        return
+    baseline = config._bench_baseline or {}
+    terminalreporter.section("benchmarks")
+    for nodeid, record in results.items():
+        line = (
+            f"{nodeid.split('::', 1)[-1]:<60} {record['time'] * 1e3:10.2f} ms "
+            f"{record['peak_bytes'] / 2**20:9.1f} MiB"
+        )
+        if nodeid in baseline:
+            line += f"  x{record['time'] / baseline[nodeid]['time']:.2f}"
+        terminalreporter.write_line(line)
+    if config._bench_skip is not None:
+        terminalreporter.write_line(config._bench_skip)
+    if hasattr(config, "cache"):
+        config.cache.set("benchmarks/latest", results)
+    if config.getoption("--save-baseline"):
+        path = Path(config.getoption("--baseline"))
+        path.write_text(
+            json.dumps(
+                {
+                    "machine": _machine(),
+                    "environment": _environment(),
+                    "created": datetime.datetime.now().isoformat(),
+                    "benchmarks": results,
+                },
+                indent=2,
+            )
+        )
+        terminalreporter.write_line(f"Baseline saved to {path}.")
+
+
+@pytest.fixture(scope="session")
+def nwb_file(tmp_path_factory):
+    """Factory of synthetic NWB files, written once per session and size."""
+    from pynwb import NWBHDF5IO, NWBFile
+    from pynwb.epoch import TimeIntervals
+
+    files = {}
+
+    def make(n_units, duration, rate=10.0, n_states=20):
+        if (n_units, duration) in files:
+            return files[n_units, duration]
+        rng = np.random.default_rng(0)
+        nwbfile = NWBFile(
+            session_description="synthetic spike trains",
+            identifier=f"bench-{n_units}-{duration}",
+            session_start_time=datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC),
+        )
+        for column in ("cell_type", "shank_id", "region"):
+            nwbfile.add_unit_column(name=column, description=column)
+        for unit in range(n_units):
+            n_spikes = rng.poisson(rate * duration)
+            nwbfile.add_unit(
+                spike_times=np.sort(rng.uniform(0, duration, n_spikes)),
+                cell_type="pyramidal",
+                shank_id=unit % 4,
+                region="CA1",
+            )
+        states = TimeIntervals(name="states", description="behavioral states")
+        states.add_column(name="label", description="behavioral state")
+        edges = np.linspace(0, duration, n_states + 1)
+        for k in range(n_states):
+            states.add_row(
+                start_time=edges[k],
+                stop_time=edges[k + 1],
+                label=("wake", "nrem", "rem")[k % 3],
+            )
+        nwbfile.create_processing_module(
+            name="behavior", description="behavioral states"
+        ).add(states)
+        path = tmp_path_factory.mktemp("nwb") / f"units{n_units}-t{duration}.nwb"
+        with NWBHDF5IO(path, "w") as io:
+            io.write(nwbfile)
+        files[n_units, duration] = path
+        return path
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def spike_trains():
+    """Factory of Poisson spike trains, as lists of sorted arrays."""
+
+    def make(n_units, duration, rate=10.0, seed=0):
+        rng = np.random.default_rng(seed)
+        return [
+            np.sort(rng.uniform(0, duration, rng.poisson(rate * duration)))
+            for _ in range(n_units)
+        ]
+
+    return make
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+from pynwb import NWBHDF5IO
+
+from functional_connectivity.readwrite.cache import AssetCache
+from functional_connectivity.readwrite.dandi_handler import DandiHandler
+from functional_connectivity.utils.binning import to_ragged
+from functional_connectivity.utils.utils import sum_spike_count
+
+SIZES = [(50, 600.0), (200, 600.0), (200, 3600.0)]
+
+
+@pytest.mark.parametrize("n_units, duration", SIZES)
+def test_sum_spike_count(bench, spike_trains, n_units, duration):
+    df = pd.DataFrame({"spike_times": spike_trains(n_units, duration)})
+    bench(sum_spike_count, df, int(duration))
+
+
+@pytest.mark.parametrize("n_units, duration", SIZES)
+def test_bin_spike_counts(bench, spike_trains, n_units, duration):
+    values, offsets = to_ragged(spike_trains(n_units, duration))
+    starts = pd.RangeIndex(0, int(duration), 1).to_numpy(dtype=float)
+    intervals = pd.DataFrame({"start": starts, "stop": starts + 1}).to_numpy()
+    bench(DandiHandler._get_spike_counts, values, offsets, intervals)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("n_units, duration", SIZES[:2])
+def test_get_spike_counts_nwb(bench, nwb_file, tmp_path, n_units, duration, stream):
+    path = nwb_file(n_units, duration)
+    cache = AssetCache(tmp_path, offline=True)
+    cache.put_json("dandiset/000000", {})
+
+    def get_spike_counts():
+        handler = DandiHandler("000000", cache=cache)
+        with NWBHDF5IO(path, "r") as io:
+            handler.io = io
+            return handler.get_spike_counts(time_to_bin=1.0, stream=stream)
+
+    bench(get_spike_counts)
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from functional_connectivity.readwrite.data_handler import DataHandler
+
+
+def _write_edgelist(path, N, degree=4, seed=0):
+    rng = np.random.default_rng(seed)
+    u = np.repeat(np.arange(N), degree // 2)
+    v = rng.integers(0, N, size=len(u))
+    keep = u != v
+    lines = [f"{a} {b} 0.1\n" for a, b in zip(u[keep], v[keep], strict=True)]
+    path.write_text("".join(lines))
+    return str(path)
+
+
+@pytest.mark.parametrize("N", [1000, 10000])
+def test_from_edgelist(bench, tmp_path, N):
+    path = _write_edgelist(tmp_path / "network.txt", N)
+    bench(lambda: DataHandler().from_edgelist(path, cache=False))
+
+
+@pytest.mark.parametrize("count", [1000, 10000])
+@pytest.mark.parametrize("N", [100, 1000])
+def test_generate_mvn(bench, tmp_path, N, count):
+    handler = DataHandler()
+    for k in range(2):
+        handler.from_edgelist(_write_edgelist(tmp_path / f"network_{k}.txt", N, seed=k))
+    bench(handler.generate_mvn, [count, count])
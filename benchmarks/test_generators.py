@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from functional_connectivity.generators.graphical_model import cal_S, generateRandom
+
+
+@pytest.mark.parametrize("n_samples", [1000, 10000])
+@pytest.mark.parametrize("N", [100, 500])
+def test_cal_S(bench, N, n_samples):
+    samples = np.random.default_rng(0).standard_normal((N, n_samples))
+    bench(cal_S, samples)
+
+
+@pytest.mark.parametrize("N", [1000, 10000, 100000])
+def test_generateRandom(bench, N):
+    np.random.seed(0)
+    bench(generateRandom, N, 0.01, shift="gershgorin")
@@ -19,12 +19,6 @@
 import importlib as _importlib
 import os
 
-from functional_connectivity.generators import *
-from functional_connectivity.readwrite import *
-from functional_connectivity.inference import *
-from functional_connectivity.stats import *
-from functional_connectivity.utils import *
-
 __package__ = "functional_connectivity"
 __title__ = "functional_connectivity: sensing the functional connectivity of the brain"
 __description__ = ""
@@ -36,9 +30,87 @@ __author__ = """\n""".join(
     ]
 )
 __release__ = "0.1.0"
+__version__ = __release__
 __URL__ = "https://github.com/junipertcy/functional-connectivity"
 submodules = ["generators", "readwrite", "inference", "stats", "utils"]
 
+# Public names of the submodules. They are imported on first access, so that
+# ``import functional_connectivity`` does not load numba, pynwb, xarray, etc.
+_lazy_attrs = {
+    "generators": [
+        "GraphicalGenerator",
+        "GraphicalGeneratorTV",
+        "cal_S",
+        "compute_mean",
+        "compute_std",
+        "generateRandom",
+        "generate_samples",
+        "getLambdaMin",
+        "normlize_data",
+        "normlize_sig_inv",
+    ],
+    "readwrite": [
+        "AssetCache",
+        "BatchSpikeCounts",
+        "CacheMissError",
+        "DandiHandler",
+        "DandiResolver",
+        "DataHandler",
+        "ResultsStore",
+        "SampleWriter",
+        "batch_spike_counts",
+        "load_samples",
+    ],
+    "inference": [
+        "BaseGraphicalLasso",
+        "GroupedStatistics",
+        "TimeVaryingGraphicalLasso",
+        "empirical_covariance",
+        "grouped_connectivity",
+        "grouped_statistics",
+        "iter_window_covariances",
+        "iter_window_precisions",
+        "sliding_window_covariance",
+        "soft_threshold",
+        "temporal_prox",
+    ],
+    "stats": [
+        "NullDistribution",
+        "batch_network_features",
+        "clustering",
+        "communities",
+        "correlation",
+        "degree",
+        "edge_frequency",
+        "edge_overlap",
+        "modularity",
+        "partial_correlation",
+        "participation_coefficient",
+        "strength",
+        "surrogate_test",
+        "to_adjacency",
+    ],
+    "utils": [
+        "EpochTimeline",
+        "Profiler",
+        "SparseCholesky",
+        "SpikeCountPyramid",
+        "bin_ragged",
+        "bin_ragged_slabs",
+        "iter_ragged_slabs",
+        "sizeof_fmt",
+        "sum_chunk",
+        "sum_segments",
+        "sum_spike_count",
+        "sum_spike_count_by_behavior",
+        "to_ragged",
+        "warmup_kernels",
+    ],
+}
+_attr_to_submodule = {
+    attr: submodule for submodule, attrs in _lazy_attrs.items() for attr in attrs
+}
+
 dunder = [
     "__version__",
     "__package__",
@@ -59,12 +131,18 @@ __all__ = (
 
 
 def __dir__():
-    return __all__
+    return __all__ + list(_attr_to_submodule)
 
 
 def __getattr__(name):
     if name in submodules:
         return _importlib.import_module(f"functional_connectivity.{name}")
+    elif name in _attr_to_submodule:
+        submodule = _importlib.import_module(
+            f"functional_connectivity.{_attr_to_submodule[name]}"
+        )
+        value = globals()[name] = getattr(submodule, name)
+        return value
     else:
         try:
             return globals()[name]
@@ -75,5 +153,34 @@ def __getattr__(name):
 
 
 def show_config():
-    """Show ``functional_connectivity`` build configuration."""
+    """Show ``functional_connectivity`` build configuration.
+
+    Besides the platform, reports what decides the throughput of the numerical
+    kernels: the numba threading layer and thread count, and the BLAS backend
+    of NumPy.
+    """
+    import platform
+
+    import numpy as np
+
     print("uname:", " ".join(os.uname()))
+    print("python:", platform.python_version())
+    print("numpy:", np.__version__)
+    try:
+        blas = np.show_config(mode="dicts")["Build Dependencies"]["blas"]
+        print("blas:", blas.get("name"), blas.get("version"))
+    except (TypeError, KeyError):
+        print("blas: unknown")
+    try:
+        import numba
+    except ImportError:
+        print("numba: not installed")
+        return
+    print("numba:", numba.__version__)
+    try:
+        layer = numba.threading_layer()
+    except ValueError:
+        # No parallel kernel has run yet; this is the configured choice.
+        layer = f"{numba.config.THREADING_LAYER} (not yet initialized)"
+    print("numba threading layer:", layer)
+    print("numba threads:", numba.get_num_threads())
@@ -1,66 +1,115 @@
 import numpy as np
 import scipy.sparse as spr
+from scipy.sparse.linalg import ArpackNoConvergence, eigsh
+
+from ..utils.linalg import SparseCholesky
 
 
 def compute_std(samples):
-    return np.std(samples, axis=1)
-
-
-def generateRandom(n, density, id_addition=1e-16):
-    A_rand = spr.random(n, n, np.sqrt(density * n / 100) / n).toarray()
-    A = np.zeros((n, n), dtype="float64")
-    A[A_rand != 0] += -1
-    A[A_rand > 0.5] += 2
-    A = A.T @ A
-    d = np.diag(A).copy()
-    A -= np.diag(d)
-    A[A > 1] = 1
-    A[A < -1] = -1
-    A += np.diag(d)
-    lmin = getLambdaMin(A)
+    return np.std(samples, axis=-1)
+
+
+def _random_sparse(n, p):
+    if n * n <= 10**7:
+        return spr.random(n, n, p, format="csr")
+    # spr.random draws the nonzero positions without replacement, which needs
+    # O(n^2) memory; for large n, draw them with replacement and deduplicate.
+    ind = np.unique(np.random.randint(0, n * n, size=int(round(p * n * n))))
+    data = np.random.uniform(size=len(ind))
+    return spr.csr_matrix((data, (ind // n, ind % n)), shape=(n, n))
+
+
+def generateRandom(n, density, id_addition=1e-16, shift="auto"):
+    """Generate a random sparse precision matrix.
+
+    Args:
+        n (int): Dimension of the matrix.
+        density (double): Controls the density of the random sparse factor.
+        id_addition (double): Minimum multiple of the identity added to the matrix.
+        shift (str): How the smallest eigenvalue is found, see :func:`getLambdaMin`.
+
+    Returns:
+        A (spr.csr_matrix): Positive definite matrix of shape ``(n, n)``.
+    """
+    B = _random_sparse(n, np.sqrt(density * n / 100) / n)
+    B.data = np.where(B.data > 0.5, 1.0, -1.0)
+    A = (B.T @ B).tocsr()
+    d = spr.diags(A.diagonal())
+    A = A - d
+    np.clip(A.data, -1, 1, out=A.data)
+    A = (A + d).tocsr()
+    A.eliminate_zeros()
+    lmin = getLambdaMin(A, method=shift)
     delta = np.max((-1.2 * lmin, id_addition))
-    A = A + delta * spr.eye(n)
-    return spr.coo_matrix(A)
+    return (A + delta * spr.eye(n, format="csr")).tocsr()
 
 
 def normlize_data(samples, mean, std):
-    mean_mat = np.repeat(mean.reshape(-1, 1), axis=1, repeats=samples.shape[1])
-    samples = samples - mean_mat
-    std_mat = np.diag(1 / std)
-    samples = std_mat @ samples
-    return samples
+    return (samples - mean[..., None]) / std[..., None]
 
 
 def cal_S(samples):
-    n = samples.shape[0]
-    _samples = samples.shape[1]
-    S = np.zeros((n, n), dtype="float64")
-    for i in range(_samples):
-        y_i = samples[:, i].reshape(-1, 1)
-        S += y_i @ y_i.T
-    S /= _samples
-    return S
-
-
-def getLambdaMin(A):
-    return np.linalg.eigvalsh(A)[0]
+    """Empirical second moment of ``samples``, of shape ``(..., n, n_samples)``."""
+    return samples @ samples.swapaxes(-1, -2) / samples.shape[-1]
+
+
+def getLambdaMin(A, method="auto"):
+    """Smallest eigenvalue of the symmetric matrix ``A``, or a lower bound of it.
+
+    Args:
+        A (np.ndarray or sparse matrix): Symmetric matrix.
+        method (str): ``"exact"`` for a dense eigendecomposition, ``"eigsh"``
+            for a sparse Lanczos solver, ``"gershgorin"`` for the (cheap, lower)
+            Gershgorin bound. ``"auto"`` is exact for dense or small matrices and
+            ``"eigsh"`` otherwise.
+    """
+    if method == "auto":
+        method = "exact" if not spr.issparse(A) or A.shape[0] <= 1000 else "eigsh"
+    if method == "exact":
+        return np.linalg.eigvalsh(A.toarray() if spr.issparse(A) else A)[0]
+    if method == "gershgorin":
+        d = A.diagonal()
+        radii = np.asarray(abs(A).sum(axis=1)).ravel() - np.abs(d)
+        return np.min(d - radii)
+    if method == "eigsh":
+        try:
+            # The extreme eigenvalue of A - lmax I with largest magnitude is
+            # lmin - lmax, which Lanczos finds much faster than lmin itself.
+            lmax = eigsh(A, k=1, which="LA", return_eigenvectors=False)[0]
+            shifted = A - lmax * spr.eye(A.shape[0], format="csr")
+            return lmax + eigsh(shifted, k=1, which="LM", return_eigenvectors=False)[0]
+        except ArpackNoConvergence:
+            return getLambdaMin(A, method="gershgorin")
+    raise ValueError(f"Unknown method {method!r}.")
 
 
 def normlize_sig_inv(sig_inv, std):
-    std_mat = np.diag(std)
-    return std_mat @ sig_inv @ std_mat
+    return std[..., :, None] * sig_inv * std[..., None, :]
 
 
 def generate_samples(Sigma_inv, samples=1):
-    n = Sigma_inv.shape[0]
-    L_inv = np.linalg.inv(np.linalg.cholesky(Sigma_inv))
-    xs = np.random.normal(0, 1, [samples, n])
-    samples = L_inv.T @ xs.T
-    return samples
+    """Draw ``samples`` zero-mean Gaussian samples per precision matrix.
+
+    Args:
+        Sigma_inv (np.ndarray or sparse matrix): Precision matrix of shape
+            ``(n, n)``, or a dense stack of them of shape ``(batch, n, n)``. A
+            sparse matrix is sampled through its sparse Cholesky factor.
+        samples (int): Number of samples per precision matrix.
+
+    Returns:
+        samples (np.ndarray): Array of shape ``(..., n, samples)``.
+    """
+    if spr.issparse(Sigma_inv):
+        return SparseCholesky(Sigma_inv).sample(samples)
+    n = Sigma_inv.shape[-1]
+    L = np.linalg.cholesky(Sigma_inv)
+    xs = np.random.normal(0, 1, [*Sigma_inv.shape[:-2], samples, n])
+    # L^-T z, solving with L^T rather than forming its inverse.
+    return np.linalg.solve(L.swapaxes(-1, -2), xs.swapaxes(-1, -2))
 
 
 def compute_mean(samples):
-    return np.mean(samples, axis=1)
+    return np.mean(samples, axis=-1)
 
 
 class GraphicalGenerator:
@@ -104,8 +153,7 @@ class GraphicalGenerator:
         self.ss_list = []
         self.samples_list = []
         if self.constant:
-            for _ in range(self.batch):
-                self.generate()
+            self.generate(self.batch)
 
     def __call__(self):
         if self.constant:
@@ -114,32 +162,46 @@ class GraphicalGenerator:
         self.precision_mat_list = []
         self.ss_list = []
         self.samples_list = []
-        for _ in range(self.batch):
-            self.generate()
+        self.generate(self.batch)
 
         return self.precision_mat_list, self.ss_list, self.samples_list
 
-    def generate(self):
+    def generate(self, batch=1):
+        """Generate ``batch`` fixtures at once and append them to the lists.
+
+        Returns:
+            precision_mats (np.ndarray): Array of shape ``(batch, N, N)``.
+            ss (np.ndarray): Sample covariances, of shape ``(batch, N, N)``.
+            samples (np.ndarray): Array of shape ``(batch, N, n_samples)``.
+        """
         if self.sig_exist:
-            self.precision_mat_list += [self.precision_mat.astype("float32")]
+            precision_mat = self.precision_mat
+            if spr.issparse(precision_mat):
+                precision_mat = precision_mat.toarray()
+            precision_mats = np.broadcast_to(
+                np.asarray(precision_mat, dtype="float32"), (batch, self.N, self.N)
+            )
         elif self.type == "random":
-            self.precision_mat_list += [
-                generateRandom(self.N, self.type_param, self.id_addition)
-                .toarray()
-                .astype("float32")
-            ]
-        samples = np.random.randint(low=self.n_samples, high=self.n_samples + 1)
-        samples = generate_samples(self.precision_mat_list[-1], samples)
+            precision_mats = np.empty((batch, self.N, self.N), dtype="float32")
+            for k in range(batch):
+                precision_mats[k] = generateRandom(
+                    self.N, self.type_param, self.id_addition
+                ).toarray()
+        samples = generate_samples(precision_mats, self.n_samples)
 
         if self.normalize:
             mean = compute_mean(samples)
             std = compute_std(samples)
             samples = normlize_data(samples, mean, std)
-            self.precision_mat_list[-1] = normlize_sig_inv(
-                self.precision_mat_list[-1], std
-            ).astype("float32")
-        self.ss_list += [cal_S(samples).astype("float32")]
-        self.samples_list += [samples.astype("float32")]
+            precision_mats = normlize_sig_inv(precision_mats, std)
+        precision_mats = precision_mats.astype("float32")
+        ss = cal_S(samples).astype("float32")
+        samples = samples.astype("float32")
+
+        self.precision_mat_list += list(precision_mats)
+        self.ss_list += list(ss)
+        self.samples_list += list(samples)
+        return precision_mats, ss, samples
 
 
 class GraphicalGeneratorTV(GraphicalGenerator):
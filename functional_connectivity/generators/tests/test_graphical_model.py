@@ -0,0 +1,97 @@
+import numpy as np
+import scipy.sparse as spr
+
+from functional_connectivity.generators.graphical_model import (
+    GraphicalGenerator,
+    cal_S,
+    generate_samples,
+    generateRandom,
+    getLambdaMin,
+    normlize_data,
+    normlize_sig_inv,
+)
+
+
+def test_helpers_match_dense_formulas():
+    rng = np.random.default_rng(0)
+    samples = rng.normal(size=(3, 5, 40))
+    for x in samples:
+        expected = sum(np.outer(x[:, i], x[:, i]) for i in range(x.shape[1])) / 40
+        np.testing.assert_allclose(cal_S(x), expected)
+    np.testing.assert_allclose(cal_S(samples), np.stack([cal_S(x) for x in samples]))
+
+    mean, std = samples.mean(axis=-1), samples.std(axis=-1)
+    normalized = normlize_data(samples, mean, std)
+    np.testing.assert_allclose(
+        normalized[1], np.diag(1 / std[1]) @ (samples[1] - mean[1][:, None])
+    )
+
+    sig_inv = rng.normal(size=(3, 5, 5))
+    np.testing.assert_allclose(
+        normlize_sig_inv(sig_inv, std)[2],
+        np.diag(std[2]) @ sig_inv[2] @ np.diag(std[2]),
+    )
+
+
+def test_generate_samples_covariance():
+    np.random.seed(0)
+    precision = np.array([[2.0, -0.5], [-0.5, 1.0]])
+    samples = generate_samples(np.stack([precision, 2 * precision]), 200_000)
+    assert samples.shape == (2, 2, 200_000)
+    np.testing.assert_allclose(cal_S(samples[0]), np.linalg.inv(precision), atol=0.02)
+    np.testing.assert_allclose(
+        cal_S(samples[1]), np.linalg.inv(2 * precision), atol=0.02
+    )
+
+
+def test_generator_batch():
+    np.random.seed(1)
+    generator = GraphicalGenerator(8, n_samples=30, batch=4)
+    precision_mats, ss = generator()
+    assert len(precision_mats) == len(ss) == len(generator.samples_list) == 4
+    for theta, s, x in zip(precision_mats, ss, generator.samples_list, strict=True):
+        assert theta.shape == s.shape == (8, 8) and x.shape == (8, 30)
+        np.testing.assert_allclose(np.diag(s), 1, rtol=1e-5)
+        np.testing.assert_allclose(s, cal_S(x.astype(np.float64)), rtol=1e-4, atol=1e-6)
+        assert np.all(np.linalg.eigvalsh(theta) > 0)
+
+
+def _dense_generate_random(n, density, id_addition):
+    # The original dense implementation of generateRandom.
+    A_rand = spr.random(n, n, np.sqrt(density * n / 100) / n).toarray()
+    A = np.zeros((n, n), dtype="float64")
+    A[A_rand != 0] += -1
+    A[A_rand > 0.5] += 2
+    A = A.T @ A
+    d = np.diag(A).copy()
+    A -= np.diag(d)
+    A[A > 1] = 1
+    A[A < -1] = -1
+    A += np.diag(d)
+    delta = np.max((-1.2 * np.linalg.eigvalsh(A)[0], id_addition))
+    return A + delta * np.eye(n)
+
+
+def test_generate_random_matches_dense():
+    np.random.seed(2)
+    expected = _dense_generate_random(150, 0.2, 1)
+    np.random.seed(2)
+    A = generateRandom(150, 0.2, 1)
+    assert spr.isspmatrix_csr(A)
+    np.testing.assert_allclose(A.toarray(), expected)
+
+
+def test_lambda_min_methods():
+    np.random.seed(3)
+    A = generateRandom(300, 0.5, 1) - 5 * spr.eye(300)
+    exact = getLambdaMin(A, "exact")
+    np.testing.assert_allclose(getLambdaMin(A, "eigsh"), exact, atol=1e-6)
+    assert getLambdaMin(A, "gershgorin") <= exact
+
+
+def test_generate_samples_sparse():
+    np.random.seed(4)
+    A = generateRandom(20, 0.5, 1)
+    samples = generate_samples(A, 200_000)
+    assert samples.shape == (20, 200_000)
+    np.testing.assert_allclose(cal_S(samples), np.linalg.inv(A.toarray()), atol=0.02)
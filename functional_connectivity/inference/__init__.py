@@ -1 +1,34 @@
-from .base_graphical_lasso import *
+import importlib as _importlib
+
+_lazy_attrs = {
+    "base_graphical_lasso": [
+        "BaseGraphicalLasso",
+        "empirical_covariance",
+        "soft_threshold",
+    ],
+    "grouped": ["GroupedStatistics", "grouped_connectivity", "grouped_statistics"],
+    "sliding_window": [
+        "iter_window_covariances",
+        "iter_window_precisions",
+        "sliding_window_covariance",
+    ],
+    "time_varying_graphical_lasso": ["TimeVaryingGraphicalLasso", "temporal_prox"],
+}
+_attr_to_module = {
+    attr: module for module, attrs in _lazy_attrs.items() for attr in attrs
+}
+__all__ = list(_attr_to_module)
+
+
+def __dir__():
+    return __all__ + list(_lazy_attrs)
+
+
+def __getattr__(name):
+    if name in _lazy_attrs:
+        return _importlib.import_module(f".{name}", __name__)
+    elif name in _attr_to_module:
+        module = _importlib.import_module(f".{_attr_to_module[name]}", __name__)
+        value = globals()[name] = getattr(module, name)
+        return value
+    raise AttributeError(f"Module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,260 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as spr
+from scipy.sparse.csgraph import connected_components
+
+
+def empirical_covariance(X, assume_centered=False):
+    """Sample covariance of ``X``, of shape ``(n_features, n_samples)``.
+
+    A sparse ``X`` is not densified: the covariance is its sparse Gram matrix
+    minus the outer product of the means.
+    """
+    if spr.issparse(X):
+        X = spr.csr_matrix(X, dtype=np.float64)
+        S = (X @ X.T).toarray() / X.shape[1]
+        if not assume_centered:
+            mean = np.asarray(X.mean(axis=1)).ravel()
+            S -= np.outer(mean, mean)
+        return S
+    X = np.asarray(X, dtype=np.float64)
+    if not assume_centered:
+        X = X - X.mean(axis=1, keepdims=True)
+    return X @ X.T / X.shape[1]
+
+
+def soft_threshold(A, threshold):
+    """Elementwise ``sign(A) * max(|A| - threshold, 0)``."""
+    return np.sign(A) * np.maximum(np.abs(A) - threshold, 0)
+
+
+def _admm(S, lambd, rho, max_iter, tol, penalize_diagonal, Z=None, Y=None):
+    """ADMM for ``min -logdet(T) + tr(S T) + lambd ||T||_1`` (Boyd et al. 6.5).
+
+    Returns the sparse iterate ``Z``, the dual variable ``Y`` and the number of
+    iterations. ``rho`` is adapted by residual balancing.
+    """
+    n = S.shape[0]
+    Z = np.eye(n) if Z is None else Z.copy()
+    U = np.zeros((n, n)) if Y is None else Y / rho
+    threshold = np.full((n, n), lambd)
+    if not penalize_diagonal:
+        np.fill_diagonal(threshold, 0)
+    for iteration in range(1, max_iter + 1):
+        # Theta update: the closed form through the eigendecomposition.
+        d, Q = np.linalg.eigh(rho * (Z - U) - S)
+        theta = (d + np.sqrt(d**2 + 4 * rho)) / (2 * rho)
+        T = (Q * theta) @ Q.T
+        Z_old = Z
+        Z = soft_threshold(T + U, threshold / rho)
+        U += T - Z
+
+        r = np.linalg.norm(T - Z)
+        s = rho * np.linalg.norm(Z - Z_old)
+        eps_primal = n * tol + tol * max(np.linalg.norm(T), np.linalg.norm(Z))
+        eps_dual = n * tol + tol * rho * np.linalg.norm(U)
+        if r <= eps_primal and s <= eps_dual:
+            return Z, rho * U, iteration
+        if r > 10 * s:
+            rho *= 2
+            U /= 2
+        elif s > 10 * r:
+            rho /= 2
+            U *= 2
+    return Z, rho * U, max_iter
+
+
+class BaseGraphicalLasso:
+    """Sparse precision matrix estimation by the graphical lasso.
+
+    Solves ``min -logdet(T) + tr(S T) + lambd ||T||_1`` by ADMM, where ``S``
+    is the empirical covariance and the penalty excludes the diagonal unless
+    ``penalize_diagonal``. With ``screening``, the variables are first split
+    into the connected components of ``|S_ij| > lambd``: the solution is block
+    diagonal along them (Witten et al., 2011; Mazumder and Hastie, 2012), so
+    each block is solved independently, on ``processes`` threads. Isolated
+    variables are solved in closed form. A constant variable, such as a
+    silent unit, has no finite precision: its variance is floored at
+    ``min_variance`` and it is flagged in ``constant_``.
+
+    Args:
+        lambd (double): Strength of the l1 penalty.
+        rho (double): Initial ADMM step size.
+        max_iter (int): Maximum number of ADMM iterations per block.
+        tol (double): Absolute and relative tolerance of the ADMM residuals.
+        processes (int): Number of threads solving blocks. Defaults to the
+            number of CPUs.
+        screening (boolean): Whether to split the problem into blocks.
+        penalize_diagonal (boolean): Whether the diagonal is penalized.
+        assume_centered (boolean): Whether the data is already centered.
+        min_variance (double): Floor of the variances.
+    """
+
+    def __init__(
+        self,
+        lambd=0.1,
+        rho=1.0,
+        max_iter=1000,
+        tol=1e-5,
+        processes=None,
+        screening=True,
+        penalize_diagonal=False,
+        assume_centered=False,
+        min_variance=1e-8,
+    ):
+        self.lambd = lambd
+        self.rho = rho
+        self.max_iter = max_iter
+        self.tol = tol
+        self.processes = processes
+        self.screening = screening
+        self.penalize_diagonal = penalize_diagonal
+        self.assume_centered = assume_centered
+        self.min_variance = min_variance
+        self._warm_start = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(lambd={self.lambd}, rho={self.rho})"
+
+    @staticmethod
+    def _as_samples(X, sample_dim="time", keep_sparse=False):
+        if hasattr(X, "coords"):
+            # A spike-count DataArray, of dims (neuron, time) in any order.
+            X = X.transpose(..., sample_dim).data
+        if hasattr(X, "to_scipy_sparse"):
+            # Counts from ``get_spike_counts(sparse=True)``.
+            X = X.to_scipy_sparse()
+        if spr.issparse(X):
+            return spr.csr_matrix(X) if keep_sparse else X.toarray().astype(float)
+        return np.asarray(X, dtype=np.float64)
+
+    def components(self, S, lambd=None):
+        """Label each variable by its block of the screening rule.
+
+        Returns:
+            n_components (int): Number of blocks.
+            labels (np.ndarray): Block of each variable.
+        """
+        lambd = self.lambd if lambd is None else lambd
+        if not self.screening:
+            return 1, np.zeros(S.shape[0], dtype=np.int64)
+        return connected_components(np.abs(S) > lambd, directed=False)
+
+    def fit(self, X, sample_dim="time"):
+        """Estimate the precision matrix of ``X``.
+
+        Args:
+            X (np.ndarray or sparse matrix or xr.DataArray): Data of shape
+                ``(n_features, n_samples)``, such as spike counts of dims
+                ``(neuron, time)``, dense or sparse.
+            sample_dim (str): Dimension holding the samples, for a DataArray.
+
+        Returns:
+            self (BaseGraphicalLasso): With ``covariance_``, ``precision_``,
+                ``constant_``, ``n_components_``, ``iteration`` and
+                ``run_time`` set.
+        """
+        return self.fit_covariance(*self._statistics(X, sample_dim))
+
+    def _statistics(self, X, sample_dim):
+        """Arguments of :meth:`fit_covariance` for the data ``X``."""
+        X = self._as_samples(X, sample_dim, keep_sparse=True)
+        return (empirical_covariance(X, assume_centered=self.assume_centered),)
+
+    def fit_covariance(self, S):
+        """Estimate the precision matrix from the covariance matrix ``S``.
+
+        A previous fit on a matrix of the same shape is used as a warm start.
+        """
+        start = time.perf_counter()
+        S = covariance = np.asarray(S, dtype=np.float64)
+        n = S.shape[0]
+        variances = np.diag(S)
+        self.constant_ = variances <= self.min_variance
+        if self.constant_.any():
+            S = S.copy()
+            S[np.diag_indices(n)] = np.maximum(variances, self.min_variance)
+        n_components, labels = self.components(S)
+        blocks = [np.flatnonzero(labels == k) for k in range(n_components)]
+        if self.constant_.any():
+            # Uncorrelated with the rest, constant variables are split out of
+            # their blocks and solved in closed form.
+            blocks = [block[~self.constant_[block]] for block in blocks]
+            blocks = [block for block in blocks if len(block)]
+            blocks += [np.array([i]) for i in np.flatnonzero(self.constant_)]
+            n_components = len(blocks)
+
+        warm = self._warm_start
+        if warm is None or warm[0].shape != S.shape:
+            warm = (np.eye(n), np.zeros((n, n)))
+        Z, Y = np.zeros((n, n)), np.zeros((n, n))
+        penalty = self.lambd if self.penalize_diagonal else 0
+
+        def solve(block):
+            if len(block) == 1:
+                i = block[0]
+                return block, np.array([[1 / (S[i, i] + penalty)]]), None, 0
+            ix = np.ix_(block, block)
+            Z_b, Y_b, iteration = _admm(
+                S[ix],
+                self.lambd,
+                self.rho,
+                self.max_iter,
+                self.tol,
+                self.penalize_diagonal,
+                warm[0][ix],
+                warm[1][ix],
+            )
+            return block, Z_b, Y_b, iteration
+
+        # The eigendecompositions release the GIL, so threads run blocks in
+        # parallel; solve the largest ones first.
+        blocks.sort(key=len, reverse=True)
+        with ThreadPoolExecutor(self.processes) as executor:
+            results = list(executor.map(solve, blocks))
+
+        self.iteration = 0
+        for block, Z_b, Y_b, iteration in results:
+            ix = np.ix_(block, block)
+            Z[ix] = Z_b
+            if Y_b is not None:
+                Y[ix] = Y_b
+            self.iteration = max(self.iteration, iteration)
+
+        self._warm_start = (Z, Y)
+        self.covariance_ = covariance
+        self.precision_ = Z
+        self.n_components_ = n_components
+        self.run_time = time.perf_counter() - start
+        return self
+
+    def path(self, X, lambdas, sample_dim="time"):
+        """Fit the whole regularization path, warm-starting each fit.
+
+        The covariance is computed once. The penalties are solved from the
+        largest to the smallest, where the solution is sparsest and the
+        screening splits it most.
+
+        Args:
+            X (np.ndarray or xr.DataArray): See :meth:`fit`.
+            lambdas (list): Penalties.
+
+        Returns:
+            precisions (np.ndarray): Array of shape ``(len(lambdas), n, n)``,
+                or ``(len(lambdas), *precision_.shape)``, in the order of
+                ``lambdas``.
+        """
+        lambdas = np.asarray(lambdas, dtype=np.float64)
+        precisions = [None] * len(lambdas)
+        statistics = self._statistics(X, sample_dim)
+        lambd = self.lambd
+        self._warm_start = None
+        try:
+            for k in np.argsort(-lambdas):
+                self.lambd = lambdas[k]
+                precisions[k] = self.fit_covariance(*statistics).precision_
+        finally:
+            self.lambd = lambd
+        return np.stack(precisions)
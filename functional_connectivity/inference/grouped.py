@@ -0,0 +1,189 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as spr
+import xarray as xr
+
+from .base_graphical_lasso import BaseGraphicalLasso
+
+
+class GroupedStatistics:
+    """Sufficient statistics of the samples of each label.
+
+    For every label ``g``, the number of samples ``count[g]``, their sum
+    ``sums[g]`` and their cross-product ``cross[g] = sum x x^T``. Statistics of
+    disjoint sets of samples add up, so they can be accumulated chunk by chunk
+    and merged with ``+``.
+
+    Args:
+        labels (np.ndarray): The labels, of shape ``(k,)``.
+        n_features (int): Number of features.
+        features (np.ndarray): Label of each feature. Defaults to
+            ``0, ..., n_features - 1``.
+        feature_dim (str): Name of the feature dimension.
+    """
+
+    def __init__(self, labels, n_features, features=None, feature_dim="neuron"):
+        self.labels = np.asarray(labels)
+        k = len(self.labels)
+        self.count = np.zeros(k, dtype=np.int64)
+        self.sums = np.zeros((k, n_features))
+        self.cross = np.zeros((k, n_features, n_features))
+        self.features = np.arange(n_features) if features is None else features
+        self.feature_dim = feature_dim
+
+    def __repr__(self):
+        return f"GroupedStatistics({len(self.labels)} labels, {self.sums.shape[1]} features)"
+
+    def __iadd__(self, other):
+        if not np.array_equal(self.labels, other.labels):
+            raise ValueError("Statistics of different labels cannot be merged.")
+        self.count += other.count
+        self.sums += other.sums
+        self.cross += other.cross
+        return self
+
+    def __add__(self, other):
+        return copy.deepcopy(self).__iadd__(other)
+
+    def update(self, X, codes):
+        """Add the samples of ``X``, of shape ``(n_features, m)``, whose labels
+        are ``self.labels[codes]``."""
+        X = np.asarray(X, dtype=np.float64)
+        order = np.argsort(codes, kind="stable")
+        codes = codes[order]
+        X = X[:, order]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(codes)], strict=True):
+            if lo == hi:
+                continue
+            block = X[:, lo:hi]
+            g = codes[lo]
+            self.count[g] += hi - lo
+            self.sums[g] += block.sum(axis=1)
+            self.cross[g] += block @ block.T
+        return self
+
+    def means(self):
+        """Mean of each label, of shape ``(k, n_features)``."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sums / self.count[:, None]
+
+    def covariances(self):
+        """Covariance of each label (normalized by its count), of shape
+        ``(k, n_features, n_features)``."""
+        mean = self.means()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            second = self.cross / self.count[:, None, None]
+        return second - mean[:, :, None] * mean[:, None, :]
+
+    def to_dataset(self):
+        """The counts, means and covariances as a ``xr.Dataset``."""
+        pair = (self.feature_dim, f"{self.feature_dim}_j")
+        return xr.Dataset(
+            {
+                "count": ("label", self.count),
+                "mean": (("label", self.feature_dim), self.means()),
+                "covariance": (("label", *pair), self.covariances()),
+            },
+            coords={
+                "label": self.labels,
+                self.feature_dim: self.features,
+                f"{self.feature_dim}_j": self.features,
+            },
+        )
+
+
+def grouped_statistics(
+    X, labels=None, label_coord="label", sample_dim="time", chunk_size=2**16
+):
+    """Accumulate the statistics of every label in one pass over ``X``.
+
+    ``X`` is read ``chunk_size`` samples at a time, so it can be an
+    out-of-core array: a memory map, an ``h5py`` or Zarr dataset, or a
+    DataArray backed by any of them. A sparse ``X`` is densified one chunk at a
+    time.
+
+    Args:
+        X (array-like or xr.DataArray): Data of shape ``(n_features,
+            n_samples)``, such as spike counts of dims ``(neuron, time)``.
+        labels (array-like): Label of each sample. Defaults to the
+            ``label_coord`` coordinate of a DataArray, which
+            :meth:`DandiHandler.get_spike_counts` sets to the behavior state.
+        label_coord (str): Coordinate holding the labels.
+        sample_dim (str): Dimension holding the samples, for a DataArray.
+        chunk_size (int): Number of samples read at once.
+
+    Returns:
+        stats (GroupedStatistics): Statistics of each label, in sorted order.
+    """
+    features, feature_dim = None, "neuron"
+    if isinstance(X, xr.DataArray):
+        X = X.transpose(..., sample_dim)
+        feature_dim = X.dims[0]
+        features = X[feature_dim].values
+        if labels is None:
+            labels = X[label_coord].values
+        X = X.variable
+    if labels is None:
+        raise ValueError("Labels are required for data without coordinates.")
+    codes, uniques = pd.factorize(np.asarray(labels), sort=True)
+    if (codes < 0).any():
+        raise ValueError("Missing labels.")
+    n, m = X.shape
+    stats = GroupedStatistics(uniques, n, features, feature_dim)
+    for start in range(0, m, chunk_size):
+        chunk = X[:, start : start + chunk_size]
+        if isinstance(chunk, xr.Variable):
+            chunk = chunk.data
+        if spr.issparse(chunk):
+            chunk = chunk.toarray()
+        elif hasattr(chunk, "todense"):
+            # A pydata-sparse array, from ``get_spike_counts(sparse=True)``.
+            chunk = chunk.todense()
+        stats.update(chunk, codes[start : start + chunk_size])
+    return stats
+
+
+def grouped_connectivity(
+    X,
+    labels=None,
+    estimator=None,
+    processes=None,
+    label_coord="label",
+    sample_dim="time",
+    chunk_size=2**16,
+):
+    """Covariance and precision matrix of the samples of every label.
+
+    The statistics of all labels are gathered in one pass over ``X`` (see
+    :func:`grouped_statistics`), then each label is solved on a thread pool by
+    its own copy of ``estimator``.
+
+    Args:
+        X, labels, label_coord, sample_dim, chunk_size: See
+            :func:`grouped_statistics`.
+        estimator (BaseGraphicalLasso): Solver of each label. Defaults to
+            ``BaseGraphicalLasso()``.
+        processes (int): Number of labels solved at once. Defaults to the
+            number of CPUs.
+
+    Returns:
+        dataset (xr.Dataset): With ``count``, ``mean``, ``covariance`` and
+            ``precision`` along the ``label`` dimension.
+    """
+    stats = grouped_statistics(X, labels, label_coord, sample_dim, chunk_size)
+    dataset = stats.to_dataset()
+    estimator = BaseGraphicalLasso() if estimator is None else estimator
+
+    def solve(covariance):
+        solver = copy.copy(estimator)
+        solver._warm_start = None
+        return solver.fit_covariance(covariance).precision_
+
+    with ThreadPoolExecutor(processes) as executor:
+        precisions = list(executor.map(solve, stats.covariances()))
+    dataset["precision"] = dataset.covariance.copy(data=np.stack(precisions))
+    return dataset
@@ -0,0 +1,135 @@
+import numpy as np
+import xarray as xr
+
+from .base_graphical_lasso import BaseGraphicalLasso
+
+
+def iter_window_covariances(X, window, step=1, sample_dim="time", refresh=1000):
+    """Mean and covariance of a window sliding over the samples of ``X``.
+
+    The window sums are updated with a rank-``2 step`` product per slide
+    (adding the entering samples and removing the leaving ones), which costs
+    ``O(step n^2)`` instead of ``O(window n^2)``. Integer-valued data such as
+    spike counts is accumulated exactly. Other data is shifted by the mean of
+    the first window and recomputed from scratch every ``refresh`` slides, to
+    bound the rounding drift.
+
+    Args:
+        X (np.ndarray or xr.DataArray): Data of shape ``(n_features,
+            n_samples)``, such as spike counts of dims ``(neuron, time)``.
+        window (int): Number of samples per window.
+        step (int): Number of samples the window slides by.
+        sample_dim (str): Dimension holding the samples, for a DataArray.
+        refresh (int): Number of slides between recomputations, for data that
+            is not integer-valued.
+
+    Yields:
+        start (int): Index of the first sample of the window.
+        mean (np.ndarray): Mean of the window, of shape ``(n_features,)``.
+        covariance (np.ndarray): Covariance of the window (normalized by
+            ``window``), of shape ``(n_features, n_features)``.
+    """
+    X = BaseGraphicalLasso._as_samples(X, sample_dim)
+    n, m = X.shape
+    if not 0 < window <= m:
+        raise ValueError(f"Window of {window} samples, for {m} samples.")
+    if step < 1:
+        raise ValueError("The window must slide by at least one sample.")
+    if np.array_equal(X, np.round(X)):
+        shift, refresh = np.zeros((n, 1)), None
+    else:
+        shift = X[:, :window].mean(axis=1, keepdims=True)
+
+    for k, start in enumerate(range(0, m - window + 1, step)):
+        if k == 0 or step >= window or (refresh and k % refresh == 0):
+            block = X[:, start : start + window] - shift
+            total = block.sum(axis=1)
+            outer = block @ block.T
+        else:
+            new = X[:, start + window - step : start + window] - shift
+            old = X[:, start - step : start] - shift
+            total += new.sum(axis=1) - old.sum(axis=1)
+            # new new^T - old old^T, as one blocked product.
+            outer += np.hstack([new, old]) @ np.hstack([new, -old]).T
+        mean = total / window
+        yield start, mean + shift[:, 0], outer / window - np.outer(mean, mean)
+
+
+def iter_window_precisions(X, window, step=1, estimator=None, sample_dim="time"):
+    """Precision matrix of a window sliding over the samples of ``X``.
+
+    Each window is solved from its incrementally updated covariance, starting
+    from the solution of the previous window, which is usually close.
+
+    Args:
+        X, window, step, sample_dim: See :func:`iter_window_covariances`.
+        estimator (BaseGraphicalLasso): Solver of each window. Defaults to
+            ``BaseGraphicalLasso()``.
+
+    Yields:
+        start (int): Index of the first sample of the window.
+        precision (np.ndarray): Array of shape ``(n_features, n_features)``.
+    """
+    estimator = BaseGraphicalLasso() if estimator is None else estimator
+    estimator._warm_start = None
+    for start, _, covariance in iter_window_covariances(X, window, step, sample_dim):
+        yield start, estimator.fit_covariance(covariance).precision_
+
+
+def sliding_window_covariance(X, window, step=1, estimator=None, sample_dim="time"):
+    """Stack the sliding-window statistics of ``X`` into a ``xr.Dataset``.
+
+    Args:
+        X, window, step, sample_dim: See :func:`iter_window_covariances`.
+        estimator (BaseGraphicalLasso): If given, the precision matrix of every
+            window is estimated too, see :func:`iter_window_precisions`.
+
+    Returns:
+        dataset (xr.Dataset): With ``mean`` of dims ``(window, neuron)`` and
+            ``covariance`` (and ``precision``) of dims ``(window, neuron,
+            neuron_j)``, where ``neuron`` stands for the feature dimension of
+            ``X``. The ``window_start`` and ``window_stop`` coordinates hold
+            the first and last sample coordinates of each window.
+    """
+    if estimator is not None:
+        estimator._warm_start = None
+    starts, means, covariances, precisions = [], [], [], []
+    for start, mean, covariance in iter_window_covariances(X, window, step, sample_dim):
+        starts.append(start)
+        means.append(mean)
+        covariances.append(covariance)
+        if estimator is not None:
+            precisions.append(estimator.fit_covariance(covariance).precision_)
+    starts = np.array(starts)
+
+    if hasattr(X, "coords"):
+        (feature,) = [dim for dim in X.dims if dim != sample_dim]
+        labels = X[feature].values
+        index = X.indexes.get(sample_dim)
+        if index is None:
+            index = np.arange(X.sizes[sample_dim])
+    else:
+        feature, labels = "neuron", np.arange(len(means[0]))
+        index = np.arange(np.shape(X)[1])
+    first, last = index[starts], index[starts + window - 1]
+    if hasattr(first, "left"):
+        # Time bins from DandiHandler.get_spike_counts.
+        first, last = first.left, last.right
+
+    pair = (feature, f"{feature}_j")
+    data_vars = {
+        "mean": (("window", feature), np.stack(means)),
+        "covariance": (("window", *pair), np.stack(covariances)),
+    }
+    if estimator is not None:
+        data_vars["precision"] = (("window", *pair), np.stack(precisions))
+    return xr.Dataset(
+        data_vars,
+        coords={
+            "window": starts,
+            "window_start": ("window", np.asarray(first)),
+            "window_stop": ("window", np.asarray(last)),
+            feature: labels,
+            f"{feature}_j": labels,
+        },
+    )
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+import xarray as xr
+from scipy import sparse
+
+from functional_connectivity.generators.graphical_model import generateRandom
+from functional_connectivity.inference.base_graphical_lasso import (
+    BaseGraphicalLasso,
+    empirical_covariance,
+)
+
+
+@pytest.fixture
+def samples():
+    np.random.seed(0)
+    rng = np.random.default_rng(0)
+    precision = generateRandom(30, 0.05).toarray()
+    precision += np.eye(30) * np.abs(precision).sum(axis=1).max()
+    L = np.linalg.cholesky(np.linalg.inv(precision))
+    return L @ rng.standard_normal((30, 500))
+
+
+def assert_optimal(S, precision, lambd, atol=1e-3):
+    """Check the KKT conditions of the graphical lasso, off the diagonal."""
+    W = np.linalg.inv(precision)
+    off = ~np.eye(len(S), dtype=bool)
+    active = (precision != 0) & off
+    np.testing.assert_allclose(
+        (W - S)[active], lambd * np.sign(precision[active]), atol=atol
+    )
+    assert np.all(np.abs(W - S)[~active & off] <= lambd + atol)
+    np.testing.assert_allclose(np.diag(W), np.diag(S), atol=atol)
+
+
+@pytest.mark.parametrize("screening", [True, False])
+def test_fit_is_optimal(samples, screening):
+    model = BaseGraphicalLasso(lambd=0.2, screening=screening).fit(samples)
+    S = empirical_covariance(samples)
+    np.testing.assert_allclose(model.covariance_, S)
+    assert_optimal(S, model.precision_, 0.2)
+    np.testing.assert_array_equal(model.precision_, model.precision_.T)
+
+
+@pytest.mark.parametrize("screening", [True, False])
+def test_constant_unit(samples, screening):
+    X = samples.copy()
+    X[3] = 0
+    model = BaseGraphicalLasso(lambd=0.2, screening=screening).fit(X)
+    assert np.isfinite(model.precision_).all()
+    np.testing.assert_array_equal(model.constant_, np.arange(30) == 3)
+    assert model.precision_[3, 3] == pytest.approx(1 / model.min_variance)
+    np.testing.assert_array_equal(np.delete(model.precision_[3], 3), 0)
+    rest = np.delete(np.arange(30), 3)
+    S = empirical_covariance(samples[rest])
+    assert_optimal(S, model.precision_[np.ix_(rest, rest)], 0.2)
+
+
+def test_screening_splits_blocks(samples):
+    S = empirical_covariance(samples)
+    lambd = np.quantile(np.abs(S[np.triu_indices(30, 1)]), 0.97)
+    screened = BaseGraphicalLasso(lambd=lambd).fit(samples)
+    full = BaseGraphicalLasso(lambd=lambd, screening=False).fit(samples)
+    assert screened.n_components_ > 1
+    np.testing.assert_allclose(screened.precision_, full.precision_, atol=1e-3)
+
+
+def test_path_matches_cold_fits(samples):
+    lambdas = [0.05, 0.4, 0.1]
+    model = BaseGraphicalLasso(lambd=1.0)
+    precisions = model.path(samples, lambdas)
+    assert model.lambd == 1.0
+    for lambd, precision in zip(lambdas, precisions, strict=True):
+        cold = BaseGraphicalLasso(lambd=lambd).fit(samples).precision_
+        np.testing.assert_allclose(precision, cold, atol=1e-3)
+
+
+def test_path_is_warm_started(samples):
+    lambdas = np.linspace(0.3, 0.05, 6)
+    model = BaseGraphicalLasso(screening=False)
+    covariances, iterations = [], []
+    fit_covariance = model.fit_covariance
+
+    def fit(S):
+        covariances.append(S)
+        iterations.append(fit_covariance(S).iteration)
+        return model
+
+    model.fit_covariance = fit
+    model.path(samples, lambdas)
+    # One covariance for the whole path.
+    assert all(S is covariances[0] for S in covariances)
+    cold = [
+        BaseGraphicalLasso(lambd=lambd, screening=False).fit(samples).iteration
+        for lambd in lambdas
+    ]
+    assert sum(iterations) < sum(cold)
+
+
+def test_fit_data_array(samples):
+    counts = xr.DataArray(samples.T, dims=("time", "neuron"))
+    model = BaseGraphicalLasso(lambd=0.2).fit(counts)
+    expected = BaseGraphicalLasso(lambd=0.2).fit(samples).precision_
+    np.testing.assert_allclose(model.precision_, expected)
+
+
+@pytest.mark.parametrize("assume_centered", [True, False])
+def test_empirical_covariance_sparse(assume_centered):
+    counts = np.random.default_rng(0).poisson(0.1, size=(5, 400))
+    np.testing.assert_allclose(
+        empirical_covariance(sparse.csr_matrix(counts), assume_centered),
+        empirical_covariance(counts, assume_centered),
+    )
@@ -0,0 +1,73 @@
+import h5py
+import numpy as np
+import pytest
+import xarray as xr
+
+from functional_connectivity.inference.base_graphical_lasso import BaseGraphicalLasso
+from functional_connectivity.inference.grouped import (
+    grouped_connectivity,
+    grouped_statistics,
+)
+
+
+@pytest.fixture
+def counts():
+    rng = np.random.default_rng(0)
+    labels = rng.choice(np.array([b"rem", b"nrem", b"wake"], dtype="S16"), 500)
+    return xr.DataArray(
+        rng.poisson(2.0, size=(5, 500)).astype(np.float64),
+        coords={"neuron": [str(i) for i in range(5)], "label": ("time", labels)},
+        dims=["neuron", "time"],
+    )
+
+
+@pytest.mark.parametrize("chunk_size", [37, 2**16])
+def test_grouped_statistics_match_slices(counts, chunk_size):
+    stats = grouped_statistics(counts, chunk_size=chunk_size)
+    assert list(stats.labels) == [b"nrem", b"rem", b"wake"]
+    for label, count, mean, covariance in zip(
+        stats.labels, stats.count, stats.means(), stats.covariances(), strict=True
+    ):
+        block = counts.values[:, counts.label.values == label]
+        assert count == block.shape[1]
+        np.testing.assert_allclose(mean, block.mean(axis=1))
+        np.testing.assert_allclose(covariance, np.cov(block, bias=True), atol=1e-12)
+
+
+def test_grouped_statistics_merge(counts):
+    full = grouped_statistics(counts)
+    merged = grouped_statistics(counts[:, :200], labels=counts.label.values[:200])
+    merged += grouped_statistics(counts[:, 200:], labels=counts.label.values[200:])
+    assert merged.labels.tolist() == full.labels.tolist()
+    np.testing.assert_allclose(merged.cross, full.cross)
+
+
+def test_grouped_statistics_out_of_core(counts, tmp_path):
+    with h5py.File(tmp_path / "counts.h5", "w") as f:
+        f["counts"] = counts.values
+    with h5py.File(tmp_path / "counts.h5", "r") as f:
+        stats = grouped_statistics(f["counts"], counts.label.values, chunk_size=64)
+    np.testing.assert_allclose(stats.cross, grouped_statistics(counts).cross)
+
+
+def test_grouped_connectivity(counts):
+    dataset = grouped_connectivity(counts, estimator=BaseGraphicalLasso(lambd=0.2))
+    assert dataset.precision.dims == ("label", "neuron", "neuron_j")
+    for label in dataset.label.values:
+        block = counts.values[:, counts.label.values == label]
+        expected = BaseGraphicalLasso(lambd=0.2).fit(block).precision_
+        np.testing.assert_allclose(
+            dataset.precision.sel(label=label), expected, atol=1e-4
+        )
+
+
+def test_grouped_connectivity_silent_unit(counts):
+    # Unit 2 is silent during REM sleep.
+    counts = counts.copy()
+    counts[2, counts.label.values == b"rem"] = 0
+    estimator = BaseGraphicalLasso(lambd=0.2, screening=False)
+    dataset = grouped_connectivity(counts, estimator=estimator, chunk_size=37)
+    assert np.isfinite(dataset.precision.values).all()
+    rem = dataset.precision.sel(label=b"rem").values
+    np.testing.assert_array_equal(np.delete(rem[2], 2), 0)
+    assert rem[2, 2] == pytest.approx(1 / estimator.min_variance)
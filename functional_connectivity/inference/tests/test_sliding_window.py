@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from functional_connectivity.inference.base_graphical_lasso import BaseGraphicalLasso
+from functional_connectivity.inference.sliding_window import (
+    iter_window_covariances,
+    iter_window_precisions,
+    sliding_window_covariance,
+)
+
+
+@pytest.fixture
+def counts():
+    rng = np.random.default_rng(0)
+    return rng.poisson(3.0, size=(6, 300)).astype(np.float64)
+
+
+@pytest.mark.parametrize("step", [1, 7, 50, 80])
+@pytest.mark.parametrize("integral", [True, False])
+def test_matches_direct_covariance(counts, step, integral):
+    X = counts if integral else np.log1p(counts) + 1e3
+    windows = list(iter_window_covariances(X, 50, step, refresh=4))
+    assert [start for start, _, _ in windows] == list(range(0, 251, step))
+    for start, mean, covariance in windows:
+        block = X[:, start : start + 50]
+        np.testing.assert_allclose(mean, block.mean(axis=1))
+        np.testing.assert_allclose(
+            covariance, np.cov(block, bias=True), rtol=1e-9, atol=1e-9
+        )
+
+
+def test_window_precisions_match_cold_fits(counts):
+    estimator = BaseGraphicalLasso(lambd=0.3, tol=1e-7)
+    for start, precision in iter_window_precisions(counts, 100, 40, estimator):
+        cold = BaseGraphicalLasso(lambd=0.3, tol=1e-7)
+        expected = cold.fit(counts[:, start : start + 100]).precision_
+        np.testing.assert_allclose(precision, expected, atol=1e-4)
+
+
+def test_sliding_window_dataset(counts):
+    times = pd.IntervalIndex.from_breaks(np.arange(301) * 100.0, closed="left")
+    data_array = xr.DataArray(
+        counts,
+        coords={"neuron": [str(i) for i in range(6)], "time": times},
+        dims=["neuron", "time"],
+    )
+    dataset = sliding_window_covariance(
+        data_array, 100, 50, estimator=BaseGraphicalLasso(lambd=0.3)
+    )
+    assert dataset.covariance.dims == ("window", "neuron", "neuron_j")
+    assert dataset.precision.shape == (5, 6, 6)
+    np.testing.assert_array_equal(dataset.window, [0, 50, 100, 150, 200])
+    np.testing.assert_array_equal(dataset.window_start, [0, 5000, 10000, 15000, 20000])
+    np.testing.assert_array_equal(
+        dataset.window_stop, [10000, 15000, 20000, 25000, 30000]
+    )
+    np.testing.assert_allclose(
+        dataset.covariance.sel(window=50), np.cov(counts[:, 50:150], bias=True)
+    )
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from functional_connectivity.inference.base_graphical_lasso import BaseGraphicalLasso
+from functional_connectivity.inference.time_varying_graphical_lasso import (
+    TimeVaryingGraphicalLasso,
+    temporal_prox,
+)
+
+
+@pytest.fixture
+def blocks():
+    """Six blocks of 200 samples; the network changes after the third."""
+    rng = np.random.default_rng(0)
+    precisions = []
+    for edges in ([(0, 1), (2, 3), (4, 5)], [(1, 2), (3, 4), (5, 6)]):
+        precision = np.eye(8)
+        for i, j in edges:
+            precision[i, j] = precision[j, i] = 0.45
+        precisions.append(precision)
+    return [
+        np.linalg.cholesky(np.linalg.inv(precisions[k // 3]))
+        @ rng.standard_normal((8, 200))
+        for k in range(6)
+    ]
+
+
+@pytest.mark.parametrize("penalty_function", ["l1", "l2", "laplacian", "group_lasso"])
+def test_temporal_prox_is_proximal(penalty_function):
+    rng = np.random.default_rng(1)
+    D = rng.standard_normal((4, 4))
+    P = temporal_prox(D, 0.3, penalty_function)
+    psi = {
+        "l1": lambda X: np.abs(X).sum(),
+        "l2": lambda X: np.linalg.norm(X),
+        "laplacian": lambda X: np.sum(X**2),
+        "group_lasso": lambda X: np.linalg.norm(X, axis=0).sum(),
+    }[penalty_function]
+
+    def objective(X):
+        return 0.3 * psi(X) + 0.5 * np.sum((X - D) ** 2)
+
+    for _ in range(20):
+        assert objective(P) <= objective(P + 1e-3 * rng.standard_normal((4, 4)))
+
+
+def test_no_temporal_penalty_matches_static_fits(blocks):
+    model = TimeVaryingGraphicalLasso(lambd=20.0, beta=0.0, tol=1e-7).fit(blocks)
+    for x, theta in zip(blocks, model.thetas, strict=True):
+        static = BaseGraphicalLasso(lambd=20.0 / x.shape[1], tol=1e-7).fit(x)
+        np.testing.assert_allclose(theta, static.precision_, atol=1e-3)
+
+
+def test_large_temporal_penalty_fuses_blocks(blocks):
+    model = TimeVaryingGraphicalLasso(lambd=20.0, beta=1e4).fit(blocks)
+    assert model.deviations.max() < 1e-3
+
+
+def test_deviation_peaks_at_change_point(blocks):
+    model = TimeVaryingGraphicalLasso(lambd=20.0, beta=50.0).fit(blocks)
+    assert model.blocks == 6 and model.obs == 200 and model.dimension == 8
+    assert np.argmax(model.deviations) == 2
+    assert model.norm_deviations.max() == 1
+    assert model.dev_ratio > 1
+    assert model.iteration < model.max_iter
+
+
+def test_path_is_warm_started(blocks):
+    lambdas = [40.0, 30.0, 20.0, 10.0]
+    model = TimeVaryingGraphicalLasso(beta=50.0)
+    iterations = []
+    fit_covariance = model.fit_covariance
+
+    def fit(*args):
+        fit_covariance(*args)
+        iterations.append(model.iteration)
+        return model
+
+    model.fit_covariance = fit
+    thetas = model.path(blocks, lambdas)
+    assert thetas.shape == (4, 6, 8, 8)
+    cold = [TimeVaryingGraphicalLasso(lambd=lambd, beta=50.0) for lambd in lambdas]
+    for theta, solver in zip(thetas, cold, strict=True):
+        np.testing.assert_allclose(theta, solver.fit(blocks).thetas, atol=1e-3)
+    assert sum(iterations) < sum(solver.iteration for solver in cold)
+
+
+def test_loky_backend_matches_threads(blocks):
+    threads = TimeVaryingGraphicalLasso(lambd=20.0, beta=50.0, processes=2)
+    loky = TimeVaryingGraphicalLasso(lambd=20.0, beta=50.0, processes=2, backend="loky")
+    np.testing.assert_allclose(
+        loky.fit(blocks).thetas, threads.fit(blocks).thetas, atol=1e-10
+    )
+
+
+def test_fit_data_arrays(blocks):
+    counts = [
+        xr.DataArray(
+            x, dims=("neuron", "time"), coords={"time": 200 * k + np.arange(200)}
+        )
+        for k, x in enumerate(blocks)
+    ]
+    model = TimeVaryingGraphicalLasso(lambd=20.0, beta=50.0).fit(counts)
+    assert model.blockdates[1] == "200 - 399"
+
+    split = TimeVaryingGraphicalLasso(lambd=20.0, beta=50.0, blocks=6)
+    np.testing.assert_allclose(
+        split.fit(np.concatenate(blocks, axis=1)).thetas, model.thetas
+    )
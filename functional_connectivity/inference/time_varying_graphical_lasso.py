@@ -0,0 +1,309 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from loky import get_reusable_executor
+
+from .base_graphical_lasso import (
+    BaseGraphicalLasso,
+    empirical_covariance,
+    soft_threshold,
+)
+from ..utils._shared import open_shared, shared_dir
+
+PENALTY_FUNCTIONS = ("l1", "l2", "laplacian", "group_lasso")
+
+
+def temporal_prox(D, t, penalty_function):
+    """Proximal operator of ``t * psi`` on a stack of differences ``D``.
+
+    Args:
+        D (np.ndarray): Array of shape ``(..., n, n)``.
+        t (double): Step.
+        penalty_function (str): ``psi``, one of ``"l1"`` (elementwise),
+            ``"l2"`` (Frobenius norm), ``"laplacian"`` (squared Frobenius norm)
+            and ``"group_lasso"`` (sum of the column norms).
+    """
+    if penalty_function == "l1":
+        return soft_threshold(D, t)
+    if penalty_function == "laplacian":
+        return D / (1 + 2 * t)
+    if penalty_function == "l2":
+        norms = np.linalg.norm(D, axis=(-2, -1), keepdims=True)
+    elif penalty_function == "group_lasso":
+        norms = np.linalg.norm(D, axis=-2, keepdims=True)
+    else:
+        raise ValueError(
+            f"Unknown penalty function {penalty_function!r}; use one of {PENALTY_FUNCTIONS}."
+        )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return D * np.maximum(1 - t / norms, 0)
+
+
+def _theta_update(buffers, ks, rho, weights):
+    """Update ``theta[k]`` in place for each block ``k`` of ``ks``."""
+    theta, S, Z0, U0, Z1, U1, Z2, U2 = (open_shared(b, "r+") for b in buffers)
+    T = theta.shape[0]
+    for k in ks:
+        A = Z0[k] - U0[k]
+        copies = 1
+        if k < T - 1:
+            A = A + Z1[k] - U1[k]
+            copies += 1
+        if k > 0:
+            A = A + Z2[k] - U2[k]
+            copies += 1
+        # Minimizer of w (-logdet + tr(S theta)) + rho c / 2 ||theta - A / c||^2.
+        d, Q = np.linalg.eigh(rho * A - weights[k] * S[k])
+        c = rho * copies
+        theta[k] = (Q * ((d + np.sqrt(d**2 + 4 * c * weights[k])) / (2 * c))) @ Q.T
+    if isinstance(theta, np.memmap):
+        theta.flush()
+
+
+class TimeVaryingGraphicalLasso(BaseGraphicalLasso):
+    """Time-varying graphical lasso (Hallac et al., 2017), solved by ADMM.
+
+    Estimates one precision matrix ``theta[k]`` per temporal block by solving::
+
+        min sum_k n_k (-logdet(theta[k]) + tr(S[k] theta[k]))
+            + lambd sum_k ||theta[k]||_od,1
+            + beta sum_k psi(theta[k] - theta[k - 1])
+
+    where ``n_k`` and ``S[k]`` are the number of observations and the
+    empirical covariance of block ``k``. The per-block updates, one
+    eigendecomposition each, run in parallel on ``processes`` workers; the
+    other updates are vectorized over the blocks. With ``backend="loky"`` the
+    workers are processes sharing the iterates through memory-mapped buffers
+    (in ``/dev/shm`` when available), so no array is pickled per iteration.
+
+    Args:
+        lambd (double): Strength of the l1 penalty.
+        beta (double): Strength of the temporal penalty.
+        penalty_function (str): Temporal penalty ``psi``, see :func:`temporal_prox`.
+        blocks (int): Number of blocks an array passed to :meth:`fit` is split in.
+        rho (double): Initial ADMM step size.
+        max_iter (int): Maximum number of ADMM iterations.
+        tol (double): Absolute and relative tolerance of the ADMM residuals.
+        processes (int): Number of workers. Defaults to the number of CPUs.
+        backend (str): ``"threads"`` or ``"loky"``.
+        assume_centered (boolean): Whether the data is already centered.
+    """
+
+    def __init__(
+        self,
+        lambd=0.1,
+        beta=1.0,
+        penalty_function="group_lasso",
+        blocks=None,
+        rho=1.0,
+        max_iter=1000,
+        tol=1e-5,
+        processes=None,
+        backend="threads",
+        assume_centered=False,
+    ):
+        if penalty_function not in PENALTY_FUNCTIONS:
+            raise ValueError(
+                f"Unknown penalty function {penalty_function!r}; use one of {PENALTY_FUNCTIONS}."
+            )
+        if backend not in ("threads", "loky"):
+            raise ValueError(f"Unknown backend {backend!r}; use 'threads' or 'loky'.")
+        super().__init__(
+            lambd=lambd,
+            rho=rho,
+            max_iter=max_iter,
+            tol=tol,
+            processes=processes or os.cpu_count(),
+            screening=False,
+            assume_centered=assume_centered,
+        )
+        self.beta = beta
+        self.penalty_function = penalty_function
+        self.blocks = blocks
+        self.backend = backend
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(lambd={self.lambd}, beta={self.beta}, "
+            f"penalty_function={self.penalty_function!r})"
+        )
+
+    def _split(self, X, sample_dim):
+        if isinstance(X, (list, tuple)):
+            data = [self._as_samples(x, sample_dim, keep_sparse=True) for x in X]
+            dates = [_block_date(x, sample_dim, k) for k, x in enumerate(X)]
+            return data, dates
+        if self.blocks is None:
+            raise ValueError("Pass a list of blocks, or set `blocks` to split X.")
+        data = np.array_split(self._as_samples(X, sample_dim), self.blocks, axis=1)
+        return data, [str(k) for k in range(len(data))]
+
+    def fit(self, X, sample_dim="time"):
+        """Estimate one precision matrix per temporal block.
+
+        Args:
+            X (list or np.ndarray or xr.DataArray): Blocks of data of shape
+                ``(n_features, n_samples_k)``, such as the spike counts of
+                successive behavioral epochs, or one array split into
+                :attr:`blocks` blocks of consecutive samples.
+            sample_dim (str): Dimension holding the samples, for DataArrays.
+
+        Returns:
+            self (TimeVaryingGraphicalLasso): With ``thetas``, ``deviations``,
+                ``norm_deviations``, ``dev_ratio``, ``iteration`` and
+                ``run_time`` set.
+        """
+        return self.fit_covariance(*self._statistics(X, sample_dim))
+
+    def _statistics(self, X, sample_dim):
+        data, self.blockdates = self._split(X, sample_dim)
+        S = np.stack(
+            [
+                empirical_covariance(x, assume_centered=self.assume_centered)
+                for x in data
+            ]
+        )
+        weights = np.array([x.shape[1] for x in data], dtype=np.float64)
+        self.blocks = len(data)
+        self.obs = int(weights.mean())
+        self.dimension = S.shape[1]
+        return S, weights
+
+    def fit_covariance(self, S, weights=None):
+        """Estimate the precision matrices from covariances of shape ``(T, n, n)``.
+
+        A previous fit on covariances of the same shape is used as a warm
+        start.
+
+        Args:
+            S (np.ndarray): Empirical covariance of each block.
+            weights (np.ndarray): Number of observations of each block.
+                Defaults to one.
+        """
+        start = time.perf_counter()
+        S = np.asarray(S, dtype=np.float64)
+        T, n, _ = S.shape
+        weights = np.ones(T) if weights is None else np.asarray(weights, dtype=float)
+        # Dividing the objective by the mean block size keeps the step size
+        # ``rho`` on the scale of the precision matrices.
+        scale = weights.mean()
+        weights, lambd, beta = weights / scale, self.lambd / scale, self.beta / scale
+        names = ("theta", "S", "Z0", "U0", "Z1", "U1", "Z2", "U2")
+        chunks = np.array_split(np.arange(T), min(T, self.processes))
+
+        with tempfile.TemporaryDirectory(dir=shared_dir()) as tmp:
+            if self.backend == "loky":
+                buffers = [(os.path.join(tmp, name), S.shape, "f8") for name in names]
+                arrays = [open_shared(buffer, "w+") for buffer in buffers]
+                executor = get_reusable_executor(max_workers=self.processes)
+            else:
+                arrays = [np.zeros(S.shape) for _ in names]
+                buffers = arrays
+                executor = ThreadPoolExecutor(self.processes)
+            theta, S_, Z0, U0, Z1, U1, Z2, U2 = arrays
+            S_[:] = S
+            warm = self._warm_start
+            if warm is not None and warm[0].shape == S.shape:
+                # The iterates and the unscaled duals ``rho * U`` of the last fit.
+                for array, value in zip(arrays[2:], warm, strict=True):
+                    array[:] = value
+                theta[:] = Z0
+                for U in (U0, U1, U2):
+                    U /= self.rho
+            else:
+                for Z in (theta, Z0, Z1, Z2):
+                    Z[:] = np.eye(n)
+                for U in (U0, U1, U2):
+                    U[:] = 0
+
+            threshold = np.full((n, n), lambd)
+            np.fill_diagonal(threshold, 0)
+            rho = self.rho
+            iteration = 0
+            try:
+                for _ in range(self.max_iter):
+                    iteration += 1
+                    list(
+                        executor.map(
+                            _theta_update,
+                            [buffers] * len(chunks),
+                            chunks,
+                            [rho] * len(chunks),
+                            [weights] * len(chunks),
+                        )
+                    )
+                    Z_old = (Z0.copy(), Z1.copy(), Z2.copy())
+
+                    Z0[:] = soft_threshold(theta + U0, threshold / rho)
+                    A1 = theta[:-1] + U1[:-1]
+                    A2 = theta[1:] + U2[1:]
+                    D = temporal_prox(A2 - A1, 2 * beta / rho, self.penalty_function)
+                    Z1[:-1] = (A1 + A2 - D) / 2
+                    Z2[1:] = (A1 + A2 + D) / 2
+                    U0 += theta - Z0
+                    U1[:-1] += theta[:-1] - Z1[:-1]
+                    U2[1:] += theta[1:] - Z2[1:]
+
+                    r = np.sqrt(
+                        np.sum((theta - Z0) ** 2)
+                        + np.sum((theta[:-1] - Z1[:-1]) ** 2)
+                        + np.sum((theta[1:] - Z2[1:]) ** 2)
+                    )
+                    s = rho * np.sqrt(
+                        sum(
+                            np.sum((Z - Zo) ** 2)
+                            for Z, Zo in zip((Z0, Z1, Z2), Z_old, strict=True)
+                        )
+                    )
+                    scale = np.sqrt(3 * T) * n
+                    eps_primal = scale * self.tol + self.tol * max(
+                        np.linalg.norm(theta), np.linalg.norm(Z0)
+                    )
+                    eps_dual = scale * self.tol + self.tol * rho * np.linalg.norm(U0)
+                    if r <= eps_primal and s <= eps_dual:
+                        break
+                    if r > 10 * s:
+                        rho *= 2
+                        for U in (U0, U1, U2):
+                            U /= 2
+                    elif s > 10 * r:
+                        rho /= 2
+                        for U in (U0, U1, U2):
+                            U *= 2
+                thetas = np.array(Z0)
+                for U in (U0, U1, U2):
+                    U *= rho
+                self._warm_start = [np.array(array) for array in arrays[2:]]
+            finally:
+                if self.backend == "threads":
+                    executor.shutdown()
+                del arrays, theta, S_, Z0, U0, Z1, U1, Z2, U2
+
+        self.iteration = iteration
+        self.covariance_ = S
+        self.thetas = thetas
+        self.precision_ = thetas
+        self._set_deviations()
+        self.run_time = time.perf_counter() - start
+        return self
+
+    def _set_deviations(self):
+        dif = np.diff(self.thetas, axis=0)
+        dif[:, np.arange(self.thetas.shape[1]), np.arange(self.thetas.shape[1])] = 0
+        self.deviations = np.linalg.norm(dif, axis=(-2, -1))
+        if len(self.deviations) and self.deviations.max() > 0:
+            self.norm_deviations = self.deviations / self.deviations.max()
+            self.dev_ratio = self.deviations.max() / self.deviations.mean()
+        else:
+            self.norm_deviations = np.zeros_like(self.deviations)
+            self.dev_ratio = np.nan
+
+
+def _block_date(x, sample_dim, k):
+    if hasattr(x, "coords") and sample_dim in x.coords and x.sizes[sample_dim]:
+        values = x[sample_dim].values
+        return f"{values[0]} - {values[-1]}"
+    return str(k)
@@ -1,2 +1,29 @@
-from .dandi_handler import DandiHandler
-from .data_handler import DataHandler
+import importlib as _importlib
+
+_lazy_attrs = {
+    "batch": ["BatchSpikeCounts", "batch_spike_counts"],
+    "cache": ["AssetCache", "CacheMissError"],
+    "dandi_handler": ["DandiHandler"],
+    "data_handler": ["DataHandler"],
+    "resolver": ["DandiResolver"],
+    "results_store": ["ResultsStore"],
+    "sample_store": ["SampleWriter", "load_samples"],
+}
+_attr_to_module = {
+    attr: module for module, attrs in _lazy_attrs.items() for attr in attrs
+}
+__all__ = list(_attr_to_module)
+
+
+def __dir__():
+    return __all__ + list(_lazy_attrs)
+
+
+def __getattr__(name):
+    if name in _lazy_attrs:
+        return _importlib.import_module(f".{name}", __name__)
+    elif name in _attr_to_module:
+        module = _importlib.import_module(f".{_attr_to_module[name]}", __name__)
+        value = globals()[name] = getattr(module, name)
+        return value
+    raise AttributeError(f"Module {__name__!r} has no attribute {name!r}")
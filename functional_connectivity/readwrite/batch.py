@@ -0,0 +1,205 @@
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from loky import get_reusable_executor
+
+from .cache import CacheMissError
+from .dandi_handler import DandiHandler
+from ..utils.utils import warmup_kernels
+
+
+def _process_asset(dandiset_id, filepath, asset, time_to_bin, cache, stream):
+    handler = DandiHandler(dandiset_id, cache=cache)
+    handler._set_asset(filepath, asset)
+    data_array = handler.get_spike_counts(time_to_bin, stream=stream)
+    if cache is not None:
+        # Already stored by get_spike_counts; ship the key, not the array.
+        return cache.key(handler.blob_id, time_to_bin=time_to_bin)
+    return data_array
+
+
+class BatchSpikeCounts(Mapping):
+    """Spike counts of many assets, as returned by :func:`batch_spike_counts`.
+
+    This is a read-only mapping from asset path to ``xr.DataArray``. When the
+    batch ran with a cache, arrays stay on disk until they are accessed, and
+    an array evicted from the cache in the meantime is computed again.
+    Assets that failed are not part of the mapping; their exceptions are kept
+    in :attr:`errors`.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.errors = {}
+        self._entries = {}
+        # Arguments of ``_process_asset`` of each cached entry, to recompute it.
+        self._sources = {}
+
+    def __getitem__(self, filepath):
+        entry = self._entries[filepath]
+        if not isinstance(entry, str):
+            return entry
+        try:
+            data_array = self.cache.get_array(entry)
+        except CacheMissError:
+            data_array = None
+        if data_array is None:
+            data_array = self._recompute(filepath)
+        return data_array
+
+    def _recompute(self, filepath):
+        if filepath not in self._sources or self.cache.offline:
+            raise KeyError(
+                f"The spike counts of {filepath!r} were evicted from the cache "
+                "and cannot be computed again."
+            )
+        dandiset_id, asset, time_to_bin, stream = self._sources[filepath]
+        handler = DandiHandler(dandiset_id, cache=self.cache)
+        handler._set_asset(filepath, asset)
+        return handler.get_spike_counts(time_to_bin, stream=stream)
+
+    def __contains__(self, filepath):
+        return filepath in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"BatchSpikeCounts({len(self)} assets, {len(self.errors)} errors)"
+
+    def concat(self, dim: str = "asset"):
+        """Concatenate all assets along a new dimension ``dim``.
+
+        Assets generally differ in their number of neurons and time bins, so
+        ``time`` becomes a positional index, with the bin edges kept in the
+        ``time_start`` and ``time_stop`` coordinates, and shorter assets are
+        padded with NaN.
+
+        Returns:
+            data_array (xr.DataArray): Spike counts of dims ``(dim, neuron, time)``.
+        """
+        arrays = []
+        for filepath in self:
+            data_array = self[filepath]
+            index = data_array.indexes["time"]
+            arrays.append(
+                data_array.assign_coords(
+                    time=np.arange(len(index)),
+                    time_start=("time", index.left.values),
+                    time_stop=("time", index.right.values),
+                )
+            )
+        return xr.concat(
+            arrays, dim=pd.Index(list(self), name=dim), join="outer", coords="all"
+        )
+
+
+def batch_spike_counts(
+    dandiset_id: str,
+    filepaths=None,
+    version_id: str = "draft",
+    time_to_bin: int = 100,
+    max_workers: int = 4,
+    backend: str = "loky",
+    cache=None,
+    stream: bool = False,
+    resume=None,
+):
+    """Compute the spike counts of many assets of a dandiset concurrently.
+
+    Each asset is handled by its own :class:`DandiHandler` in a bounded pool of
+    workers. An asset that raises does not stop the others; its exception is
+    recorded in the ``errors`` of the result, so a batch can be resumed by
+    passing the result back as ``resume``. With a ``cache``, finished assets
+    are also skipped across sessions, since their arrays are cached.
+
+    Args:
+        dandiset_id (str): Identifier of the dandiset.
+        filepaths (list): Asset paths to process. Defaults to every ``.nwb``
+            asset of ``version_id``.
+        version_id (str): Version of the dandiset.
+        time_to_bin (int): Width of the time bins.
+        max_workers (int): Size of the worker pool.
+        backend (str): ``"loky"`` for a process pool, ``"threads"`` for a
+            thread pool.
+        cache (AssetCache): Optional cache shared by all workers.
+        stream (boolean): Passed to :meth:`DandiHandler.get_spike_counts`.
+        resume (BatchSpikeCounts): A previous result whose completed assets
+            are kept instead of being recomputed.
+
+    Returns:
+        result (BatchSpikeCounts): Mapping from asset path to spike counts.
+    """
+    handler = DandiHandler(dandiset_id, cache=cache)
+    if filepaths is None:
+        filepaths = [
+            path
+            for path in handler.get_all_filepaths_by_version(version_id)
+            if path.endswith(".nwb")
+        ]
+
+    result = BatchSpikeCounts(cache)
+    if resume is not None:
+        for filepath in filepaths:
+            if filepath in resume:
+                result._entries[filepath] = resume._entries[filepath]
+                if filepath in resume._sources:
+                    result._sources[filepath] = resume._sources[filepath]
+    todo = [path for path in filepaths if path not in result]
+
+    # Resolve every asset URL concurrently up front, rather than once per worker.
+    assets = handler.resolve_assets(version_id, todo)
+    for filepath, asset in assets.items():
+        if isinstance(asset, Exception):
+            result.errors[filepath] = asset
+    todo = [path for path in todo if path not in result.errors]
+
+    if backend == "loky":
+        executor = get_reusable_executor(
+            max_workers=max_workers, initializer=warmup_kernels
+        )
+    elif backend == "threads":
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    else:
+        raise ValueError(f"Unknown backend {backend!r}; use 'loky' or 'threads'.")
+
+    futures = {
+        executor.submit(
+            _process_asset,
+            dandiset_id,
+            filepath,
+            assets[filepath],
+            time_to_bin,
+            cache,
+            stream,
+        ): filepath
+        for filepath in todo
+    }
+    for future in as_completed(futures):
+        filepath = futures[future]
+        try:
+            result._entries[filepath] = future.result()
+        except Exception as err:
+            result.errors[filepath] = err
+        else:
+            if cache is not None:
+                result._sources[filepath] = (
+                    dandiset_id,
+                    assets[filepath],
+                    time_to_bin,
+                    stream,
+                )
+    if backend == "threads":
+        executor.shutdown()
+
+    # Keep the order of ``filepaths``, whatever the completion order.
+    result._entries = {
+        path: result._entries[path] for path in filepaths if path in result
+    }
+    return result
@@ -0,0 +1,267 @@
+try:
+    import fsspec
+except ImportError:
+    fsspec = None
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get(
+        "FUNCTIONAL_CONNECTIVITY_CACHE",
+        Path.home() / ".cache" / "functional_connectivity",
+    )
+)
+DEFAULT_MAX_BYTES = 20 * 1024**3
+
+
+class CacheMissError(KeyError):
+    """Raised when an entry is requested from an offline cache that lacks it."""
+
+
+class AssetCache:
+    """A content-addressed, size-bounded local cache for DANDI assets.
+
+    The cache lives in a plain directory with three areas:
+
+    - ``arrays/``: derived spike-count arrays, keyed by :meth:`key`;
+    - ``blobs/``: byte ranges of remote assets fetched through ``fsspec``'s
+      block cache, one sub-directory per asset blob id;
+    - ``meta/``: small JSON documents (API responses, asset URLs).
+
+    Every read refreshes the entry's modification time, and :meth:`evict` drops
+    the least recently used arrays and blobs until the cache fits in
+    ``max_bytes``. In ``offline`` mode nothing is fetched: misses raise
+    :class:`CacheMissError`.
+
+    Args:
+        root (str or Path): Cache directory. Defaults to
+            ``$FUNCTIONAL_CONNECTIVITY_CACHE`` or ``~/.cache/functional_connectivity``.
+        max_bytes (int): Size bound of the ``arrays/`` and ``blobs/`` areas.
+        offline (boolean): Whether to forbid any network access.
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES, offline=False):
+        self.root = Path(root) if root is not None else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.offline = offline
+        for area in ("arrays", "blobs", "meta"):
+            (self.root / area).mkdir(parents=True, exist_ok=True)
+
+    def __repr__(self):
+        return f"AssetCache({str(self.root)!r}, max_bytes={self.max_bytes}, offline={self.offline})"
+
+    @staticmethod
+    def key(blob_id: str, **params):
+        """Content address of the array derived from ``blob_id`` with ``params``."""
+        payload = json.dumps({"blob_id": blob_id, **params}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _array_path(self, key):
+        return self.root / "arrays" / f"{key}.npz"
+
+    def _meta_path(self, name):
+        return self.root / "meta" / f"{hashlib.sha256(name.encode()).hexdigest()}.json"
+
+    @staticmethod
+    def _touch(path):
+        os.utime(path)
+
+    def _miss(self, what):
+        if self.offline:
+            raise CacheMissError(f"{what} is not cached and the cache is offline.")
+        return None
+
+    def get_array(self, key):
+        """Load a cached ``xr.DataArray``, or return None on a miss."""
+        path = self._array_path(key)
+        if not path.exists():
+            return self._miss(f"Array {key}")
+        self._touch(path)
+        return _load_data_array(path)
+
+    def put_array(self, key, data_array):
+        """Store ``data_array`` under ``key`` and evict old entries if needed."""
+        _dump_data_array(self._array_path(key), data_array)
+        self.evict()
+
+    def get_json(self, name):
+        """Load a cached JSON document, or return None on a miss."""
+        path = self._meta_path(name)
+        if not path.exists():
+            return self._miss(f"Document {name!r}")
+        with open(path) as f:
+            return json.load(f)
+
+    def put_json(self, name, document):
+        """Store a JSON-serializable ``document`` under ``name``."""
+        payload = json.dumps(document).encode()
+        _atomic_write(self._meta_path(name), lambda f: f.write(payload))
+
+    def open(self, url, blob_id, block_size=2**22):
+        """Open a remote asset, keeping every fetched byte range on disk.
+
+        Args:
+            url (str): Location of the asset (any protocol known to ``fsspec``).
+            blob_id (str): Content id of the asset; cached blocks are shared by
+                every URL resolving to the same blob.
+            block_size (int): Size of the cached byte ranges.
+
+        Returns:
+            f (file-like): A read-only, seekable file object.
+        """
+        if fsspec is None:
+            raise ImportError(
+                "Caching byte ranges requires fsspec "
+                "(pip install functional-connectivity[fsspec])."
+            )
+        storage = self.root / "blobs" / blob_id
+        if self.offline and not storage.exists():
+            raise CacheMissError(
+                f"Blob {blob_id} is not cached and the cache is offline."
+            )
+        storage.mkdir(exist_ok=True)
+        self._touch(storage)
+        protocol = fsspec.utils.get_protocol(url)
+        if self.offline:
+            # Blocks that are not on disk raise instead of being fetched.
+            target = {
+                "fs": _OfflineFileSystem(protocol, blob_id),
+                "skip_instance_cache": True,
+            }
+        else:
+            target = {"target_protocol": protocol}
+        fs = fsspec.filesystem(
+            "blockcache",
+            cache_storage=str(storage),
+            check_files=False,
+            expiry_time=False,
+            **target,
+        )
+        return fs.open(url, mode="rb", block_size=block_size)
+
+    def _entries(self):
+        for path in (self.root / "arrays").iterdir():
+            yield path, path.stat().st_size
+        for path in (self.root / "blobs").iterdir():
+            size = sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+            yield path, size
+
+    def size(self):
+        """Total size of the cached arrays and blobs, in bytes."""
+        return sum(size for _, size in self._entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits ``max_bytes``."""
+        entries = sorted(self._entries(), key=lambda e: e[0].stat().st_mtime)
+        total = sum(size for _, size in entries)
+        for path, size in entries:
+            if total <= self.max_bytes:
+                break
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """Delete every cached entry."""
+        for area in ("arrays", "blobs", "meta"):
+            shutil.rmtree(self.root / area, ignore_errors=True)
+            (self.root / area).mkdir()
+
+
+if fsspec is not None:
+
+    class _OfflineFile(fsspec.spec.AbstractBufferedFile):
+        def _fetch_range(self, start, end):
+            raise CacheMissError(
+                f"Bytes {start}-{end} of blob {self.fs.blob_id} are not cached "
+                "and the cache is offline."
+            )
+
+    class _OfflineFileSystem(fsspec.AbstractFileSystem):
+        """Target of an offline block cache: files open with the size recorded
+        in the cache metadata, and every fetch raises :class:`CacheMissError`."""
+
+        protocol = "offline"
+        cachable = False
+
+        def __init__(self, protocol, blob_id):
+            super().__init__()
+            self.blob_id = blob_id
+            # Strip paths as the online target does, to find their metadata.
+            self._strip_protocol = fsspec.get_filesystem_class(protocol)._strip_protocol
+
+        def _miss(self):
+            return CacheMissError(
+                f"Blob {self.blob_id} is not cached and the cache is offline."
+            )
+
+        def _open(self, path, mode="rb", block_size=None, size=None, **kwargs):
+            if size is None:
+                raise self._miss()
+            return _OfflineFile(self, path, mode, block_size, size=size)
+
+        def ukey(self, path):
+            raise self._miss()
+
+        def cat_ranges(self, paths, starts, ends, **kwargs):
+            raise self._miss()
+
+
+def _atomic_write(path, write):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _dump_data_array(path, data_array):
+    arrays = {"__data__": data_array.values}
+    coords = {}
+    for name, coord in data_array.coords.items():
+        if name in data_array.dims and isinstance(coord.to_index(), pd.IntervalIndex):
+            index = coord.to_index()
+            arrays[f"{name}__left"] = index.left.values
+            arrays[f"{name}__right"] = index.right.values
+            coords[name] = {"dims": coord.dims, "interval": index.closed}
+        else:
+            values = np.asarray(coord.values)
+            if values.dtype == object:
+                values = values.astype(str)
+            arrays[name] = values
+            coords[name] = {"dims": coord.dims, "interval": None}
+    meta = {"name": data_array.name, "dims": data_array.dims, "coords": coords}
+    arrays["__meta__"] = np.array(json.dumps(meta))
+
+    _atomic_write(path, lambda f: np.savez(f, **arrays))
+
+
+def _load_data_array(path):
+    with np.load(path, allow_pickle=False) as npz:
+        meta = json.loads(str(npz["__meta__"]))
+        coords = {}
+        for name, spec in meta["coords"].items():
+            if spec["interval"] is not None:
+                values = pd.IntervalIndex.from_arrays(
+                    npz[f"{name}__left"], npz[f"{name}__right"], closed=spec["interval"]
+                )
+            else:
+                values = npz[name]
+            coords[name] = (tuple(spec["dims"]), values)
+        return xr.DataArray(
+            npz["__data__"], coords=coords, dims=meta["dims"], name=meta["name"]
+        )
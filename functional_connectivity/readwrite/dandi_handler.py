@@ -1,25 +1,54 @@
 import warnings
 
+import h5py
 import numpy as np
 import pandas as pd
-import requests
 import xarray as xr
-from dandi.dandiapi import DandiAPIClient
-
-# import numba as nb
-from numba import njit, prange
 from pynwb import NWBHDF5IO
 
+from .cache import CacheMissError
+from .resolver import get_default_resolver
+from ..utils.binning import bin_ragged, bin_ragged_slabs, to_ragged
+from ..utils.profiling import Profiler
+from ..utils.pyramid import SpikeCountPyramid
+from ..utils.timeline import EpochTimeline
 from ..utils.utils import sizeof_fmt
 
-warnings.simplefilter("ignore")
+try:
+    import fsspec
+except ImportError:
+    fsspec = None
 
-API_DANDIARCHIVE = "https://api.dandiarchive.org/api/dandisets/"
+try:
+    import sparse as pydata_sparse
+except ImportError:
+    pydata_sparse = None
+
+warnings.simplefilter("ignore")
 
 
 class DandiHandler:
-    def __init__(self, dandiset_id: str):
+    def __init__(self, dandiset_id: str, cache=None, resolver=None, profiler=None):
+        """Access the spiking data of a dandiset.
+
+        Args:
+            dandiset_id (str): Identifier of the dandiset, e.g. ``"000041"``.
+            cache (AssetCache): Optional local cache for API responses, remote
+                byte ranges and spike-count arrays. With an offline cache, no
+                network access is made.
+            resolver (DandiResolver): Client of the DANDI API. Defaults to one
+                shared, memoizing resolver per process.
+            profiler (Profiler): Records the wall time, bytes read and peak
+                memory of each stage (``lookup``, ``open``, ``read``,
+                ``behaviors``, ``units``, ``intervals``, ``binning``, ``cache``), see
+                :meth:`report`. Pass ``Profiler(hook=...)`` to forward the
+                stages to an external profiler.
+        """
         self.dandiset_id = dandiset_id
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.cache = cache
+        self.resolver = resolver if resolver is not None else get_default_resolver()
+        self.blob_id = None
         self.version_id = None
         self.filepath = None
         self.asset = None
@@ -28,24 +57,46 @@ class DandiHandler:
         self.nwbfile = None
 
         self.behaviors = None  # behavioral labels
+        self.timeline = None  # time bins of the behavioral epochs
         self.units = None  # the 0-or-1 spikes data
         self.data_array = None  # the spike counts data ("all data")
 
-        self.metadata = dict()
-        self.metadata["ds_instance"] = requests.get(
-            API_DANDIARCHIVE + dandiset_id + "/?format=json"
-        ).json()
+        self.metadata = {}
+        with self.profiler.span("lookup"):
+            self.metadata["ds_instance"] = self._cached_json(
+                f"dandiset/{dandiset_id}",
+                lambda: self.resolver.run(self.resolver.get_dandiset(dandiset_id)),
+            )
+
+        self.version2paths = {}
+
+    def report(self):
+        """Wall time, bytes read and peak memory of the stages run so far.
 
-        self.version2paths = dict()
+        Returns:
+            report (pd.DataFrame): One row per span of :attr:`profiler`.
+        """
+        return self.profiler.report()
+
+    def _cached_json(self, name, fetch):
+        if self.cache is None:
+            return fetch()
+        document = self.cache.get_json(name)
+        if document is None:
+            document = fetch()
+            self.cache.put_json(name, document)
+        return document
 
     def get_all_versions(self):
         return self._collect_values_by_key(self.metadata["ds_instance"], "version")
 
     def get_all_filepaths_by_version(self, version_id: str = "draft"):
         self.version_id = version_id
-        with DandiAPIClient() as client:
-            self.asset = client.get_dandiset(self.dandiset_id, version_id).get_assets()
-        self.version2paths[version_id] = [asset.path for asset in self.asset]
+        with self.profiler.span("lookup"):
+            self.asset = self.resolver.run(
+                self.resolver.get_assets(self.dandiset_id, version_id)
+            )
+        self.version2paths[version_id] = [asset["path"] for asset in self.asset]
         return self.version2paths[version_id]
 
     @staticmethod
@@ -71,19 +122,56 @@ class DandiHandler:
             raise ValueError("Please specify the version_id (use version_id='...').")
         if filepath is None:
             raise ValueError("Please specify the filepath (use filepath='...').")
-        self.filepath = filepath
-        with DandiAPIClient() as client:
-            self.asset = client.get_dandiset(
-                self.dandiset_id, version_id
-            ).get_asset_by_path(filepath)
-            self.s3_url = self.asset.get_content_url(
-                follow_redirects=1, strip_query=True
-            )
-        print(
-            f"This dataset is of size {sizeof_fmt(self.asset.get_metadata().contentSize)}."
-        )
+        asset = self.resolve_assets(version_id, [filepath])[filepath]
+        if isinstance(asset, Exception):
+            raise asset
+        self._set_asset(filepath, asset)
+        print(f"This dataset is of size {sizeof_fmt(asset['content_size'])}.")
         return self.s3_url
 
+    def _set_asset(self, filepath, asset):
+        self.filepath = filepath
+        self.asset = asset
+        self.s3_url = asset["s3_url"]
+        self.blob_id = self.s3_url.rstrip("/").rsplit("/", 1)[-1]
+
+    def resolve_assets(self, version_id: str, filepaths):
+        """Resolve the S3 URL and size of many assets concurrently.
+
+        Args:
+            version_id (str): Version of the dandiset.
+            filepaths (list): Asset paths.
+
+        Returns:
+            assets (dict): Mapping from path to a dict with keys ``s3_url`` and
+                ``content_size``, or to the exception raised while resolving it.
+        """
+        assets = {}
+        if self.cache is not None:
+            for filepath in filepaths:
+                try:
+                    asset = self.cache.get_json(
+                        f"asset/{self.dandiset_id}/{version_id}/{filepath}"
+                    )
+                except CacheMissError as err:
+                    asset = err
+                if asset is not None:
+                    assets[filepath] = asset
+
+        todo = [filepath for filepath in filepaths if filepath not in assets]
+        if todo:
+            with self.profiler.span("lookup", assets=len(todo)):
+                resolved = self.resolver.run(
+                    self.resolver.resolve_many(self.dandiset_id, version_id, todo)
+                )
+            for filepath, asset in resolved.items():
+                if self.cache is not None and not isinstance(asset, Exception):
+                    self.cache.put_json(
+                        f"asset/{self.dandiset_id}/{version_id}/{filepath}", asset
+                    )
+                assets[filepath] = asset
+        return {filepath: assets[filepath] for filepath in filepaths}
+
     def download(self):
         if self.s3_url is None:
             raise FileNotFoundError(
@@ -91,78 +179,137 @@ class DandiHandler:
             )
 
         if self.io is None:
-            self.io = NWBHDF5IO(
-                self.s3_url, mode="r", load_namespaces=True, driver="ros3"
-            )
+            with self.profiler.span("open"):
+                if self.cache is not None and fsspec is not None:
+                    f = self.cache.open(self.s3_url, self.blob_id)
+                    self.io = NWBHDF5IO(
+                        file=h5py.File(f, "r"), mode="r", load_namespaces=True
+                    )
+                elif self.cache is not None and self.cache.offline:
+                    raise ImportError(
+                        "Reading assets from an offline cache requires fsspec "
+                        "(pip install functional-connectivity[fsspec])."
+                    )
+                else:
+                    self.io = NWBHDF5IO(
+                        self.s3_url, mode="r", load_namespaces=True, driver="ros3"
+                    )
 
     def read(self):
         if self.io is None:
             self.download()
-        self.nwbfile = self.io.read()
+        with self.profiler.span("read"):
+            self.nwbfile = self.io.read()
         return self.nwbfile
 
     def get_behavior_labels(self, tag: str = "behavior"):
         if self.nwbfile is None:
             self.read()
-        self.behaviors = (
-            self.nwbfile.processing[tag]
-            .fields["data_interfaces"]["states"]
-            .to_dataframe()
-        )
+        with self.profiler.span("behaviors"):
+            self.behaviors = (
+                self.nwbfile.processing[tag]
+                .fields["data_interfaces"]["states"]
+                .to_dataframe()
+            )
         return self.behaviors
 
     def get_units(self):
         if self.nwbfile is None:
             self.read()
-        self.units = self.nwbfile.units.to_dataframe()
+        with self.profiler.span("units"):
+            self.units = self.nwbfile.units.to_dataframe()
         return self.units
 
     @staticmethod
-    @njit(parallel=True)
-    def _get_spike_counts(n_time_intervals, _spike_times, bv_t_itvls):
-        _container = np.zeros(n_time_intervals, dtype=np.float64)
-        for j in prange(n_time_intervals):  # timestamp
-            for spike in _spike_times:
-                if bv_t_itvls[j][0] <= spike < bv_t_itvls[j][1]:
-                    _container[j] += 1
-        return _container
-
-    def get_spike_counts(self, time_to_bin: int = 100):
+    def _get_spike_counts(spike_times, spike_offsets, bv_t_itvls, sparse=False):
+        return bin_ragged(spike_times, spike_offsets, bv_t_itvls, sparse=sparse)
+
+    def _get_unit_column(self, name: str):
+        if self.units is not None:
+            return self.units.loc[:, name].values.tolist()
+        return list(self.nwbfile.units[name].data[:])
+
+    def get_spike_counts(
+        self,
+        time_to_bin: int = 100,
+        stream: bool = False,
+        slab_size: int = 2**22,
+        sparse: bool = False,
+    ):
+        """Bin the spikes of every unit into behavior-aligned time intervals.
+
+        The bins are kept in :attr:`timeline`, an :class:`EpochTimeline` that
+        locates the bins of a behavior or a time range without scanning, e.g.
+        ``data_array.isel(time=handler.timeline.bins(a, b))``.
+
+        Args:
+            time_to_bin (int): Width of the time bins.
+            stream (boolean): Whether to read ``spike_times`` directly from the
+                NWB file in slabs of ``slab_size`` spikes instead of loading the
+                units table with :meth:`get_units`. Peak memory is then bounded
+                by the slab size and the output matrix.
+            slab_size (int): Number of spikes read at once when ``stream=True``.
+            sparse (boolean): Whether to build the counts as a sparse matrix of
+                the smallest unsigned integer type that holds them, instead of
+                a dense float64 one. At fine bins, where most counts are zero,
+                this takes orders of magnitude less memory. The data is then a
+                ``sparse.COO`` array (needs the ``sparse`` extra), which
+                :func:`sum_chunk`, :class:`SpikeCountPyramid` and
+                :meth:`BaseGraphicalLasso.fit` use without densifying. Sparse
+                counts are not cached.
+
+        Returns:
+            data_array (xr.DataArray): Spike counts, of dims ``(neuron, time)``.
+        """
+        if sparse and pydata_sparse is None:
+            raise ImportError(
+                "Sparse spike counts require the sparse package "
+                "(pip install functional-connectivity[sparse])."
+            )
+        cache_key = None
+        if self.cache is not None and self.blob_id is not None and not sparse:
+            cache_key = self.cache.key(self.blob_id, time_to_bin=time_to_bin)
+            with self.profiler.span("cache"):
+                self.data_array = self.cache.get_array(cache_key)
+            if self.data_array is not None:
+                self.timeline = EpochTimeline.from_data_array(
+                    self.data_array, time_to_bin
+                )
+                return self.data_array
+
         if self.behaviors is None:
             self.get_behavior_labels()
 
-        if self.units is None:
+        if stream:
+            if self.nwbfile is None:
+                self.read()
+        elif self.units is None:
             self.get_units()
 
-        _loc = self.behaviors.loc
-        time_intervals = (_loc[:, "stop_time"] - _loc[:, "start_time"]) // time_to_bin
-        num_t_itvls = int(sum(time_intervals) + len(time_intervals))
-        behavioral_states = np.zeros(num_t_itvls, dtype="S16")
-        bv_t_itvls = np.zeros((num_t_itvls, 2), dtype=np.float64)
-        _counter = 0
-        for i in range(len(time_intervals)):
-            start_t, stop_t = _loc[i, "start_time"], _loc[i, "stop_time"]
-            for j in range(int(time_intervals.iloc[i]) + 1):
-                behavioral_states[_counter] = _loc[i, "label"]
-                bv_t_itvls[_counter, 0] = start_t + j * time_to_bin
-                if start_t + (j + 1) * time_to_bin > stop_t:
-                    bv_t_itvls[_counter, 1] = stop_t
-                else:
-                    bv_t_itvls[_counter, 1] = start_t + (j + 1) * time_to_bin
-                _counter += 1
-        n_neurons = len(self.units)
-        n_time_intervals = len(bv_t_itvls)
-
-        container = np.zeros((n_neurons, n_time_intervals), dtype=np.float64)
-        for i in range(n_neurons):
-            container[i, :] = self._get_spike_counts(
-                n_time_intervals, self.units.iloc[:]["spike_times"][i], bv_t_itvls
-            )
+        with self.profiler.span("intervals"):
+            self.timeline = EpochTimeline.from_behaviors(self.behaviors, time_to_bin)
+            bv_t_itvls = self.timeline.intervals
+            behavioral_states = self.timeline.labels(dtype="S16")
+        with self.profiler.span("binning", stream=stream):
+            if stream:
+                units = self.nwbfile.units
+                container = bin_ragged_slabs(
+                    units.spike_times.data,
+                    units.spike_times_index.data,
+                    bv_t_itvls,
+                    slab_size=slab_size,
+                    sparse=sparse,
+                )
+            else:
+                spike_times, spike_offsets = to_ragged(self.units["spike_times"].values)
+                container = self._get_spike_counts(
+                    spike_times, spike_offsets, bv_t_itvls, sparse
+                )
+            if sparse:
+                container = pydata_sparse.COO.from_scipy_sparse(container)
 
-        neurons = [str(node) for node in range(len(self.units))]
-        times = pd.IntervalIndex.from_arrays(
-            bv_t_itvls[:, 0], bv_t_itvls[:, 1], closed="left"
-        )
+        neurons = [str(node) for node in range(container.shape[0])]
+        times = self.timeline.index
 
         self.data_array = xr.DataArray(
             container,
@@ -170,11 +317,43 @@ class DandiHandler:
                 "neuron": neurons,
                 "time": times,
                 "label": ("time", behavioral_states),
-                "cell_type": ("neuron", self.units.loc[:, "cell_type"].values.tolist()),
-                "shank_id": ("neuron", self.units.loc[:, "shank_id"].values.tolist()),
-                "region": ("neuron", self.units.loc[:, "region"].values.tolist()),
+                "epoch": ("time", self.timeline.epochs),
+                "cell_type": ("neuron", self._get_unit_column("cell_type")),
+                "shank_id": ("neuron", self._get_unit_column("shank_id")),
+                "region": ("neuron", self._get_unit_column("region")),
             },
             dims=["neuron", "time"],
         )
 
+        if cache_key is not None:
+            self.cache.put_array(cache_key, self.data_array)
         return self.data_array
+
+    def get_spike_count_pyramid(
+        self,
+        resolutions=(1, 10, 100, 1000),
+        stream=False,
+        slab_size=2**22,
+        sparse=False,
+    ):
+        """Bin the spikes once, at the finest of ``resolutions``, and derive the
+        coarser ones from it on demand.
+
+        Args:
+            resolutions (list): Bin widths, multiples of the smallest one.
+            stream, slab_size, sparse: See :meth:`get_spike_counts`.
+
+        Returns:
+            pyramid (SpikeCountPyramid): ``pyramid[time_to_bin]`` are the spike
+                counts in bins of ``time_to_bin``, as from
+                :meth:`get_spike_counts`.
+        """
+        finest = min(resolutions)
+        data_array = self.get_spike_counts(
+            finest, stream=stream, slab_size=slab_size, sparse=sparse
+        )
+        # ``get_spike_counts`` leaves the epochs of its bins in the timeline,
+        # also on a cache hit, when the behaviors are never read.
+        return SpikeCountPyramid(
+            data_array, finest, self.timeline.epoch_sizes, resolutions
+        )
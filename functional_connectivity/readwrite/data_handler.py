@@ -4,37 +4,174 @@ except ImportError:
     pass
 
 import datetime
+import json
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
 
 import networkx as nx
 import numpy as np
+import pandas as pd
 from scipy import sparse
 
+from .cache import _atomic_write
+from .results_store import ResultsStore
+from .sample_store import SampleWriter, load_samples
+from ..utils.linalg import SparseCholesky
+
 
 @dataclass
 class GraphStorage:
-    g: nx.Graph or nx.DiGraph
-    precision_mat: sparse.csr_matrix
-    correlation_mat: sparse.csr_matrix
     adj_mat: sparse.csr_matrix
+    precision_mat: sparse.csr_matrix
+    nodes: np.ndarray
+
+    def __init__(self, g=None, adj_mat=None, nodes=None):
+        """A network, stored as its sparse adjacency and precision matrices.
+
+        Args:
+            g (nx.Graph): The network. Either ``g`` or ``adj_mat`` is required.
+            adj_mat (sparse matrix): Symmetric weighted adjacency matrix; the
+                networkx view is then built only when :attr:`g` is accessed.
+            nodes (np.ndarray): Label of each row of ``adj_mat``. Defaults to
+                ``0, ..., n - 1``.
+        """
+        if g is not None:
+            self.__dict__["g"] = g
+            adj_mat = nx.adjacency_matrix(g)
+            nodes = np.asarray(g.nodes)
+        elif adj_mat is None:
+            raise ValueError("Either a graph or an adjacency matrix is required.")
+        self.adj_mat = sparse.csr_matrix(adj_mat)
+        n = self.adj_mat.shape[0]
+        self.nodes = np.arange(n) if nodes is None else np.asarray(nodes)
+        self.precision_mat = self.adj_mat + sparse.eye(n)
+
+    @cached_property
+    def g(self):
+        """The network as a ``nx.Graph``, built on first access."""
+        g = nx.from_scipy_sparse_array(self.adj_mat)
+        return nx.relabel_nodes(g, dict(enumerate(self.nodes.tolist())), copy=False)
+
+    @cached_property
+    def factor(self):
+        """Sparse Cholesky factor of the precision matrix, computed once."""
+        return SparseCholesky(self.precision_mat)
 
-    def __init__(self, g: nx.Graph):
-        self.g = g
-        self.adj_mat = nx.adjacency_matrix(self.g)
-        self.precision_mat = self.adj_mat + sparse.eye(self.adj_mat.shape[0])
-        self.correlation_mat = sparse.linalg.inv(self.precision_mat)
+    @property
+    def correlation_mat(self):
+        """Inverse of the precision matrix. It is dense in general, and sampling
+        does not need it."""
+        return sparse.linalg.inv(sparse.csc_matrix(self.precision_mat))
+
+    def iter_samples(self, count, block_size=None, rng=None):
+        """Draw ``count`` samples of N(0, precision_mat^-1), block by block.
+
+        Args:
+            count (int): Total number of samples.
+            block_size (int): Number of samples per block. Defaults to about
+                4M values per block, whatever the number of nodes.
+            rng (np.random.Generator): Source of randomness. Defaults to the
+                global ``np.random`` state.
+
+        Yields:
+            samples (np.ndarray): Array of shape ``(n_nodes, block_size)``; the
+                last block may be smaller.
+        """
+        if block_size is None:
+            block_size = max(1, 2**22 // self.precision_mat.shape[0])
+        for start in range(0, count, block_size):
+            yield self.factor.sample(min(block_size, count - start), rng=rng)
 
     def __str__(self):
-        return "GraphStorage(%s)" % self.g
+        n_edges = sparse.triu(self.adj_mat).nnz
+        return f"GraphStorage({self.adj_mat.shape[0]} nodes, {n_edges} edges)"
 
     def __repr__(self):
-        t = type(self.g)
-        return f"{t} object, with {self.g.number_of_nodes()} nodes and {self.g.number_of_edges()} edges, at {hex(id(self.g))}"
+        n_edges = sparse.triu(self.adj_mat).nnz
+        return f"GraphStorage object, with {self.adj_mat.shape[0]} nodes and {n_edges} edges, at {hex(id(self))}"
 
     # need a __repr__ method to print things out elegantly
 
 
+def _read_edgelist(path, comments="#", delimiter=" "):
+    """Parse an edge list into a symmetric CSR adjacency matrix.
+
+    Returns:
+        adj_mat (sparse.csr_matrix): Weighted adjacency matrix.
+        nodes (np.ndarray): Node label of each row, by first appearance.
+    """
+    try:
+        edges = pd.read_csv(
+            path,
+            sep=r"\s+" if delimiter in (None, " ") else delimiter,
+            comment=comments,
+            header=None,
+            dtype=np.float64,
+        ).to_numpy()
+    except pd.errors.EmptyDataError:
+        edges = np.empty((0, 3))
+    weights = edges[:, 2] if edges.shape[1] > 2 else np.ones(len(edges))
+    # Interleave u and v so that factorize numbers nodes by first appearance.
+    codes, nodes = pd.factorize(edges[:, :2].astype(np.int64).ravel())
+    u, v = codes[0::2], codes[1::2]
+    # A repeated edge keeps its last weight, whatever its direction.
+    lo, hi = np.minimum(u, v), np.maximum(u, v)
+    n = len(nodes)
+    _, last = np.unique((lo * n + hi)[::-1], return_index=True)
+    keep = len(lo) - 1 - last
+    lo, hi, weights = lo[keep], hi[keep], weights[keep]
+    off = lo != hi
+    rows = np.concatenate([lo, hi[off]])
+    cols = np.concatenate([hi, lo[off]])
+    data = np.concatenate([weights, weights[off]])
+    adj_mat = sparse.csr_matrix((data, (rows, cols)), shape=(n, n))
+    return adj_mat, nodes
+
+
+def _load_edgelist(path, comments="#", delimiter=" ", cache=True):
+    """Load an edge list as a :class:`GraphStorage`, through its ``.csr.npz``
+    cache when it is up to date."""
+    stat = os.stat(path)
+    source = np.array(
+        json.dumps(
+            {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "comments": comments,
+                "delimiter": delimiter,
+            }
+        )
+    )
+    cache_path = Path(f"{path}.csr.npz")
+    if cache and cache_path.exists():
+        with np.load(cache_path, allow_pickle=False) as npz:
+            if npz["source"] == source:
+                adj_mat = sparse.csr_matrix(
+                    (npz["data"], npz["indices"], npz["indptr"]),
+                    shape=tuple(npz["shape"]),
+                )
+                return GraphStorage(adj_mat=adj_mat, nodes=npz["nodes"])
+    adj_mat, nodes = _read_edgelist(path, comments, delimiter)
+    if cache:
+        arrays = {
+            "data": adj_mat.data,
+            "indices": adj_mat.indices,
+            "indptr": adj_mat.indptr,
+            "shape": np.array(adj_mat.shape),
+            "nodes": nodes,
+            "source": source,
+        }
+        try:
+            _atomic_write(cache_path, lambda f: np.savez(f, **arrays))
+        except OSError:
+            pass  # A read-only directory only costs the next reload.
+    return GraphStorage(adj_mat=adj_mat, nodes=nodes)
+
+
 class DataHandler(GraphStorage):
     def __init__(self, sparse=True):
         self.inverse_sigmas = []
@@ -44,20 +181,55 @@ class DataHandler(GraphStorage):
         self.num_nodes = 0
         self.graph_paths = []
 
-    def from_edgelist(self, path, comments="#", delimiter=" "):
+    def from_edgelist(self, path, comments="#", delimiter=" ", cache=True):
+        """Load a weighted edge list, with lines ``u v [weight]``.
+
+        The file is parsed straight into a sparse adjacency matrix; the
+        networkx graph is only built if :attr:`GraphStorage.g` is accessed.
+        Nodes are ordered by first appearance, as in ``nx.read_edgelist``.
+
+        Args:
+            path (str): Edge list file.
+            comments (str): Character marking the start of a comment.
+            delimiter (str): Column separator; None for any whitespace.
+            cache (boolean): Whether to store the parsed matrix in a
+                ``.csr.npz`` file next to ``path`` and reuse it while ``path``
+                is unchanged.
+
+        Returns:
+            graph (GraphStorage): The network, also appended to :attr:`graphs`.
+        """
+        graph = _load_edgelist(path, comments, delimiter, cache)
         self.graph_paths.append(path)
-        g = nx.read_edgelist(
-            path,
-            comments=comments,
-            delimiter=delimiter,
-            nodetype=int,
-            data=(("weight", float),),
-        )
-        if g.number_of_nodes() > self.num_nodes:
-            self.num_nodes = g.number_of_nodes()
+        self.num_nodes = max(self.num_nodes, graph.adj_mat.shape[0])
+        self.graphs.append(graph)
+        return graph
 
-        self.graphs.append(GraphStorage(g))
-        return GraphStorage(g)
+    def from_directory(
+        self, path, pattern="*.txt", comments="#", delimiter=" ", cache=True
+    ):
+        """Load every edge list of a directory in parallel, sorted by name.
+
+        Args:
+            path (str): Directory.
+            pattern (str): Glob pattern of the edge list files.
+            comments, delimiter, cache: See :meth:`from_edgelist`.
+
+        Returns:
+            graphs (list): The :class:`GraphStorage` of each file.
+        """
+        paths = [str(p) for p in sorted(Path(path).glob(pattern))]
+        with ThreadPoolExecutor() as executor:
+            graphs = list(
+                executor.map(
+                    lambda p: _load_edgelist(p, comments, delimiter, cache), paths
+                )
+            )
+        for p, graph in zip(paths, graphs, strict=True):
+            self.graph_paths.append(p)
+            self.num_nodes = max(self.num_nodes, graph.adj_mat.shape[0])
+            self.graphs.append(graph)
+        return graphs
 
     # """ Reads a network in given file and generates
     #     inverse covariance matrices. Expected format for
@@ -93,72 +265,114 @@ class DataHandler(GraphStorage):
     #         print(sigma)
     #         print(np.shape(sigma))
     #         print(network)
-    def generate_mvn(self, counts=[100, 100], save_to_file=False):
-        if len(counts) is not len(self.graphs):
+    def iter_mvn(self, counts, block_size=None, rng=None):
+        """Stream samples from every network, without holding them all in memory.
+
+        Args:
+            counts (list): Number of samples to draw from each network.
+            block_size (int): Number of samples per block, see
+                :meth:`GraphStorage.iter_samples`.
+            rng (np.random.Generator): Source of randomness. Defaults to the
+                global ``np.random`` state.
+
+        Returns:
+            blocks (generator): Yields ``(start, samples)``, where ``samples`` of
+                shape ``(n_nodes, k)`` are columns ``start`` to ``start + k`` of
+                the output of :meth:`generate_mvn`.
+
+        Raises:
+            ValueError: If a network does not have :attr:`num_nodes` nodes.
+        """
+        if len(counts) != len(self.graphs):
             raise ValueError("Counts do not match the number of networks.")
+        for k, graph in enumerate(self.graphs):
+            if graph.adj_mat.shape[0] != self.num_nodes:
+                raise ValueError(
+                    f"Network {k} has {graph.adj_mat.shape[0]} nodes, "
+                    f"not {self.num_nodes}."
+                )
+        return self._iter_mvn(counts, block_size, rng)
 
-        z = np.zeros((self.num_nodes, sum(counts)), dtype=np.float64)
-        cumsum_z = np.cumsum(counts)
-        for idx, (graph, count) in enumerate(zip(self.graphs, counts)):
-            x = np.random.multivariate_normal(
-                np.zeros(self.num_nodes),  # TODO: generalize this
-                graph.correlation_mat.todense(),
-                count,
-            ).T
-            if idx == 0:
-                z[:, : cumsum_z[idx]] = x
-            else:
-                z[:, cumsum_z[idx - 1] : cumsum_z[idx]] = x
+    def _iter_mvn(self, counts, block_size, rng):
+        start = 0
+        for graph, count in zip(self.graphs, counts, strict=True):
+            for x in graph.iter_samples(count, block_size, rng):
+                yield start, x
+                start += x.shape[1]
 
+    def generate_mvn(self, counts=[100, 100], save_to_file=False):
         if save_to_file:
             _datetime = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-            filename = f"synthetic_data/{sum(counts)}-{'_'.join([str(i) for i in counts])}-n_{self.num_nodes}-{_datetime}.csv"
-
+            filename = f"synthetic_data/{sum(counts)}-{'_'.join([str(i) for i in counts])}-n_{self.num_nodes}-{_datetime}.npy"
             print("Saving data to %s" % filename)
-            graph_paths = " ".join(self.graph_paths)
-            np.savetxt(
-                filename,
-                z,
-                delimiter=",",
-                header=f"Data generated from networks:{graph_paths}",
-            )
+            self.write_mvn(filename, counts)
+            return load_samples(filename)[0]
+
+        blocks = self.iter_mvn(counts)
+        z = np.zeros((self.num_nodes, sum(counts)), dtype=np.float64)
+        for start, x in blocks:
+            z[:, start : start + x.shape[1]] = x
         return z
 
+    def write_mvn(self, path, counts, seed=None, block_size=None, dtype="float64"):
+        """Sample from every network straight to a chunked file.
+
+        Memory use is bounded by the block size, whatever ``sum(counts)``. The
+        output loads back with :func:`load_samples` without being read.
+
+        Args:
+            path (str): Output file, ending in ``.npy``, ``.h5``/``.hdf5`` or
+                ``.zarr`` (see :class:`SampleWriter`).
+            counts (list): Number of samples to draw from each network.
+            seed (int): Seed of the samples. A fresh one is drawn, and recorded,
+                if None.
+            block_size (int): Number of samples generated at once.
+            dtype (str): Data type of the stored samples.
+
+        Returns:
+            metadata (dict): The provenance stored with the samples.
+        """
+        seed = np.random.SeedSequence(seed).entropy
+        blocks = self.iter_mvn(counts, block_size, np.random.default_rng(seed))
+        metadata = {
+            "graph_paths": self.graph_paths,
+            "counts": list(counts),
+            "seed": seed,
+            "num_nodes": self.num_nodes,
+            "created": datetime.datetime.now().isoformat(),
+        }
+        shape = (self.num_nodes, sum(counts))
+        with SampleWriter(path, shape, dtype=dtype, metadata=metadata) as writer:
+            for start, x in blocks:
+                writer.write(start, x)
+        return metadata
+
     """ Generates a data file (.csv) from networks previously defined in
         self.sigmas (covariance matrix) """
 
-    def generate_real_data(self, counts=[100, 100]):
+    def generate_real_data(self, counts=[100, 100], block_size=4096):
         if len(counts) is not len(self.sigmas):
             raise Exception("Lengths of networks and data lengths do not match.")
-        z = None
-        total_count = 0
-        for sigma, datacount in zip(self.sigmas, counts):
-            x = np.random.multivariate_normal(
-                np.zeros(self.dimension), sigma, datacount
-            )
-            total_count += datacount
-            if z is None:
-                z = x
-            else:
-                z = np.vstack((z, x))
         filename = "synthetic_data/{}x{}_{}.csv".format(
-            total_count,
+            sum(counts),
             self.dimension,
             datetime.datetime.now().strftime("%Y%m%d%H%M%S"),
         )
         header = "# Data generated from networks:\n# "
-        for f, datacount in zip(self.network_files, counts):
+        # ``network_files`` is no longer filled in, so it can be shorter.
+        for f, datacount in zip(self.network_files, counts, strict=False):
             header += f"{f}: {datacount}, "
         header = header[:-2]
         header += "\n"
         with open(filename, "w") as new_file:
             new_file.write(header)
-            for datarow in z:
-                line = ""
-                for value in datarow:
-                    line += "," + str(f"{value:.4f}")
-                line = line[1:]
-                new_file.write("%s\n" % line)
+            for sigma, datacount in zip(self.sigmas, counts, strict=True):
+                L = np.linalg.cholesky(sigma)
+                for start in range(0, datacount, block_size):
+                    xs = np.random.normal(
+                        size=(min(block_size, datacount - start), self.dimension)
+                    )
+                    np.savetxt(new_file, xs @ L.T, fmt="%.4f", delimiter=",")
 
     """ Converts a network into matrix form """
 
@@ -173,140 +387,55 @@ class DataHandler(GraphStorage):
                     f.write("\n")
                 f.write("\n\n")
 
-    """ Creates a file containing results, with network details,
-        from converged algorithm instance """
-
-    def write_network_results(self, datafile, solver, splitter=","):
-        run_time = datetime.datetime.now()
-        results_name = "network_results/{}_la{}be{}_{}.csv".format(
-            solver.__class__.__name__,
-            int(solver.lambd),
-            int(solver.beta),
-            run_time.strftime("%Y%m%d%H%M%S"),
-        )
-        """ Read features """
+    def _read_features(self, datafile, splitter=","):
         with open(datafile) as f:
-            for i, line in enumerate(f):
-                if i == 0:
-                    feats = line.strip().split(splitter)[1:]
-                    break
-        features = {}
-        for i, feat in enumerate(feats):
-            features[i] = feat
-        """ Write Results """
-        with open(results_name, "w") as f:
-            f.write("# Information\n")
-            f.write("Run datetime, %s\n" % run_time.strftime("%Y-%m-%d %H:%M:%S"))
-            f.write("Data file, %s\n" % datafile)
-            f.write("Solver type, %s\n" % solver.__class__.__name__)
-            f.write("Penalty function, %s\n" % solver.penalty_function)
-            f.write("Data dimension, %s\n" % solver.dimension)
-            f.write("Blocks, %s\n" % solver.blocks)
-            f.write("Observations in a block, %s\n" % solver.obs)
-            f.write("Rho, %s\n" % solver.rho)
-            f.write("Beta, %s\n" % solver.beta)
-            f.write("Lambda, %s\n" % solver.lambd)
-            f.write("Processes used, %s\n" % solver.processes)
-            f.write("\n")
-            f.write("# Results\n")
-            f.write("Algorithm run time, %s seconds\n" % solver.run_time)
-            f.write("Iterations to complete, %s\n\n" % solver.iteration)
-            try:
-                f.write(
-                    "Temporal deviations ratio (max/mean), {:.3f}\n".format(
-                        solver.dev_ratio
-                    )
-                )
-            except ValueError:
-                f.write("Temporal deviations ratio (max/mean), %s\n" % solver.dev_ratio)
-            f.write("Temporal deviations ")
-            for dev in solver.deviations:
-                try:
-                    f.write(f",{dev:.3f}")
-                except ValueError:
-                    f.write(",%s" % dev)
-            f.write("\nNormalized Temporal deviations ")
-            for dev in solver.norm_deviations:
-                try:
-                    f.write(f",{dev:.3f}")
-                except ValueError:
-                    f.write(",%s" % dev)
-            """ Write networks """
-            f.write("\n\n#Networks:\n\n")
-            for k in range(solver.blocks):
-                f.write("Block %s," % k)
-                f.write(solver.blockdates[k] + "\n")
-                if k > 0:
-                    f.write("Dev to prev,")
-                    f.write(f"{solver.deviations[k - 1]:.3f},")
-                if k < solver.blocks - 1:
-                    f.write("Dev to next,")
-                    f.write(f"{solver.deviations[k]:.3f}")
-                f.write("\n")
-                for feat in feats:
-                    f.write("," + feat)
-                f.write("\n")
-                for i in range(solver.dimension):
-                    f.write(features[i])
-                    for j in range(solver.dimension):
-                        f.write("," + str(solver.thetas[k][i, j]))
-                    f.write("\n")
-                f.write("\n\n")
+            return f.readline().strip().split(splitter)[1:]
+
+    def write_network_results(
+        self,
+        datafile,
+        solver,
+        splitter=",",
+        store="network_results/results.h5",
+        csv=False,
+    ):
+        """Append the results of a converged solver, with its networks, to a
+        :class:`ResultsStore`.
 
-    """ Creates a file containing results, without network details,
-        from converged solver instance """
+        Args:
+            datafile (str): Data the solver was fitted on; its header names
+                the features.
+            solver (TimeVaryingGraphicalLasso): Fitted solver.
+            splitter (str): Delimiter of ``datafile``.
+            store (str): The results container; its suffix selects the format.
+            csv (boolean): Whether to also export the run as a CSV report next
+                to ``store``.
 
-    def write_results(self, datafile, solver, splitter=","):
-        run_time = datetime.datetime.now()
-        results_name = "results/{}_la{}be{}_{}.csv".format(
-            solver.__class__.__name__,
-            int(solver.lambd),
-            int(solver.beta),
-            run_time.strftime("%Y%m%d%H%M%S"),
+        Returns:
+            name (str): Name of the run in ``store``.
+        """
+        results = ResultsStore(store)
+        name = results.write(
+            solver, datafile, features=self._read_features(datafile, splitter)
         )
-        with open(results_name, "w") as f:
-            f.write("# Information\n")
-            f.write("Run datetime, %s\n" % run_time.strftime("%Y-%m-%d %H:%M:%S"))
-            f.write("Data file, %s\n" % datafile)
-            f.write("Solver type, %s\n" % solver.__class__.__name__)
-            f.write("Penalty function, %s\n" % solver.penalty_function)
-            f.write("Data dimension, %s\n" % solver.dimension)
-            f.write("Blocks, %s\n" % solver.blocks)
-            f.write("Observations in a block, %s\n" % solver.obs)
-            f.write("Rho, %s\n" % solver.rho)
-            f.write("Beta, %s\n" % solver.beta)
-            f.write("Lambda, %s\n" % solver.lambd)
-            f.write("Processes used, %s\n" % solver.processes)
-            f.write("Total edges, %s\n" % solver.real_edges)
-            f.write("Total edgeless, %s\n" % solver.real_edgeless)
-            f.write("\n")
-            f.write("# Results\n")
-            f.write("Algorithm run time, %s seconds\n" % solver.run_time)
-            f.write("Iterations to complete, %s\n\n" % solver.iteration)
-            f.write("Correct positive edges, %s\n" % solver.correct_positives)
-            f.write("All positives, %s\n" % solver.all_positives)
-            f.write(f"F1 Score, {solver.f1score:.3f}\n")
-            try:
-                f.write(
-                    "Temporal deviations ratio (max/mean), {:.3f}\n".format(
-                        solver.dev_ratio
-                    )
-                )
-            except ValueError:
-                f.write("Temporal deviations ratio (max/mean), %s\n" % solver.dev_ratio)
-            f.write("Temporal deviations ")
-            for dev in solver.deviations:
-                try:
-                    f.write(f",{dev:.3f}")
-                except ValueError:
-                    f.write(",%s" % dev)
-            f.write("\nNormalized Temporal deviations ")
-            for dev in solver.norm_deviations:
-                try:
-                    f.write(f",{dev:.3f}")
-                except ValueError:
-                    f.write(",%s" % dev)
-            f.write("\n")
+        if csv:
+            results.export_csv(name, Path(store).with_name(f"{name}.csv"))
+        return name
+
+    def write_results(
+        self, datafile, solver, splitter=",", store="results/results.h5", csv=False
+    ):
+        """Like :meth:`write_network_results`, without the networks."""
+        results = ResultsStore(store)
+        name = results.write(
+            solver,
+            datafile,
+            features=self._read_features(datafile, splitter),
+            networks=False,
+        )
+        if csv:
+            results.export_csv(name, Path(store).with_name(f"{name}.csv"))
+        return name
 
 
 if __name__ == "__main__" and len(sys.argv) % 2 == 1:
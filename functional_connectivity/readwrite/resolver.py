@@ -0,0 +1,189 @@
+import asyncio
+import threading
+import weakref
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_DANDI = "https://api.dandiarchive.org/api/"
+
+
+class DandiResolver:
+    """Concurrent, memoized resolution of DANDI metadata and asset URLs.
+
+    Requests go through one pooled ``requests.Session`` and are run
+    concurrently from ``asyncio`` coroutines, at most ``max_connections`` at a
+    time. Every JSON response is memoized by URL, and concurrent requests for
+    the same URL share a single round-trip.
+
+    The coroutines (``get_*``, :meth:`resolve`, :meth:`resolve_many`) can be
+    awaited from a running event loop; :meth:`run` executes one from
+    synchronous code.
+
+    Args:
+        api_url (str): Root of the DANDI REST API.
+        max_connections (int): Maximum number of requests in flight.
+        timeout (float): Timeout of each request, in seconds.
+    """
+
+    def __init__(self, api_url=API_DANDI, max_connections=16, timeout=30):
+        self.api_url = api_url.rstrip("/") + "/"
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=max_connections, pool_maxsize=max_connections
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._memo = {}
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._background_loop = None
+
+    def __repr__(self):
+        return f"DandiResolver({self.api_url!r}, {len(self._memo)} memoized responses)"
+
+    def run(self, coroutine):
+        """Run ``coroutine`` to completion from synchronous code.
+
+        When called while an event loop is running in this thread (e.g. from a
+        Jupyter notebook), the coroutine runs on a background event loop owned
+        by the resolver, and this call blocks until it completes.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop()).result()
+
+    def _loop(self):
+        with self._lock:
+            if self._background_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="DandiResolver", daemon=True
+                ).start()
+                self._background_loop = loop
+            return self._background_loop
+
+    def _get_json(self, url):
+        with self._lock:
+            if url in self._memo:
+                return self._memo[url]
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        document = response.json()
+        with self._lock:
+            self._memo[url] = document
+        return document
+
+    async def get_json(self, url):
+        """Fetch (or recall) the JSON document at ``url``."""
+        if url in self._memo:
+            return self._memo[url]
+        # Requests for the same URL in this event loop share one task.
+        loop = asyncio.get_running_loop()
+        key = (loop, url)
+        if key not in self._in_flight:
+            self._in_flight[key] = loop.create_task(self._fetch(url))
+        try:
+            return await asyncio.shield(self._in_flight[key])
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def _fetch(self, url):
+        async with self._semaphore():
+            return await asyncio.to_thread(self._get_json, url)
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_connections)
+        return self._semaphores[loop]
+
+    def _url(self, *parts, **query):
+        url = self.api_url + "".join(f"{part}/" for part in parts)
+        return url + ("?" + urlencode(query) if query else "")
+
+    async def get_dandiset(self, dandiset_id):
+        """Metadata of a dandiset, as in ``/dandisets/{id}/``."""
+        return await self.get_json(self._url("dandisets", dandiset_id, format="json"))
+
+    async def get_assets(self, dandiset_id, version_id="draft", path=None):
+        """List the assets of a version, following the API pagination."""
+        query = {"page_size": 1000}
+        if path is not None:
+            query["path"] = path
+        url = self._url(
+            "dandisets", dandiset_id, "versions", version_id, "assets", **query
+        )
+        assets = []
+        while url is not None:
+            page = await self.get_json(url)
+            assets.extend(page["results"])
+            url = page.get("next")
+        return assets
+
+    async def get_asset_metadata(self, dandiset_id, version_id, asset_id):
+        """Full metadata of an asset, including ``contentUrl`` and ``contentSize``."""
+        return await self.get_json(
+            self._url(
+                "dandisets", dandiset_id, "versions", version_id, "assets", asset_id
+            )
+        )
+
+    async def resolve(self, dandiset_id, version_id, path):
+        """Resolve an asset path to its S3 URL and size.
+
+        Returns:
+            asset (dict): With keys ``asset_id``, ``s3_url`` and ``content_size``.
+        """
+        matches = [
+            asset
+            for asset in await self.get_assets(dandiset_id, version_id, path=path)
+            if asset["path"] == path
+        ]
+        if not matches:
+            raise FileNotFoundError(
+                f"No asset {path!r} in dandiset {dandiset_id} ({version_id})."
+            )
+        asset_id = matches[0]["asset_id"]
+        metadata = await self.get_asset_metadata(dandiset_id, version_id, asset_id)
+        api_host = urlsplit(self.api_url).netloc
+        s3_urls = [
+            url for url in metadata["contentUrl"] if urlsplit(url).netloc != api_host
+        ]
+        if not s3_urls:
+            raise ValueError(f"Asset {asset_id} has no direct content URL.")
+        return {
+            "asset_id": asset_id,
+            "s3_url": s3_urls[0],
+            "content_size": metadata["contentSize"],
+        }
+
+    async def resolve_many(self, dandiset_id, version_id, paths):
+        """Resolve many asset paths concurrently.
+
+        Returns:
+            assets (dict): Mapping from path to the output of :meth:`resolve`,
+                or to the exception raised while resolving it.
+        """
+        results = await asyncio.gather(
+            *(self.resolve(dandiset_id, version_id, path) for path in paths),
+            return_exceptions=True,
+        )
+        return dict(zip(paths, results, strict=True))
+
+
+_default_resolver = None
+
+
+def get_default_resolver():
+    """The resolver shared by every :class:`DandiHandler` of this process."""
+    global _default_resolver
+    if _default_resolver is None:
+        _default_resolver = DandiResolver()
+    return _default_resolver
@@ -0,0 +1,276 @@
+try:
+    import zarr
+except ImportError:
+    zarr = None
+
+import datetime
+import json
+from pathlib import Path
+
+import h5py
+import numpy as np
+import pandas as pd
+
+FORMATS = {".h5": "hdf5", ".hdf5": "hdf5", ".zarr": "zarr"}
+
+# Solver attributes recorded with each run, when the solver has them.
+_SOLVER_ATTRS = (
+    "penalty_function",
+    "dimension",
+    "blocks",
+    "obs",
+    "rho",
+    "beta",
+    "lambd",
+    "processes",
+    "run_time",
+    "iteration",
+    "dev_ratio",
+    "blockdates",
+    "real_edges",
+    "real_edgeless",
+    "correct_positives",
+    "all_positives",
+    "f1score",
+)
+
+
+def _infer_format(path):
+    try:
+        return FORMATS[Path(path).suffix]
+    except KeyError as err:
+        raise ValueError(
+            f"Cannot infer the format of {path!r}; use one of {sorted(FORMATS)}."
+        ) from err
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (np.ndarray, list, tuple)):
+        return [_to_json(v) for v in value]
+    return value
+
+
+class ResultsStore:
+    """A chunked, compressed container of solver runs.
+
+    Each run is a group holding the run metadata, the ``deviations`` and
+    ``norm_deviations`` of the solver and its stacked ``thetas``, chunked one
+    block at a time so that a single block is read (and decompressed) without
+    touching the others. Runs are appended to the container:
+
+    - ``.h5`` / ``.hdf5``: one HDF5 group per run, metadata in its attributes;
+    - ``.zarr``: one Zarr group per run, metadata in its attributes (needs
+      ``zarr``, version 2 or 3).
+
+    Args:
+        path (str or Path): The container; its suffix selects the format.
+        compression (str): HDF5 compression filter of the arrays. Zarr arrays
+            use the default Zarr codecs.
+    """
+
+    def __init__(self, path, compression="gzip"):
+        self.path = Path(path)
+        self.format = _infer_format(path)
+        self.compression = compression
+        if self.format == "zarr" and zarr is None:
+            raise ImportError("Reading and writing .zarr files requires zarr.")
+
+    def __repr__(self):
+        return f"ResultsStore({str(self.path)!r}, format={self.format!r})"
+
+    def _open(self, mode):
+        if self.format == "hdf5":
+            return h5py.File(self.path, mode)
+        return zarr.open_group(str(self.path), mode=mode)
+
+    def runs(self):
+        """Names of the runs, in the order they were written."""
+        if not self.path.exists():
+            return []
+        if self.format == "hdf5":
+            with self._open("r") as f:
+                names = list(f)
+        else:
+            names = list(self._open("r").group_keys())
+        return sorted(names, key=lambda name: self.metadata(name)["index"])
+
+    def write(self, solver, datafile=None, features=None, name=None, networks=True):
+        """Append the results of a converged solver as a new run.
+
+        Args:
+            solver (BaseGraphicalLasso): Fitted solver, typically a
+                :class:`TimeVaryingGraphicalLasso`.
+            datafile (str): Data the solver was fitted on, for the record.
+            features (list): Name of each feature. Defaults to their index.
+            name (str): Name of the run. Defaults to the solver class,
+                ``lambd``, ``beta`` and time of the run.
+            networks (boolean): Whether to store the ``thetas``; a summary of
+                the run is stored either way.
+
+        Returns:
+            name (str): Name of the new run.
+        """
+        run_time = datetime.datetime.now()
+        thetas = getattr(solver, "thetas", None)
+        if thetas is None:
+            thetas = np.asarray(solver.precision_)[None]
+        thetas = np.asarray(thetas, dtype=np.float64)
+        if features is None:
+            features = [str(i) for i in range(thetas.shape[-1])]
+        if len(features) != thetas.shape[-1]:
+            raise ValueError(
+                f"{len(features)} features for networks of {thetas.shape[-1]} nodes."
+            )
+        metadata = {
+            "run_datetime": run_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "datafile": None if datafile is None else str(datafile),
+            "solver": solver.__class__.__name__,
+            "features": list(features),
+            **{
+                attr: _to_json(getattr(solver, attr))
+                for attr in _SOLVER_ATTRS
+                if hasattr(solver, attr)
+            },
+        }
+        arrays = {
+            "deviations": np.asarray(getattr(solver, "deviations", [])),
+            "norm_deviations": np.asarray(getattr(solver, "norm_deviations", [])),
+        }
+        if networks:
+            arrays["thetas"] = thetas
+
+        existing = self.runs()
+        metadata["index"] = len(existing)
+        if name is None:
+            name = "{}_la{:g}be{:g}_{}".format(
+                metadata["solver"],
+                getattr(solver, "lambd", 0),
+                getattr(solver, "beta", 0),
+                run_time.strftime("%Y%m%d%H%M%S"),
+            )
+            base, k = name, 1
+            while name in existing:
+                name, k = f"{base}_{k}", k + 1
+        elif name in existing:
+            raise ValueError(f"A run named {name!r} already exists in {self.path}.")
+
+        if self.format == "hdf5":
+            with self._open("a") as f:
+                group = f.create_group(name)
+                group.attrs["metadata"] = json.dumps(metadata)
+                for key, value in arrays.items():
+                    group.create_dataset(
+                        key,
+                        data=value,
+                        chunks=(1, *value.shape[1:]) if value.ndim == 3 else None,
+                        compression=self.compression if value.size else None,
+                    )
+        else:
+            group = self._open("a").create_group(name)
+            group.attrs["metadata"] = json.dumps(metadata)
+            for key, value in arrays.items():
+                chunks = (1, *value.shape[1:]) if value.ndim == 3 else None
+                if hasattr(group, "create_array"):
+                    array = group.create_array(
+                        name=key,
+                        shape=value.shape,
+                        dtype=value.dtype,
+                        chunks=chunks or "auto",
+                    )
+                else:
+                    # zarr 2
+                    array = group.create_dataset(
+                        key, shape=value.shape, dtype=value.dtype, chunks=chunks or True
+                    )
+                array[...] = value
+        return name
+
+    def metadata(self, name):
+        """Metadata of the run ``name``."""
+        if self.format == "hdf5":
+            with self._open("r") as f:
+                return json.loads(f[name].attrs["metadata"])
+        return json.loads(self._open("r")[name].attrs["metadata"])
+
+    def read(self, name, key):
+        """Open the array ``key`` of the run ``name`` without reading it.
+
+        Returns:
+            array (array-like): A read-only ``h5py.Dataset`` or ``zarr.Array``.
+                An HDF5 dataset keeps its file open until it is garbage
+                collected.
+        """
+        return self._open("r")[name][key]
+
+    def read_block(self, name, k):
+        """``thetas[k]`` of the run ``name``, reading only its chunk."""
+        if self.format == "hdf5":
+            with self._open("r") as f:
+                return f[name]["thetas"][k]
+        return self.read(name, "thetas")[k]
+
+    def export_csv(self, name, path):
+        """Write the run ``name`` as a CSV report, one matrix per block."""
+        metadata = self.metadata(name)
+        features = metadata["features"]
+        deviations = np.asarray(self.read(name, "deviations"))
+        norm_deviations = np.asarray(self.read(name, "norm_deviations"))
+        labels = {
+            "run_datetime": "Run datetime",
+            "datafile": "Data file",
+            "solver": "Solver type",
+            "penalty_function": "Penalty function",
+            "dimension": "Data dimension",
+            "blocks": "Blocks",
+            "obs": "Observations in a block",
+            "rho": "Rho",
+            "beta": "Beta",
+            "lambd": "Lambda",
+            "processes": "Processes used",
+            "real_edges": "Total edges",
+            "real_edgeless": "Total edgeless",
+        }
+        results = {
+            "run_time": "Algorithm run time",
+            "iteration": "Iterations to complete",
+            "correct_positives": "Correct positive edges",
+            "all_positives": "All positives",
+            "f1score": "F1 Score",
+            "dev_ratio": "Temporal deviations ratio (max/mean)",
+        }
+        with open(path, "w") as f:
+            f.write("# Information\n")
+            for key, label in labels.items():
+                if key in metadata:
+                    f.write(f"{label}, {metadata[key]}\n")
+            f.write("\n# Results\n")
+            for key, label in results.items():
+                if key in metadata:
+                    f.write(f"{label}, {metadata[key]}\n")
+            f.write("Temporal deviations ")
+            f.write("".join(f",{dev:.3f}" for dev in deviations))
+            f.write("\nNormalized Temporal deviations ")
+            f.write("".join(f",{dev:.3f}" for dev in norm_deviations))
+            f.write("\n")
+            if "thetas" not in self._keys(name):
+                return
+            f.write("\n#Networks:\n\n")
+            thetas = self.read(name, "thetas")
+            blockdates = metadata.get("blockdates") or range(len(thetas))
+            for k, date in enumerate(blockdates):
+                f.write(f"Block {k},{date}\n")
+                if k > 0:
+                    f.write(f"Dev to prev,{deviations[k - 1]:.3f},")
+                if k < len(thetas) - 1:
+                    f.write(f"Dev to next,{deviations[k]:.3f}")
+                f.write("\n")
+                pd.DataFrame(thetas[k], index=features, columns=features).to_csv(f)
+                f.write("\n\n")
+
+    def _keys(self, name):
+        if self.format == "hdf5":
+            with self._open("r") as f:
+                return list(f[name])
+        return list(self._open("r")[name].array_keys())
@@ -0,0 +1,129 @@
+try:
+    import zarr
+except ImportError:
+    zarr = None
+
+import json
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+FORMATS = {".npy": "npy", ".h5": "hdf5", ".hdf5": "hdf5", ".zarr": "zarr"}
+
+
+def _chunks(shape, itemsize, chunk, chunk_bytes):
+    """Chunks of up to ``chunk`` samples and about ``chunk_bytes`` bytes."""
+    n_nodes, n_samples = shape
+    columns = max(1, min(chunk, n_samples, chunk_bytes // itemsize))
+    rows = max(1, min(n_nodes, chunk_bytes // (itemsize * columns)))
+    return rows, columns
+
+
+def _infer_format(path):
+    try:
+        return FORMATS[Path(path).suffix]
+    except KeyError as err:
+        raise ValueError(
+            f"Cannot infer the format of {path!r}; use one of {sorted(FORMATS)}."
+        ) from err
+
+
+class SampleWriter:
+    """A preallocated on-disk array of samples, filled block by block.
+
+    Samples are stored as an array of shape ``(n_nodes, n_samples)``, the layout
+    of :meth:`DataHandler.generate_mvn`, and chunked along the samples so that
+    each block of columns is written contiguously. HDF5 and Zarr chunks span
+    as many nodes as fit in ``chunk_bytes``:
+
+    - ``.npy``: a Fortran-ordered memory-mapped file, with the metadata in a
+      ``.json`` file next to it;
+    - ``.h5`` / ``.hdf5``: an HDF5 dataset ``samples``, metadata in its attributes;
+    - ``.zarr``: a Zarr array, metadata in its attributes (needs ``zarr``).
+
+    Args:
+        path (str or Path): Output file; its suffix selects the format.
+        shape (tuple): ``(n_nodes, n_samples)``.
+        dtype (str): Data type of the samples.
+        chunk (int): Maximum number of samples per chunk, for HDF5 and Zarr.
+        chunk_bytes (int): Size budget of a chunk, for HDF5 and Zarr.
+        metadata (dict): JSON-serializable provenance information.
+    """
+
+    def __init__(
+        self,
+        path,
+        shape,
+        dtype="float64",
+        chunk=4096,
+        chunk_bytes=2**22,
+        metadata=None,
+    ):
+        self.path = Path(path)
+        self.format = _infer_format(path)
+        self.shape = tuple(shape)
+        self.metadata = metadata or {}
+        chunks = _chunks(self.shape, np.dtype(dtype).itemsize, chunk, chunk_bytes)
+        self._file = None
+        if self.format == "npy":
+            self.array = np.lib.format.open_memmap(
+                self.path, mode="w+", dtype=dtype, shape=self.shape, fortran_order=True
+            )
+            with open(f"{self.path}.json", "w") as f:
+                json.dump(self.metadata, f)
+        elif self.format == "hdf5":
+            self._file = h5py.File(self.path, "w")
+            self.array = self._file.create_dataset(
+                "samples", shape=self.shape, dtype=dtype, chunks=chunks
+            )
+            self.array.attrs["metadata"] = json.dumps(self.metadata)
+        else:
+            if zarr is None:
+                raise ImportError("Writing .zarr files requires zarr.")
+            self.array = zarr.open_array(
+                str(self.path), mode="w", shape=self.shape, chunks=chunks, dtype=dtype
+            )
+            self.array.attrs["metadata"] = self.metadata
+
+    def __repr__(self):
+        return f"SampleWriter({str(self.path)!r}, shape={self.shape}, format={self.format!r})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, start, block):
+        """Write ``block``, of shape ``(k, m)`` with ``k <= n_nodes``, at column ``start``."""
+        self.array[: block.shape[0], start : start + block.shape[1]] = block
+
+    def close(self):
+        if self.format == "npy":
+            self.array.flush()
+        elif self.format == "hdf5":
+            self._file.close()
+
+
+def load_samples(path):
+    """Open samples written by :class:`SampleWriter` without reading them.
+
+    Returns:
+        samples (array-like): A read-only ``np.memmap``, ``h5py.Dataset`` or
+            ``zarr.Array`` of shape ``(n_nodes, n_samples)``. An HDF5 dataset
+            keeps its file open until the dataset is garbage collected.
+        metadata (dict): The provenance information.
+    """
+    fmt = _infer_format(path)
+    if fmt == "npy":
+        with open(f"{path}.json") as f:
+            metadata = json.load(f)
+        return np.load(path, mmap_mode="r"), metadata
+    if fmt == "hdf5":
+        samples = h5py.File(path, "r")["samples"]
+        return samples, json.loads(samples.attrs["metadata"])
+    if zarr is None:
+        raise ImportError("Reading .zarr files requires zarr.")
+    samples = zarr.open_array(str(path), mode="r")
+    return samples, dict(samples.attrs["metadata"])
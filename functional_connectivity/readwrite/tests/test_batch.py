@@ -0,0 +1,88 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from functional_connectivity.readwrite.batch import batch_spike_counts
+from functional_connectivity.readwrite.cache import AssetCache, CacheMissError
+from functional_connectivity.readwrite.dandi_handler import DandiHandler
+
+
+def _seed(cache, filepath, blob_id, n_neurons, n_times):
+    url = f"https://dandiarchive.s3.amazonaws.com/blobs/000/000/{blob_id}"
+    cache.put_json(f"asset/000041/draft/{filepath}", {"s3_url": url, "content_size": 1})
+    data_array = xr.DataArray(
+        np.ones((n_neurons, n_times)),
+        coords={
+            "neuron": [str(i) for i in range(n_neurons)],
+            "time": pd.IntervalIndex.from_breaks(
+                np.arange(n_times + 1, dtype=np.float64), closed="left"
+            ),
+        },
+        dims=["neuron", "time"],
+    )
+    cache.put_array(cache.key(blob_id, time_to_bin=100), data_array)
+
+
+@pytest.mark.parametrize("backend", ["threads", "loky"])
+def test_batch_isolates_errors_and_resumes(tmp_path, backend):
+    cache = AssetCache(tmp_path)
+    cache.put_json("dandiset/000041", {})
+    _seed(cache, "a.nwb", "blob-a", 2, 3)
+    _seed(cache, "b.nwb", "blob-b", 3, 5)
+    cache.offline = True
+
+    filepaths = ["a.nwb", "missing.nwb", "b.nwb"]
+    result = batch_spike_counts(
+        "000041", filepaths, cache=cache, max_workers=2, backend=backend
+    )
+    assert list(result) == ["a.nwb", "b.nwb"]
+    assert isinstance(result.errors["missing.nwb"], CacheMissError)
+    assert result["b.nwb"].shape == (3, 5)
+
+    stacked = result.concat()
+    assert stacked.dims == ("asset", "neuron", "time")
+    assert stacked.shape == (2, 3, 5)
+    assert np.isnan(stacked.sel(asset="a.nwb", neuron="2")).all()
+    assert stacked.sel(asset="a.nwb").time_stop.values.tolist()[:3] == [1.0, 2.0, 3.0]
+
+    _seed(cache, "missing.nwb", "blob-c", 1, 1)
+    resumed = batch_spike_counts(
+        "000041", filepaths, cache=cache, backend=backend, resume=result
+    )
+    assert list(resumed) == filepaths
+    assert not resumed.errors
+
+
+def test_batch_recomputes_evicted_arrays(tmp_path, monkeypatch):
+    cache = AssetCache(tmp_path)
+    cache.put_json("dandiset/000041", {})
+    _seed(cache, "a.nwb", "blob-a", 2, 3)
+    _seed(cache, "b.nwb", "blob-b", 3, 5)
+    result = batch_spike_counts(
+        "000041", ["a.nwb", "b.nwb"], cache=cache, backend="threads"
+    )
+
+    # Room for one array: the least recently used one, of a.nwb, is evicted.
+    recent = time.time() + 60
+    os.utime(cache._array_path(cache.key("blob-b", time_to_bin=100)), (recent, recent))
+    cache.max_bytes = max(size for _, size in cache._entries())
+    cache.evict()
+    assert cache.get_array(cache.key("blob-a", time_to_bin=100)) is None
+    recomputed = []
+
+    def get_spike_counts(self, time_to_bin, stream=False):
+        recomputed.append((self.filepath, self.blob_id, time_to_bin))
+        return xr.DataArray(np.zeros((2, 3)), dims=["neuron", "time"])
+
+    monkeypatch.setattr(DandiHandler, "get_spike_counts", get_spike_counts)
+    assert result["b.nwb"].shape == (3, 5)
+    assert result["a.nwb"].shape == (2, 3)
+    assert recomputed == [("a.nwb", "blob-a", 100)]
+
+    cache.offline = True
+    with pytest.raises(KeyError, match="a.nwb"):
+        result["a.nwb"]
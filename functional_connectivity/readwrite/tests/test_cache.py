@@ -0,0 +1,146 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from functional_connectivity.readwrite.cache import AssetCache, CacheMissError
+from functional_connectivity.readwrite.dandi_handler import DandiHandler
+
+
+def _data_array(n_neurons=3, n_times=4):
+    return xr.DataArray(
+        np.arange(n_neurons * n_times, dtype=np.float64).reshape(n_neurons, n_times),
+        coords={
+            "neuron": [str(i) for i in range(n_neurons)],
+            "time": pd.IntervalIndex.from_breaks(
+                np.arange(n_times + 1, dtype=np.float64), closed="left"
+            ),
+            "label": ("time", np.array([b"a", b"b"] * (n_times // 2), dtype="S16")),
+            "shank_id": ("neuron", list(range(n_neurons))),
+        },
+        dims=["neuron", "time"],
+    )
+
+
+def test_array_round_trip(tmp_path):
+    cache = AssetCache(tmp_path)
+    key = cache.key("blob", time_to_bin=100)
+    assert key != cache.key("blob", time_to_bin=10)
+    assert cache.get_array(key) is None
+
+    data_array = _data_array()
+    cache.put_array(key, data_array)
+    xr.testing.assert_identical(cache.get_array(key), data_array)
+
+
+def test_offline_miss_raises(tmp_path):
+    cache = AssetCache(tmp_path, offline=True)
+    with pytest.raises(CacheMissError):
+        cache.get_array(cache.key("blob"))
+    with pytest.raises(CacheMissError):
+        cache.get_json("dandiset/000041")
+
+
+def test_lru_eviction(tmp_path):
+    cache = AssetCache(tmp_path)
+    keys = [cache.key("blob", time_to_bin=i) for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put_array(key, _data_array())
+        path = cache._array_path(key)
+        os.utime(path, (i, i))
+    cache.get_array(keys[0])  # refreshes the oldest entry
+
+    cache.max_bytes = 2 * cache._array_path(keys[0]).stat().st_size
+    cache.evict()
+    assert cache._array_path(keys[0]).exists()
+    assert not cache._array_path(keys[1]).exists()
+    assert cache._array_path(keys[2]).exists()
+
+
+# fsspec keeps the block cache file open until garbage collection
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnraisableExceptionWarning")
+def test_open_caches_byte_ranges(tmp_path):
+    pytest.importorskip("fsspec")
+    source = tmp_path / "asset.bin"
+    payload = os.urandom(10_000)
+    source.write_bytes(payload)
+
+    cache = AssetCache(tmp_path / "cache")
+    with cache.open(str(source), "blob-id", block_size=1024) as f:
+        f.seek(5000)
+        assert f.read(100) == payload[5000:5100]
+    assert any((tmp_path / "cache" / "blobs" / "blob-id").iterdir())
+
+
+def test_handler_offline(tmp_path):
+    cache = AssetCache(tmp_path)
+    cache.put_json("dandiset/000041", {"version": "draft"})
+    url = "https://dandiarchive.s3.amazonaws.com/blobs/ad8/b1e/ad8b1e79"
+    cache.put_json("asset/000041/draft/sub.nwb", {"s3_url": url, "content_size": 1024})
+    data_array = _data_array()
+    cache.put_array(cache.key("ad8b1e79", time_to_bin=100), data_array)
+
+    cache.offline = True
+    handler = DandiHandler("000041", cache=cache)
+    assert handler.get_all_versions() == ["draft"]
+    assert handler.get_s3_url("draft", "sub.nwb") == url
+    xr.testing.assert_identical(handler.get_spike_counts(100), data_array)
+    with pytest.raises(CacheMissError):
+        handler.get_spike_counts(10)
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnraisableExceptionWarning")
+def test_open_offline_reads_only_cached_blocks(tmp_path):
+    fsspec = pytest.importorskip("fsspec")
+    payload = os.urandom(10_000)
+    fetched = []
+
+    class Source(fsspec.AbstractFileSystem):
+        # A remote asset that records the byte ranges it serves.
+        protocol = "fc-test-source"
+
+        def info(self, path, **kwargs):
+            return {"name": path, "size": len(payload), "type": "file"}
+
+        def _open(self, path, mode="rb", block_size=None, **kwargs):
+            return SourceFile(self, path, mode, block_size, **kwargs)
+
+    class SourceFile(fsspec.spec.AbstractBufferedFile):
+        def _fetch_range(self, start, end):
+            fetched.append((start, end))
+            return payload[start:end]
+
+    fsspec.register_implementation(Source.protocol, Source, clobber=True)
+    url = f"{Source.protocol}://asset.bin"
+    cache = AssetCache(tmp_path)
+    with cache.open(url, "blob-id", block_size=1024) as f:
+        f.seek(5000)
+        assert f.read(100) == payload[5000:5100]
+    assert fetched
+
+    fetched.clear()
+    cache.offline = True
+    with cache.open(url, "blob-id", block_size=1024) as f:
+        f.seek(5000)
+        assert f.read(100) == payload[5000:5100]
+        f.seek(0)
+        with pytest.raises(CacheMissError):
+            f.read(100)
+    with pytest.raises(CacheMissError):
+        cache.open(f"{Source.protocol}://other.bin", "blob-id")
+    assert fetched == []
+
+
+def test_handler_offline_without_fsspec(tmp_path, monkeypatch):
+    from functional_connectivity.readwrite import dandi_handler
+
+    monkeypatch.setattr(dandi_handler, "fsspec", None)
+    cache = AssetCache(tmp_path)
+    cache.put_json("dandiset/000041", {"version": "draft"})
+    cache.offline = True
+    handler = DandiHandler("000041", cache=cache)
+    handler.s3_url, handler.blob_id = "https://example.org/blob", "blob"
+    with pytest.raises(ImportError, match="fsspec"):
+        handler.download()
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from functional_connectivity.inference.base_graphical_lasso import BaseGraphicalLasso
+from functional_connectivity.readwrite.cache import AssetCache
+from functional_connectivity.readwrite.dandi_handler import DandiHandler
+from functional_connectivity.utils.timeline import EpochTimeline
+
+
+@pytest.fixture
+def handler(tmp_path):
+    cache = AssetCache(tmp_path, offline=True)
+    cache.put_json("dandiset/000000", {})
+    handler = DandiHandler("000000", cache=cache)
+    rng = np.random.default_rng(0)
+    handler.behaviors = pd.DataFrame(
+        {
+            "start_time": [0.0, 20.0, 35.0],
+            "stop_time": [20.0, 35.0, 60.0],
+            "label": ["sleep", "wake", "sleep"],
+        }
+    )
+    handler.units = pd.DataFrame(
+        {
+            "spike_times": [np.sort(rng.uniform(0, 60, size=n)) for n in (5, 40)],
+            "cell_type": ["p", "i"],
+            "shank_id": [0, 1],
+            "region": ["ca1", "ca1"],
+        }
+    )
+    return handler
+
+
+def test_report(handler):
+    handler.get_spike_counts(time_to_bin=1)
+    report = handler.report()
+    assert report["stage"].tolist() == ["lookup", "intervals", "binning"]
+    assert (report["wall_time"] >= 0).all()
+
+
+@pytest.mark.parametrize(
+    "rows, starts",
+    [([2, 0, 1], [35.0, 0.0, 20.0]), ([0, 1, 2], [0.0, 20.0, 15.0])],
+    ids=["unsorted", "overlapping"],
+)
+def test_spike_counts_in_table_order(handler, rows, starts):
+    behaviors = handler.behaviors.iloc[rows].copy()
+    behaviors["start_time"] = starts
+    handler.behaviors = behaviors
+    counts = handler.get_spike_counts(time_to_bin=5)
+    first = np.flatnonzero(np.r_[True, np.diff(counts.epoch.values) != 0])
+    np.testing.assert_array_equal(counts.indexes["time"].left[first], starts)
+    np.testing.assert_array_equal(
+        counts.label.values[first], behaviors["label"].to_numpy().astype("S16")
+    )
+    spikes = np.concatenate(handler.units["spike_times"].to_numpy())
+    intervals = handler.timeline.intervals
+    for (left, right), count in zip(
+        intervals, counts.sum("neuron").values, strict=True
+    ):
+        assert count == ((spikes >= left) & (spikes < right)).sum()
+
+
+def test_spike_count_pyramid(handler):
+    pyramid = handler.get_spike_count_pyramid(resolutions=[0.5, 1, 5])
+    assert sorted(pyramid.levels) == [0.5]
+    for time_to_bin in (1, 5):
+        expected = DandiHandler.get_spike_counts(handler, time_to_bin=time_to_bin)
+        level = pyramid[time_to_bin]
+        np.testing.assert_array_equal(level.values, expected.values)
+        assert level.indexes["time"].equals(expected.indexes["time"])
+        np.testing.assert_array_equal(level.label.values, expected.label.values)
+    assert sorted(pyramid.levels) == [0.5, 1, 5]
+    with pytest.raises(ValueError, match="not a multiple"):
+        pyramid[0.75]
+
+
+def test_sparse_spike_counts(handler):
+    pytest.importorskip("sparse")
+    expected = handler.get_spike_counts(time_to_bin=0.0625)
+    counts = handler.get_spike_counts(time_to_bin=0.0625, sparse=True)
+    assert counts.dtype == np.uint8
+    np.testing.assert_array_equal(counts.data.todense(), expected.values)
+    assert counts.indexes["time"].equals(expected.indexes["time"])
+
+    coarse = handler.get_spike_count_pyramid([0.0625, 1], sparse=True)[1]
+    np.testing.assert_array_equal(
+        coarse.data.todense(), handler.get_spike_counts(time_to_bin=1).values
+    )
+    model = BaseGraphicalLasso(lambd=0.01).fit(counts)
+    np.testing.assert_allclose(
+        model.covariance_, BaseGraphicalLasso(lambd=0.01).fit(expected).covariance_
+    )
+
+
+def test_sparse_spike_counts_without_sparse(handler, monkeypatch):
+    from functional_connectivity.readwrite import dandi_handler
+
+    monkeypatch.setattr(dandi_handler, "pydata_sparse", None)
+    with pytest.raises(ImportError, match=r"functional-connectivity\[sparse\]"):
+        handler.get_spike_counts(time_to_bin=1, sparse=True)
+
+
+def test_timeline_slicing(handler):
+    counts = handler.get_spike_counts(time_to_bin=1)
+    wake = counts.isel(time=handler.timeline.label_bins("wake"))
+    assert (wake.label.values == b"wake").all()
+    assert wake.sizes["time"] == (counts.label.values == b"wake").sum()
+    window = counts.isel(time=handler.timeline.bins(10, 12))
+    assert list(window.indexes["time"].left) == [10.0, 11.0]
+
+
+def test_timeline_on_cache_hit(handler, tmp_path):
+    cache = AssetCache(tmp_path / "counts")
+    cache.put_json("dandiset/000000", {})
+    handler.cache, handler.blob_id = cache, "blob"
+    counts = handler.get_spike_counts(time_to_bin=1)
+    handler.get_spike_counts(time_to_bin=5)
+
+    # A cache hit after another width, and in a fresh handler.
+    fresh = DandiHandler("000000", cache=cache)
+    fresh.blob_id = "blob"
+    for h in (handler, fresh):
+        cached = h.get_spike_counts(time_to_bin=1)
+        assert h.timeline.index.equals(cached.indexes["time"])
+        np.testing.assert_array_equal(h.timeline.epoch_sizes, [21, 16, 26])
+        window = cached.isel(time=h.timeline.bins(10, 12))
+        assert list(window.indexes["time"].left) == [10.0, 11.0]
+    xr.testing.assert_identical(fresh.get_spike_counts(time_to_bin=1), counts)
+    assert fresh.behaviors is None
+
+
+def test_spike_count_pyramid_on_cache_hit(handler, tmp_path):
+    cache = AssetCache(tmp_path / "counts")
+    cache.put_json("dandiset/000000", {})
+    handler.cache, handler.blob_id = cache, "blob"
+    expected = handler.get_spike_counts(time_to_bin=5)
+    handler.get_spike_counts(time_to_bin=1)
+
+    # The behaviors are not read again: offline, that would fail.
+    fresh = DandiHandler("000000", cache=AssetCache(cache.root, offline=True))
+    fresh.blob_id = "blob"
+    pyramid = fresh.get_spike_count_pyramid(resolutions=[1, 5])
+    assert fresh.behaviors is None
+    np.testing.assert_array_equal(pyramid.epoch_sizes, [21, 16, 26])
+    np.testing.assert_array_equal(pyramid[5].values, expected.values)
+    assert pyramid[5].indexes["time"].equals(expected.indexes["time"])
+
+
+def test_timeline_from_data_array_without_epochs(handler):
+    counts = handler.get_spike_counts(time_to_bin=5).drop_vars("epoch")
+    timeline = EpochTimeline.from_data_array(counts, 5)
+    assert timeline.index.equals(counts.indexes["time"])
+    np.testing.assert_array_equal(timeline.epoch_sizes, handler.timeline.epoch_sizes)
@@ -0,0 +1,130 @@
+import os
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from functional_connectivity.readwrite.data_handler import DataHandler
+from functional_connectivity.readwrite.sample_store import SampleWriter, load_samples
+
+
+@pytest.fixture
+def edgelists(tmp_path):
+    paths = []
+    for k, edges in enumerate([[(0, 1), (1, 2), (2, 3)], [(0, 2), (1, 3), (3, 0)]]):
+        path = tmp_path / f"network_{k}.txt"
+        path.write_text("# u v weight\n" + "".join(f"{u} {v} 0.3\n" for u, v in edges))
+        paths.append(str(path))
+    return paths
+
+
+def test_generate_mvn(edgelists):
+    np.random.seed(0)
+    dh = DataHandler()
+    for path in edgelists:
+        dh.from_edgelist(path)
+    z = dh.generate_mvn(counts=[100_000, 50_000])
+    assert z.shape == (4, 150_000)
+    for graph, block in zip(dh.graphs, (z[:, :100_000], z[:, 100_000:]), strict=True):
+        expected = graph.correlation_mat.toarray()
+        np.testing.assert_allclose(np.cov(block, bias=True), expected, atol=0.03)
+
+
+def test_generate_mvn_node_mismatch(edgelists):
+    Path(edgelists[1]).write_text("0 1 0.3\n1 2 0.3\n")
+    dh = DataHandler()
+    for path in edgelists:
+        dh.from_edgelist(path, cache=False)
+    with pytest.raises(ValueError, match="Network 1 has 3 nodes, not 4"):
+        dh.generate_mvn(counts=[10, 10])
+
+
+def test_iter_samples_blocks(edgelists):
+    graph = DataHandler().from_edgelist(edgelists[0])
+    blocks = list(graph.iter_samples(10, block_size=4, rng=np.random.default_rng(0)))
+    assert [b.shape for b in blocks] == [(4, 4), (4, 4), (4, 2)]
+    assert "factor" in vars(graph)
+
+
+@pytest.mark.parametrize("suffix", [".npy", ".h5", ".zarr"])
+def test_write_mvn_round_trip(edgelists, tmp_path, suffix):
+    if suffix == ".zarr":
+        pytest.importorskip("zarr")
+    dh = DataHandler()
+    for path in edgelists:
+        dh.from_edgelist(path)
+    out = tmp_path / f"samples{suffix}"
+    metadata = dh.write_mvn(out, [7, 5], seed=42, block_size=3)
+
+    samples, stored = load_samples(out)
+    assert samples.shape == (4, 12)
+    assert stored["graph_paths"] == edgelists
+    assert stored["counts"] == [7, 5] and stored["seed"] == 42 == metadata["seed"]
+
+    expected = np.concatenate(
+        [x for _, x in dh.iter_mvn([7, 5], 3, np.random.default_rng(42))], axis=1
+    )
+    np.testing.assert_array_equal(samples[:], expected)
+    if suffix == ".npy":
+        assert isinstance(samples, np.memmap)
+    elif suffix == ".h5":
+        samples.file.close()
+
+
+@pytest.mark.parametrize("suffix", [".h5", ".zarr"])
+def test_sample_writer_chunk_budget(tmp_path, suffix):
+    if suffix == ".zarr":
+        pytest.importorskip("zarr")
+    with SampleWriter(tmp_path / f"large{suffix}", (5000, 10**6)) as writer:
+        rows, columns = writer.array.chunks
+        assert columns == 4096
+        assert 2**20 <= rows * columns * 8 <= 2**22
+    with SampleWriter(tmp_path / f"small{suffix}", (4, 12)) as writer:
+        assert writer.array.chunks == (4, 12)
+
+
+def test_from_edgelist_matches_networkx(tmp_path):
+    rng = np.random.default_rng(0)
+    edges = rng.integers(10, 60, size=(300, 2))
+    path = tmp_path / "network.txt"
+    path.write_text(
+        "# u v weight\n"
+        + "".join(
+            f"{u} {v} {w:.3f}\n"
+            for (u, v), w in zip(edges, rng.random(300), strict=True)
+        )
+    )
+    graph = DataHandler().from_edgelist(str(path), cache=False)
+    assert "g" not in vars(graph)
+
+    g = nx.read_edgelist(
+        path, comments="#", delimiter=" ", nodetype=int, data=(("weight", float),)
+    )
+    np.testing.assert_array_equal(graph.nodes, list(g.nodes))
+    np.testing.assert_allclose(
+        graph.adj_mat.toarray(), nx.adjacency_matrix(g).toarray()
+    )
+    assert nx.utils.graphs_equal(graph.g, g)
+
+
+def test_from_edgelist_cache(edgelists):
+    first = DataHandler().from_edgelist(edgelists[0])
+    cached = Path(f"{edgelists[0]}.csr.npz")
+    assert cached.exists()
+    second = DataHandler().from_edgelist(edgelists[0])
+    assert (first.adj_mat != second.adj_mat).nnz == 0
+
+    # A modified source invalidates the cache.
+    Path(edgelists[0]).write_text("0 1 0.5\n")
+    os.utime(edgelists[0], ns=(0, 0))
+    assert DataHandler().from_edgelist(edgelists[0]).adj_mat.shape == (2, 2)
+
+
+def test_from_directory(edgelists, tmp_path):
+    dh = DataHandler()
+    graphs = dh.from_directory(tmp_path)
+    assert dh.graph_paths == edgelists and dh.num_nodes == 4
+    for graph, path in zip(graphs, edgelists, strict=True):
+        expected = DataHandler().from_edgelist(path, cache=False)
+        assert (graph.adj_mat != expected.adj_mat).nnz == 0
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from functional_connectivity.readwrite.cache import AssetCache
+from functional_connectivity.readwrite.dandi_handler import DandiHandler
+from functional_connectivity.readwrite.resolver import DandiResolver
+
+PATHS = [f"sub-{i}/sub-{i}_ecephys.nwb" for i in range(20)]
+
+
+class _MockDandiAPI(BaseHTTPRequestHandler):
+    hits = []
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        self.hits.append(self.path)
+        parts = url.path.strip("/").split("/")
+        if parts == ["api", "dandisets", "000041"]:
+            document = {"version": "draft"}
+        elif parts[-1] == "assets" and "path" in query:
+            path = query["path"][0]
+            document = {
+                "next": None,
+                "results": (
+                    [{"asset_id": f"id-{PATHS.index(path)}", "path": path}]
+                    if path in PATHS
+                    else []
+                ),
+            }
+        elif parts[-1] == "assets":
+            document = {
+                "next": None,
+                "results": [
+                    {"asset_id": f"id-{i}", "path": path}
+                    for i, path in enumerate(PATHS)
+                ],
+            }
+        elif parts[-2] == "assets":
+            host = f"http://{self.headers['Host']}"
+            document = {
+                "contentUrl": [
+                    f"{host}/api/assets/{parts[-1]}/download/",
+                    f"https://dandiarchive.s3.amazonaws.com/blobs/{parts[-1]}",
+                ],
+                "contentSize": 2048,
+            }
+        else:
+            self.send_error(404)
+            return
+        payload = json.dumps(document).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api_url():
+    _MockDandiAPI.hits = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockDandiAPI)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/api/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_resolve_many_is_concurrent_and_memoized(api_url):
+    resolver = DandiResolver(api_url, max_connections=4)
+    assets = resolver.run(resolver.resolve_many("000041", "draft", PATHS + ["nope"]))
+    assert assets[PATHS[3]] == {
+        "asset_id": "id-3",
+        "s3_url": "https://dandiarchive.s3.amazonaws.com/blobs/id-3",
+        "content_size": 2048,
+    }
+    assert isinstance(assets["nope"], FileNotFoundError)
+    n_hits = len(_MockDandiAPI.hits)
+    assert n_hits == 2 * len(PATHS) + 1
+
+    resolver.run(resolver.resolve_many("000041", "draft", PATHS))
+    assert len(_MockDandiAPI.hits) == n_hits
+    resolver.session.close()
+
+
+def test_handler_uses_resolver(api_url, tmp_path):
+    resolver = DandiResolver(api_url)
+    handler = DandiHandler("000041", cache=AssetCache(tmp_path), resolver=resolver)
+    assert handler.get_all_versions() == ["draft"]
+    assert handler.get_all_filepaths_by_version("draft") == PATHS
+    url = handler.get_s3_url("draft", PATHS[0])
+    assert url == "https://dandiarchive.s3.amazonaws.com/blobs/id-0"
+    assert handler.blob_id == "id-0"
+
+    # A new handler, with a fresh resolver, is served by the cache.
+    n_hits = len(_MockDandiAPI.hits)
+    handler = DandiHandler(
+        "000041", cache=AssetCache(tmp_path), resolver=DandiResolver(api_url)
+    )
+    assert handler.get_s3_url("draft", PATHS[0]) == url
+    assert len(_MockDandiAPI.hits) == n_hits
+    resolver.session.close()
+
+
+def test_handler_in_running_event_loop(api_url):
+    resolver = DandiResolver(api_url)
+
+    async def notebook_cell():
+        # As in Jupyter, where an event loop is already running.
+        handler = DandiHandler("000041", resolver=resolver)
+        return handler.get_all_filepaths_by_version("draft")
+
+    assert asyncio.run(notebook_cell()) == PATHS
+    resolver.session.close()
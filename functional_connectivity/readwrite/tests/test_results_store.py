@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from functional_connectivity.inference import TimeVaryingGraphicalLasso
+from functional_connectivity.readwrite.data_handler import DataHandler
+from functional_connectivity.readwrite.results_store import ResultsStore
+
+
+@pytest.fixture(scope="module")
+def solver():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(4, 300))
+    return TimeVaryingGraphicalLasso(lambd=0.1, beta=1.0, blocks=3).fit(X)
+
+
+@pytest.mark.parametrize("suffix", [".h5", ".zarr"])
+def test_write_read(tmp_path, solver, suffix):
+    if suffix == ".zarr":
+        pytest.importorskip("zarr")
+    store = ResultsStore(tmp_path / f"results{suffix}")
+    first = store.write(solver, "data.csv", features=list("abcd"))
+    second = store.write(solver, networks=False)
+    assert first != second
+    assert store.runs() == [first, second]
+
+    metadata = store.metadata(first)
+    assert metadata["datafile"] == "data.csv"
+    assert metadata["features"] == list("abcd")
+    assert metadata["blocks"] == 3
+    assert metadata["penalty_function"] == "group_lasso"
+    np.testing.assert_array_equal(store.read(first, "thetas")[:], solver.thetas)
+    np.testing.assert_array_equal(store.read_block(first, 1), solver.thetas[1])
+    np.testing.assert_array_equal(
+        store.read(second, "deviations")[:], solver.deviations
+    )
+    with pytest.raises(ValueError, match="already exists"):
+        store.write(solver, name=first)
+
+
+def test_export_csv(tmp_path, solver):
+    store = ResultsStore(tmp_path / "results.h5")
+    name = store.write(solver, features=list("abcd"))
+    store.export_csv(name, tmp_path / "results.csv")
+    lines = (tmp_path / "results.csv").read_text().splitlines()
+    assert "Blocks, 3" in lines
+    header = lines.index("Block 1,1")
+    assert lines[header + 2] == ",a,b,c,d"
+    row = lines[header + 3].split(",")
+    assert row[0] == "a"
+    np.testing.assert_allclose(np.array(row[1:], dtype=float), solver.thetas[1][0])
+
+
+def test_write_network_results(tmp_path, solver):
+    datafile = tmp_path / "data.csv"
+    datafile.write_text("time,a,b,c,d\n")
+    store = tmp_path / "network_results" / "results.h5"
+    store.parent.mkdir()
+    name = DataHandler().write_network_results(str(datafile), solver, store=store)
+    assert ResultsStore(store).metadata(name)["features"] == list("abcd")
+    assert not (store.parent / f"{name}.csv").exists()
+    name = DataHandler().write_results(str(datafile), solver, store=store, csv=True)
+    assert (store.parent / f"{name}.csv").exists()
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError, match="Cannot infer the format"):
+        ResultsStore(tmp_path / "results.csv")
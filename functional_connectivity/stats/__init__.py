@@ -1 +1,36 @@
-from .network_features import *
+import importlib as _importlib
+
+_lazy_attrs = {
+    "network_features": [
+        "batch_network_features",
+        "clustering",
+        "communities",
+        "degree",
+        "edge_frequency",
+        "edge_overlap",
+        "modularity",
+        "partial_correlation",
+        "participation_coefficient",
+        "strength",
+        "to_adjacency",
+    ],
+    "surrogates": ["NullDistribution", "correlation", "surrogate_test"],
+}
+_attr_to_module = {
+    attr: module for module, attrs in _lazy_attrs.items() for attr in attrs
+}
+__all__ = list(_attr_to_module)
+
+
+def __dir__():
+    return __all__ + list(_lazy_attrs)
+
+
+def __getattr__(name):
+    if name in _lazy_attrs:
+        return _importlib.import_module(f".{name}", __name__)
+    elif name in _attr_to_module:
+        module = _importlib.import_module(f".{_attr_to_module[name]}", __name__)
+        value = globals()[name] = getattr(module, name)
+        return value
+    raise AttributeError(f"Module {__name__!r} has no attribute {name!r}")
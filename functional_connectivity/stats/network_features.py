@@ -0,0 +1,250 @@
+try:
+    import graph_tool.all as gt
+except ImportError:
+    gt = None
+
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+import numpy as np
+import xarray as xr
+from scipy import sparse
+
+
+def partial_correlation(precision):
+    """Partial correlations ``-P_ij / sqrt(P_ii P_jj)`` of a precision matrix.
+
+    Args:
+        precision (np.ndarray or sparse matrix): Precision matrix of shape
+            ``(n, n)``, or a dense stack of them of shape ``(..., n, n)``.
+
+    Returns:
+        rho (np.ndarray or sparse.csr_matrix): Partial correlations, with a
+            unit diagonal, and as sparse as ``precision``.
+    """
+    if sparse.issparse(precision):
+        precision = sparse.csr_matrix(precision)
+        d = 1 / np.sqrt(precision.diagonal())
+        rho = -(sparse.diags(d) @ precision @ sparse.diags(d))
+        rho.setdiag(1)
+        return rho.tocsr()
+    precision = np.asarray(precision)
+    d = 1 / np.sqrt(np.diagonal(precision, axis1=-2, axis2=-1))
+    rho = -precision * d[..., :, None] * d[..., None, :]
+    n = precision.shape[-1]
+    rho[..., np.arange(n), np.arange(n)] = 1
+    return rho
+
+
+def to_adjacency(precision, threshold=0.0):
+    """Weighted adjacency matrix of the network of a precision matrix.
+
+    Edges are the pairs whose absolute partial correlation exceeds
+    ``threshold``, weighted by it; the diagonal is dropped.
+
+    Returns:
+        adj_mat (sparse.csr_matrix): Symmetric matrix of shape ``(n, n)``.
+    """
+    rho = partial_correlation(precision)
+    adj_mat = sparse.csr_matrix(abs(rho))
+    adj_mat.setdiag(0)
+    adj_mat.data[adj_mat.data <= threshold] = 0
+    adj_mat.eliminate_zeros()
+    return adj_mat
+
+
+def degree(adj_mat):
+    """Number of neighbors of each node."""
+    return sparse.csr_matrix(adj_mat).getnnz(axis=1)
+
+
+def strength(adj_mat):
+    """Total weight of the edges of each node."""
+    return np.asarray(abs(adj_mat).sum(axis=1)).ravel()
+
+
+def clustering(adj_mat, weighted=True):
+    """Local clustering coefficient of each node, as in ``nx.clustering``.
+
+    The weighted coefficient is the geometric mean of the triangle weights,
+    normalized by the largest weight (Onnela et al., 2005). Triangles are
+    counted with one sparse product, ``diag(B^3) = rowsum((B B) * B)``.
+
+    Args:
+        adj_mat (sparse matrix): Symmetric adjacency matrix, without self-loops.
+        weighted (boolean): Whether to use the edge weights.
+    """
+    B = sparse.csr_matrix(adj_mat, dtype=np.float64)
+    B = abs(B)
+    if weighted and B.nnz:
+        B.data = np.cbrt(B.data / B.data.max())
+    else:
+        B.data = np.ones_like(B.data)
+    triangles = np.asarray((B @ B).multiply(B).sum(axis=1)).ravel()
+    k = B.getnnz(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        c = triangles / (k * (k - 1))
+    return np.where(k > 1, c, 0.0)
+
+
+def modularity(adj_mat, labels):
+    """Newman modularity of the partition of the nodes by ``labels``.
+
+    ``Q = sum_c e_c / 2m - (a_c / 2m)^2``, where ``e_c`` is twice the weight
+    inside community ``c`` and ``a_c`` the total strength of its nodes.
+    """
+    A = sparse.coo_matrix(adj_mat)
+    codes = np.unique(np.asarray(labels), return_inverse=True)[1]
+    two_m = A.data.sum()
+    if two_m == 0:
+        return 0.0
+    inside = A.data[codes[A.row] == codes[A.col]].sum()
+    a = np.bincount(codes, weights=strength(A))
+    return inside / two_m - np.sum((a / two_m) ** 2)
+
+
+def participation_coefficient(adj_mat, labels):
+    """Participation coefficient ``1 - sum_c (s_ic / s_i)^2`` of each node,
+    where ``s_ic`` is the strength of node ``i`` towards community ``c``."""
+    A = sparse.csr_matrix(adj_mat)
+    codes = np.unique(np.asarray(labels), return_inverse=True)[1]
+    membership = sparse.csr_matrix(
+        (np.ones(len(codes)), (np.arange(len(codes)), codes))
+    )
+    s_ic = (abs(A) @ membership).toarray()
+    s = s_ic.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = 1 - np.sum((s_ic / s[:, None]) ** 2, axis=1)
+    return np.where(s > 0, p, 0.0)
+
+
+def communities(adj_mat, seed=None):
+    """Partition the nodes into communities.
+
+    Uses graph-tool's stochastic block model inference when graph-tool is
+    installed, and the Louvain method of networkx otherwise.
+
+    Returns:
+        labels (np.ndarray): Community of each node.
+    """
+    A = sparse.triu(sparse.csr_matrix(adj_mat), k=1).tocoo()
+    n = adj_mat.shape[0]
+    if gt is not None:
+        if seed is not None:
+            gt.seed_rng(seed)
+        g = gt.Graph(directed=False)
+        g.add_vertex(n)
+        weight = g.new_edge_property("double")
+        g.add_edge_list(np.column_stack([A.row, A.col, A.data]), eprops=[weight])
+        state = gt.minimize_blockmodel_dl(
+            g, state_args={"recs": [weight], "rec_types": ["real-exponential"]}
+        )
+        return np.unique(state.get_blocks().a, return_inverse=True)[1]
+    g = nx.Graph()
+    g.add_nodes_from(range(n))
+    g.add_weighted_edges_from(
+        zip(A.row.tolist(), A.col.tolist(), A.data.tolist(), strict=True)
+    )
+    labels = np.empty(n, dtype=np.int64)
+    for c, nodes in enumerate(nx.community.louvain_communities(g, seed=seed)):
+        labels[list(nodes)] = c
+    return labels
+
+
+def _edge_matrix(networks):
+    """Upper-triangular edges of each network, as rows of a sparse matrix."""
+    rows = []
+    for adj_mat in networks:
+        A = sparse.triu(sparse.csr_matrix(adj_mat), k=1).tocoo()
+        rows.append(A.row.astype(np.int64) * adj_mat.shape[0] + A.col)
+    n = networks[0].shape[0]
+    indptr = np.r_[0, np.cumsum([len(r) for r in rows])]
+    indices = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+    return sparse.csr_matrix(
+        (np.ones(len(indices)), indices, indptr), shape=(len(networks), n * n)
+    )
+
+
+def edge_overlap(networks):
+    """Jaccard index of the edge sets of every pair of networks.
+
+    Args:
+        networks (list): Adjacency matrices of shape ``(n, n)``.
+
+    Returns:
+        overlap (np.ndarray): Array of shape ``(k, k)``.
+    """
+    E = _edge_matrix(networks)
+    intersection = (E @ E.T).toarray()
+    size = np.diag(intersection)
+    union = size[:, None] + size[None, :] - intersection
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(union > 0, intersection / union, 1.0)
+
+
+def edge_frequency(networks):
+    """Fraction of the networks in which each edge appears.
+
+    Returns:
+        frequency (sparse.csr_matrix): Symmetric matrix of shape ``(n, n)``.
+    """
+    n = networks[0].shape[0]
+    edges, counts = np.unique(_edge_matrix(networks).indices, return_counts=True)
+    F = sparse.csr_matrix(
+        (counts / len(networks), (edges // n, edges % n)), shape=(n, n)
+    )
+    return (F + F.T).tocsr()
+
+
+def batch_network_features(
+    precisions, labels=None, threshold=0.0, weighted=True, processes=None
+):
+    """Node and network features of many precision matrices at once.
+
+    Args:
+        precisions (list or np.ndarray or xr.DataArray): Precision matrices,
+            as a list of sparse or dense matrices, or a stack of shape
+            ``(k, n, n)``, such as the ``precision`` of
+            :func:`sliding_window_covariance` or :func:`grouped_connectivity`.
+        labels (array-like): Community of each node, for ``modularity`` and
+            ``participation``. Defaults to :func:`communities` of each network.
+        threshold (double): Edges have an absolute partial correlation above it.
+        weighted (boolean): Whether clustering uses the edge weights.
+        processes (int): Number of networks processed at once.
+
+    Returns:
+        features (xr.Dataset): ``degree``, ``strength``, ``clustering`` and
+            ``participation`` of dims ``(network, node)``, and ``density``,
+            ``mean_clustering`` and ``modularity`` of dim ``network``. A
+            DataArray input gives its first coordinate to ``network``.
+    """
+    coords = {}
+    if hasattr(precisions, "coords"):
+        network_dim = precisions.dims[0]
+        coords["network"] = precisions[network_dim].values
+        precisions = precisions.values
+    networks = list(precisions)
+
+    def features(precision):
+        adj_mat = to_adjacency(precision, threshold)
+        n = adj_mat.shape[0]
+        node_labels = communities(adj_mat, seed=0) if labels is None else labels
+        k = degree(adj_mat)
+        c = clustering(adj_mat, weighted)
+        return {
+            "degree": k,
+            "strength": strength(adj_mat),
+            "clustering": c,
+            "participation": participation_coefficient(adj_mat, node_labels),
+            "density": k.sum() / max(n * (n - 1), 1),
+            "mean_clustering": c.mean(),
+            "modularity": modularity(adj_mat, node_labels),
+        }
+
+    with ThreadPoolExecutor(processes) as executor:
+        results = list(executor.map(features, networks))
+    data_vars = {}
+    for name in results[0]:
+        dims = ("network", "node") if np.ndim(results[0][name]) else ("network",)
+        data_vars[name] = (dims, np.stack([r[name] for r in results]))
+    return xr.Dataset(data_vars, coords=coords)
@@ -0,0 +1,233 @@
+import os
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+from loky import get_reusable_executor
+
+from ..utils._shared import open_shared, shared_dir
+
+SURROGATE_METHODS = ("circular", "shuffle")
+
+
+def correlation(X):
+    """Pearson correlation of the rows of ``X``, with zeros for constant rows."""
+    X = X - X.mean(axis=1, keepdims=True)
+    norms = np.sqrt(np.einsum("ij,ij->i", X, X))
+    norms[norms == 0] = np.inf
+    Xn = X / norms[:, None]
+    return Xn @ Xn.T
+
+
+class NullDistribution:
+    """Running summary of a null distribution of edge statistics.
+
+    Surrogate statistics are folded in as they come, so memory does not grow
+    with the number of surrogates: per edge, the number of surrogates at least
+    as extreme as the observed statistic and the running moments; per
+    surrogate, only its most extreme edge, for family-wise corrections.
+    Summaries of disjoint sets of surrogates merge with ``+=``.
+
+    Args:
+        observed (np.ndarray): Statistic of the original data.
+        two_sided (boolean): Whether extremes are measured in absolute value.
+        mask (np.ndarray): Entries of the statistic that are tested, for the
+            family-wise correction. Defaults to the off-diagonal entries of a
+            square matrix, and to every entry otherwise.
+    """
+
+    def __init__(self, observed, two_sided=True, mask=None):
+        self.observed = np.asarray(observed, dtype=np.float64)
+        self.two_sided = two_sided
+        if mask is None:
+            mask = np.ones(self.observed.shape, dtype=bool)
+            if self.observed.ndim == 2 and len(set(self.observed.shape)) == 1:
+                np.fill_diagonal(mask, False)
+        self.mask = mask
+        self.n = 0
+        self.exceed = np.zeros(self.observed.shape, dtype=np.int64)
+        self.sum = np.zeros(self.observed.shape)
+        self.sumsq = np.zeros(self.observed.shape)
+        self.maxima = []
+
+    def __repr__(self):
+        return f"NullDistribution({self.n} surrogates, shape={self.observed.shape})"
+
+    def _extreme(self, values):
+        return np.abs(values) if self.two_sided else values
+
+    def update(self, null):
+        """Fold in the statistic ``null`` of one surrogate."""
+        null = np.asarray(null, dtype=np.float64)
+        self.n += 1
+        self.exceed += self._extreme(null) >= self._extreme(self.observed)
+        self.sum += null
+        self.sumsq += null**2
+        self.maxima.append(np.nanmax(self._extreme(null[self.mask])))
+        return self
+
+    def __iadd__(self, other):
+        self.n += other.n
+        self.exceed += other.exceed
+        self.sum += other.sum
+        self.sumsq += other.sumsq
+        self.maxima.extend(other.maxima)
+        return self
+
+    @property
+    def mean(self):
+        return self.sum / self.n
+
+    @property
+    def std(self):
+        return np.sqrt(np.maximum(self.sumsq / self.n - self.mean**2, 0))
+
+    @property
+    def p_values(self):
+        """Per-edge p-values, ``(1 + #exceedances) / (1 + n)``."""
+        return (1 + self.exceed) / (1 + self.n)
+
+    @property
+    def p_values_fwer(self):
+        """P-values corrected for the family-wise error rate by the maximum
+        statistic over the edges (Westfall and Young's single-step method).
+        Untested entries get a p-value of one."""
+        maxima = np.sort(self.maxima)
+        exceed = len(maxima) - np.searchsorted(
+            maxima, self._extreme(self.observed), side="left"
+        )
+        return np.where(self.mask, (1 + exceed) / (1 + self.n), 1.0)
+
+    @property
+    def z_scores(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (self.observed - self.mean) / self.std
+
+
+def _surrogate_batch(
+    data, statistic, observed, method, min_shift, seed, size, two_sided
+):
+    """Evaluate ``size`` surrogates seeded by ``seed`` into a NullDistribution."""
+    X = open_shared(data)
+    n, m = X.shape
+    rng = np.random.default_rng(seed)
+    null = NullDistribution(observed, two_sided)
+    # One buffer per batch; surrogates never copy the shared base array.
+    surrogate = np.empty((n, m), dtype=X.dtype)
+    for _ in range(size):
+        if method == "circular":
+            shifts = rng.integers(min_shift, m - min_shift + 1, size=n)
+            for i, s in enumerate(shifts):
+                surrogate[i, : m - s] = X[i, s:]
+                surrogate[i, m - s :] = X[i, :s]
+        else:
+            surrogate[:] = X
+            rng.permuted(surrogate, axis=1, out=surrogate)
+        null.update(statistic(surrogate))
+    return null
+
+
+def surrogate_test(
+    X,
+    statistic=correlation,
+    n_surrogates=1000,
+    method="circular",
+    min_shift=1,
+    two_sided=True,
+    seed=None,
+    batch_size=50,
+    max_workers=4,
+    backend="loky",
+    sample_dim="time",
+):
+    """Edge-level significance of a connectivity statistic against surrogates.
+
+    Each surrogate shifts every row of ``X`` circularly by its own random lag
+    (which keeps the autocorrelation of each neuron and breaks their
+    coupling), or shuffles every row independently. Surrogates are evaluated in
+    batches over a pool of workers and streamed into a
+    :class:`NullDistribution`, so memory stays flat whatever ``n_surrogates``.
+
+    With ``backend="loky"``, ``X`` is written once to a memory-mapped file (in
+    ``/dev/shm`` when available) that every worker maps read-only. Batch ``b``
+    is always seeded by the ``b``-th child of ``SeedSequence(seed)``, so the
+    result only depends on ``seed``, not on the workers or their scheduling.
+
+    Args:
+        X (np.ndarray or xr.DataArray): Data of shape ``(n_features,
+            n_samples)``, such as spike counts of dims ``(neuron, time)``.
+        statistic (callable): Maps an array like ``X`` to the edge statistics,
+            for instance an ``(n, n)`` matrix. Must be picklable for loky.
+        n_surrogates (int): Number of surrogates.
+        method (str): ``"circular"`` or ``"shuffle"``.
+        min_shift (int): Smallest circular shift, in samples.
+        two_sided (boolean): Whether to test ``|statistic|``.
+        seed (int): Seed of the surrogates. A fresh one is drawn, and stored
+            in the result, if None.
+        batch_size (int): Number of surrogates per task.
+        max_workers (int): Size of the worker pool.
+        backend (str): ``"loky"`` for a process pool, ``"threads"`` for a
+            thread pool.
+        sample_dim (str): Dimension holding the samples, for a DataArray.
+
+    Returns:
+        null (NullDistribution): With ``p_values``, ``p_values_fwer``,
+            ``z_scores`` and the ``seed`` used.
+    """
+    if method not in SURROGATE_METHODS:
+        raise ValueError(f"Unknown method {method!r}; use one of {SURROGATE_METHODS}.")
+    if hasattr(X, "coords"):
+        X = X.transpose(..., sample_dim).values
+    X = np.ascontiguousarray(X)
+    if method == "circular" and not 0 < min_shift <= X.shape[1] // 2:
+        raise ValueError(f"min_shift must be in [1, {X.shape[1] // 2}].")
+    observed = statistic(X)
+    seed = np.random.SeedSequence(seed).entropy
+    sizes = [
+        min(batch_size, n_surrogates - start)
+        for start in range(0, n_surrogates, batch_size)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if backend == "loky":
+        executor = get_reusable_executor(max_workers=max_workers)
+    elif backend == "threads":
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    else:
+        raise ValueError(f"Unknown backend {backend!r}; use 'loky' or 'threads'.")
+
+    null = NullDistribution(observed, two_sided)
+    with tempfile.TemporaryDirectory(dir=shared_dir()) as tmp:
+        data = X
+        if backend == "loky":
+            data = (os.path.join(tmp, "X"), X.shape, X.dtype.str)
+            shared = open_shared(data, "w+")
+            shared[:] = X
+            shared.flush()
+            del shared
+        # Keep a bounded number of batches in flight.
+        pending = set()
+        for size, batch_seed in zip(sizes, seeds, strict=True):
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    null += future.result()
+            pending.add(
+                executor.submit(
+                    _surrogate_batch,
+                    data,
+                    statistic,
+                    observed,
+                    method,
+                    min_shift,
+                    batch_seed,
+                    size,
+                    two_sided,
+                )
+            )
+        for future in pending:
+            null += future.result()
+    if backend == "threads":
+        executor.shutdown()
+    null.seed = seed
+    return null
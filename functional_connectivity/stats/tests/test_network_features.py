@@ -0,0 +1,111 @@
+import importlib
+
+import networkx as nx
+import numpy as np
+import pytest
+import xarray as xr
+from scipy import sparse
+
+from functional_connectivity.stats.network_features import (
+    batch_network_features,
+    clustering,
+    degree,
+    edge_frequency,
+    edge_overlap,
+    modularity,
+    partial_correlation,
+    participation_coefficient,
+    strength,
+    to_adjacency,
+)
+
+
+@pytest.fixture
+def precisions():
+    rng = np.random.default_rng(0)
+    stack = []
+    for _ in range(3):
+        A = sparse.random(40, 40, density=0.1, random_state=rng).toarray()
+        A = np.triu(A, 1)
+        A = A + A.T
+        stack.append(np.eye(40) * (A.sum(axis=1).max() + 1) - A)
+    return np.stack(stack)
+
+
+def test_partial_correlation_sparse_matches_dense(precisions):
+    dense = partial_correlation(precisions)
+    assert dense.shape == (3, 40, 40)
+    np.testing.assert_allclose(np.diagonal(dense, axis1=1, axis2=2), 1)
+    for precision, rho in zip(precisions, dense, strict=True):
+        sparse_rho = partial_correlation(sparse.csr_matrix(precision))
+        np.testing.assert_allclose(sparse_rho.toarray(), rho)
+
+
+@pytest.mark.parametrize("weighted", [True, False])
+def test_node_features_match_networkx(precisions, weighted):
+    adj_mat = to_adjacency(precisions[0])
+    g = nx.from_scipy_sparse_array(adj_mat)
+    weight = "weight" if weighted else None
+    np.testing.assert_array_equal(degree(adj_mat), [d for _, d in g.degree()])
+    np.testing.assert_allclose(
+        strength(adj_mat), [d for _, d in g.degree(weight="weight")]
+    )
+    expected = nx.clustering(g, weight=weight)
+    np.testing.assert_allclose(
+        clustering(adj_mat, weighted), [expected[i] for i in range(40)]
+    )
+
+
+def test_modularity_matches_networkx(precisions):
+    adj_mat = to_adjacency(precisions[0])
+    g = nx.from_scipy_sparse_array(adj_mat)
+    labels = np.arange(40) % 3
+    partition = [set(np.flatnonzero(labels == c)) for c in range(3)]
+    np.testing.assert_allclose(
+        modularity(adj_mat, labels), nx.community.modularity(g, partition)
+    )
+    p = participation_coefficient(adj_mat, np.zeros(40))
+    np.testing.assert_allclose(p, 0)
+
+
+def test_edge_overlap(precisions):
+    networks = [to_adjacency(p, threshold=0.05) for p in precisions]
+    edges = [set(zip(*sparse.triu(a, 1).nonzero(), strict=True)) for a in networks]
+    overlap = edge_overlap(networks)
+    for i in range(3):
+        for j in range(3):
+            expected = len(edges[i] & edges[j]) / len(edges[i] | edges[j])
+            np.testing.assert_allclose(overlap[i, j], expected)
+    frequency = edge_frequency(networks).toarray()
+    np.testing.assert_allclose(frequency, frequency.T)
+    np.testing.assert_allclose(
+        frequency, np.mean([(a != 0).toarray() for a in networks], axis=0)
+    )
+
+
+def test_network_features(precisions):
+    stack = xr.DataArray(
+        precisions, dims=("window", "neuron", "neuron_j"), coords={"window": [0, 5, 10]}
+    )
+    features = batch_network_features(stack, labels=np.arange(40) % 4)
+    assert features.degree.dims == ("network", "node")
+    np.testing.assert_array_equal(features.network, [0, 5, 10])
+    adj_mat = to_adjacency(precisions[2])
+    np.testing.assert_allclose(features.clustering[2], clustering(adj_mat))
+    np.testing.assert_allclose(
+        features.modularity[2], modularity(adj_mat, np.arange(40) % 4)
+    )
+    assert np.all(batch_network_features(list(precisions)).modularity > 0)
+
+
+def test_network_features_reexport(precisions):
+    import functional_connectivity as fc
+
+    expected = batch_network_features(precisions, labels=np.arange(40) % 4)
+    for features in (
+        fc.batch_network_features(precisions, labels=np.arange(40) % 4),
+        fc.stats.batch_network_features(precisions, labels=np.arange(40) % 4),
+    ):
+        xr.testing.assert_identical(features, expected)
+    module = importlib.import_module("functional_connectivity.stats.network_features")
+    assert fc.stats.network_features is module
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from functional_connectivity.stats.surrogates import (
+    NullDistribution,
+    correlation,
+    surrogate_test,
+)
+
+
+@pytest.fixture
+def counts():
+    """Five neurons; neurons 0 and 1 share their input."""
+    rng = np.random.default_rng(0)
+    X = rng.poisson(2.0, size=(5, 400)).astype(np.float64)
+    X[1] += X[0]
+    return xr.DataArray(X, dims=("neuron", "time"))
+
+
+def test_correlation_matches_corrcoef(counts):
+    np.testing.assert_allclose(correlation(counts.values), np.corrcoef(counts.values))
+    X = counts.values.copy()
+    X[2] = 1.0
+    assert np.all(correlation(X)[2] == 0)
+
+
+def test_null_distribution_merge():
+    rng = np.random.default_rng(0)
+    observed = rng.standard_normal(10)
+    nulls = rng.standard_normal((30, 10))
+    full = NullDistribution(observed)
+    for null in nulls:
+        full.update(null)
+    merged = NullDistribution(observed)
+    for part in (nulls[:12], nulls[12:]):
+        partial = NullDistribution(observed)
+        for null in part:
+            partial.update(null)
+        merged += partial
+    np.testing.assert_array_equal(merged.exceed, full.exceed)
+    np.testing.assert_allclose(merged.std, nulls.std(axis=0))
+    expected = (1 + (np.abs(nulls) >= np.abs(observed)).sum(axis=0)) / 31
+    np.testing.assert_allclose(merged.p_values, expected)
+    fwer = (1 + (np.abs(nulls).max(axis=1)[:, None] >= np.abs(observed)).sum(0)) / 31
+    np.testing.assert_allclose(merged.p_values_fwer, fwer)
+
+
+@pytest.mark.parametrize("method", ["circular", "shuffle"])
+def test_surrogate_test_detects_coupling(counts, method):
+    null = surrogate_test(
+        counts, n_surrogates=200, method=method, seed=1, backend="threads"
+    )
+    assert null.n == 200
+    assert null.p_values[0, 1] == 1 / 201
+    assert null.p_values_fwer[0, 1] == 1 / 201
+    uncoupled = np.triu(np.ones((5, 5), dtype=bool), 1)
+    uncoupled[0, 1] = False
+    assert np.all(null.p_values_fwer[uncoupled] > 0.05)
+
+
+def test_surrogate_test_is_deterministic(counts):
+    kwargs = {"n_surrogates": 60, "seed": 7, "batch_size": 8}
+    threads = surrogate_test(counts, backend="threads", max_workers=3, **kwargs)
+    loky = surrogate_test(counts, backend="loky", max_workers=2, **kwargs)
+    np.testing.assert_array_equal(threads.exceed, loky.exceed)
+    np.testing.assert_allclose(threads.mean, loky.mean)
+    assert sorted(threads.maxima) == sorted(loky.maxima)
+    assert surrogate_test(counts, n_surrogates=5, backend="threads").seed is not None
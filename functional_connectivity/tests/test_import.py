@@ -0,0 +1,46 @@
+import re
+import subprocess
+import sys
+
+import pytest
+
+import functional_connectivity as fc
+
+HEAVY = ["dandi", "h5py", "loky", "networkx", "numba", "pynwb", "requests", "xarray"]
+
+# Generous budget, in microseconds, for ``import functional_connectivity``.
+IMPORT_TIME_BUDGET = 200_000
+
+
+def _run(code):
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _imported(code):
+    out = _run(f"import sys; {code}; print(' '.join(sys.modules))").stdout
+    return set(out.split())
+
+
+def test_import_is_light():
+    assert not _imported("import functional_connectivity") & set(HEAVY)
+
+
+def test_import_time():
+    stderr = _run("import functional_connectivity").stderr
+    cumulative = re.search(r"\|\s*(\d+) \| functional_connectivity$", stderr, re.M)
+    assert int(cumulative.group(1)) < IMPORT_TIME_BUDGET
+
+
+def test_generators_do_not_load_backends():
+    modules = _imported("import functional_connectivity as fc; fc.GraphicalGenerator")
+    assert not modules & set(HEAVY)
+
+
+@pytest.mark.parametrize("name", sorted(fc._attr_to_submodule))
+def test_lazy_attributes_resolve(name):
+    assert getattr(fc, name) is getattr(getattr(fc, fc._attr_to_submodule[name]), name)
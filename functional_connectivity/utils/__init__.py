@@ -1 +1,35 @@
-from .utils import *
+import importlib as _importlib
+
+_lazy_attrs = {
+    "binning": ["bin_ragged", "bin_ragged_slabs", "iter_ragged_slabs", "to_ragged"],
+    "linalg": ["SparseCholesky"],
+    "profiling": ["Profiler"],
+    "pyramid": ["SpikeCountPyramid"],
+    "timeline": ["EpochTimeline"],
+    "utils": [
+        "sizeof_fmt",
+        "sum_chunk",
+        "sum_segments",
+        "sum_spike_count",
+        "sum_spike_count_by_behavior",
+        "warmup_kernels",
+    ],
+}
+_attr_to_module = {
+    attr: module for module, attrs in _lazy_attrs.items() for attr in attrs
+}
+__all__ = list(_attr_to_module)
+
+
+def __dir__():
+    return __all__ + list(_lazy_attrs)
+
+
+def __getattr__(name):
+    if name in _lazy_attrs:
+        return _importlib.import_module(f".{name}", __name__)
+    elif name in _attr_to_module:
+        module = _importlib.import_module(f".{_attr_to_module[name]}", __name__)
+        value = globals()[name] = getattr(module, name)
+        return value
+    raise AttributeError(f"Module {__name__!r} has no attribute {name!r}")
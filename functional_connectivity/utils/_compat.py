@@ -0,0 +1,27 @@
+"""Optional numba support.
+
+Kernels are decorated with :func:`njit` and loop with :data:`prange`. With
+numba installed they are JIT-compiled on first call and cached on disk, so new
+processes load the machine code instead of recompiling it. Without numba the
+decorator is a no-op, and callers should dispatch to a NumPy implementation
+when :data:`HAS_NUMBA` is False.
+"""
+
+try:
+    import numba as nb
+except ImportError:
+    nb = None
+
+HAS_NUMBA = nb is not None
+
+if HAS_NUMBA:
+    prange = nb.prange
+
+    def njit(**kwargs):
+        return nb.njit(cache=True, **kwargs)
+
+else:
+    prange = range
+
+    def njit(**kwargs):
+        return lambda func: func
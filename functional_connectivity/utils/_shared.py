@@ -0,0 +1,25 @@
+"""Arrays shared with worker processes through memory-mapped files.
+
+A parent process writes an array to a file in :func:`shared_dir` and sends
+workers its ``(path, shape, dtype)``, which they map with :func:`open_shared`
+instead of receiving a pickled copy. Thread workers are sent the array itself.
+"""
+
+import os
+
+import numpy as np
+
+
+def shared_dir():
+    """Directory of the shared files: ``/dev/shm`` (in memory) when it exists,
+    otherwise the default temporary directory."""
+    return "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def open_shared(buffer, mode="r"):
+    """The array of ``buffer``, an array or the ``(path, shape, dtype)`` of a
+    shared file, mapped with ``mode``."""
+    if isinstance(buffer, np.ndarray):
+        return buffer
+    path, shape, dtype = buffer
+    return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+#
+# functional-connectivity -- Sensing functional connectivity in the brain, in Python
+#
+# Copyright (C) 2023-2024 Tzu-Chi Yen <tzuchi.yen@colorado.edu>
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the Free
+# Software Foundation; either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public License for more
+# details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+import numpy as np
+import scipy.sparse as spr
+
+from . import _compat
+from ._compat import njit, prange
+
+
+def to_ragged(spike_trains):
+    """Concatenate a sequence of spike trains into a ragged array.
+
+    Args:
+        spike_trains (iterable): One 1-D array of spike times per unit.
+
+    Returns:
+        values (np.ndarray): All spike times, unit after unit, each unit sorted.
+        offsets (np.ndarray): Array of length ``n_units + 1``; the spikes of unit
+            ``i`` are ``values[offsets[i]:offsets[i + 1]]``.
+    """
+    trains = [np.asarray(t, dtype=np.float64).ravel() for t in spike_trains]
+    offsets = np.zeros(len(trains) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in trains], out=offsets[1:])
+    if len(trains) == 0:
+        return np.zeros(0, dtype=np.float64), offsets
+    values = np.concatenate(trains)
+    _sort_ragged(values, offsets)
+    return values, offsets
+
+
+def _sort_ragged(values, offsets):
+    """Sort each unit of a ragged array in place, skipping units already sorted."""
+    for i in range(len(offsets) - 1):
+        seg = values[offsets[i] : offsets[i + 1]]
+        if seg.size > 1 and np.any(seg[1:] < seg[:-1]):
+            seg.sort()
+
+
+@njit(parallel=True)
+def _bin_ragged(values, offsets, starts, stops, order):
+    n_units = offsets.shape[0] - 1
+    n_bins = starts.shape[0]
+    container = np.zeros((n_units, n_bins), dtype=np.float64)
+    for i in prange(n_units):
+        lo = offsets[i]
+        hi = offsets[i + 1]
+        k = lo
+        for jj in range(n_bins):
+            j = order[jj]
+            while k < hi and values[k] < starts[j]:
+                k += 1
+            m = k
+            while m < hi and values[m] < stops[j]:
+                m += 1
+            container[i, j] = m - k
+    return container
+
+
+def _bin_ragged_numpy(values, offsets, starts, stops, order):
+    container = np.zeros((len(offsets) - 1, len(starts)), dtype=np.float64)
+    for i in range(len(offsets) - 1):
+        spikes = values[offsets[i] : offsets[i + 1]]
+        container[i] = np.searchsorted(spikes, stops) - np.searchsorted(spikes, starts)
+    # Bins with stop < start are empty, as in the numba kernel.
+    np.maximum(container, 0, out=container)
+    return container
+
+
+def _count_dtype(max_count):
+    """Smallest unsigned integer type holding counts up to ``max_count``."""
+    return np.min_scalar_type(max(int(max_count), 0))
+
+
+def _sparse_counts(values, offsets, starts, stops, order):
+    """Row, column and count of the non-empty bins of each unit.
+
+    Each spike is mapped to its bin by a binary search over the sorted starts,
+    which needs the bins not to overlap. Within a unit, spikes are sorted, so
+    the spikes of a bin are consecutive and counted by run-length encoding.
+    """
+    sorted_starts, sorted_stops = starts[order], stops[order]
+    if np.any(sorted_stops[:-1] > sorted_starts[1:]):
+        raise ValueError("Sparse binning needs intervals that do not overlap.")
+    k = np.searchsorted(sorted_starts, values, side="right") - 1
+    unit = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    valid = k >= 0
+    valid[valid] = values[valid] < sorted_stops[k[valid]]
+    key = unit[valid] * len(starts) + k[valid]
+    first = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if key.size else key
+    counts = np.diff(np.r_[first, key.size])
+    key = key[first]
+    return key // len(starts), order[key % len(starts)], counts
+
+
+def bin_ragged(values, offsets, intervals, sparse=False):
+    """Count the spikes of every unit falling in every half-open interval.
+
+    Both the spikes of each unit and the interval edges are walked in sorted
+    order, so a unit costs O(spikes + bins) instead of O(spikes * bins). Units
+    are processed in parallel.
+
+    With ``sparse=True`` only the non-empty bins are stored, which at fine
+    bins is a small fraction of the matrix: each spike is assigned to its bin
+    with a binary search, in O(spikes log bins), and the counts are kept in the
+    smallest unsigned integer type that holds them.
+
+    Args:
+        values (np.ndarray): Flat spike times, sorted within each unit
+            (see :func:`to_ragged`).
+        offsets (np.ndarray): Unit boundaries into ``values``.
+        intervals (np.ndarray): Array of shape ``(n_bins, 2)`` holding the
+            ``[start, stop)`` of each bin, in any order. They must not overlap
+            if ``sparse``.
+        sparse (boolean): Whether to return a sparse matrix.
+
+    Returns:
+        container (np.ndarray or spr.csr_matrix): Spike counts of shape
+            ``(n_units, n_bins)``.
+    """
+    intervals = np.asarray(intervals, dtype=np.float64)
+    starts = np.ascontiguousarray(intervals[:, 0])
+    stops = np.ascontiguousarray(intervals[:, 1])
+    order = np.argsort(starts, kind="stable")
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    offsets = np.ascontiguousarray(offsets, dtype=np.int64)
+    if sparse:
+        rows, cols, counts = _sparse_counts(values, offsets, starts, stops, order)
+        return _to_csr(rows, cols, counts, (len(offsets) - 1, len(starts)))
+    kernel = _bin_ragged if _compat.HAS_NUMBA else _bin_ragged_numpy
+    return kernel(values, offsets, starts, stops, order)
+
+
+def _to_csr(rows, cols, counts, shape):
+    """Sum the ``counts`` at ``(rows, cols)`` into a compact CSR matrix."""
+    container = spr.csr_matrix((counts.astype(np.int64), (rows, cols)), shape=shape)
+    container.sum_duplicates()
+    return container.astype(_count_dtype(container.max() if container.nnz else 0))
+
+
+def iter_ragged_slabs(values, index, slab_size=2**22):
+    """Read a ragged dataset in slabs of at most ``slab_size`` values.
+
+    This is the on-disk layout of indexed columns in NWB (e.g.
+    ``units/spike_times`` and ``units/spike_times_index``), so ``values`` can be
+    an ``h5py.Dataset`` that is never read in full.
+
+    Args:
+        values (array-like): Flat values of all units, sliceable.
+        index (array-like): End offset of each unit into ``values``.
+        slab_size (int): Maximum number of values read at once.
+
+    Yields:
+        first_unit (int): Index of the first unit touched by the slab.
+        slab (np.ndarray): The slab, sorted within each unit.
+        offsets (np.ndarray): Unit boundaries into ``slab``, starting from
+            ``first_unit``; a unit spanning several slabs appears in each.
+    """
+    ends = np.asarray(index[:], dtype=np.int64)
+    starts = np.concatenate([[0], ends[:-1]])
+    total = int(ends[-1]) if len(ends) else 0
+    for a in range(0, total, slab_size):
+        b = min(a + slab_size, total)
+        u0 = np.searchsorted(ends, a, side="right")
+        u1 = np.searchsorted(starts, b, side="left")
+        offsets = np.zeros(u1 - u0 + 1, dtype=np.int64)
+        offsets[1:] = np.clip(ends[u0:u1], a, b) - a
+        slab = np.asarray(values[a:b], dtype=np.float64)
+        _sort_ragged(slab, offsets)
+        yield u0, slab, offsets
+
+
+def bin_ragged_slabs(values, index, intervals, slab_size=2**22, sparse=False):
+    """Streaming version of :func:`bin_ragged` over a ragged dataset.
+
+    Counts are accumulated slab by slab into a preallocated matrix, so peak
+    memory is set by ``slab_size`` and the size of the output, not by the
+    number of spikes.
+
+    Args:
+        values (array-like): Flat values of all units, sliceable.
+        index (array-like): End offset of each unit into ``values``.
+        intervals (np.ndarray): Array of shape ``(n_bins, 2)`` of ``[start, stop)``.
+        slab_size (int): Maximum number of values read at once.
+        sparse (boolean): Whether to return a sparse matrix, see
+            :func:`bin_ragged`.
+
+    Returns:
+        container (np.ndarray or spr.csr_matrix): Spike counts of shape
+            ``(n_units, n_bins)``.
+    """
+    intervals = np.asarray(intervals, dtype=np.float64)
+    shape = (len(index), len(intervals))
+    if sparse:
+        starts, stops = intervals[:, 0], intervals[:, 1]
+        order = np.argsort(starts, kind="stable")
+        empty = np.zeros(0, dtype=np.int64)
+        rows, cols, counts = [empty], [empty], [empty]
+        for u0, slab, offsets in iter_ragged_slabs(values, index, slab_size):
+            r, c, k = _sparse_counts(slab, offsets, starts, stops, order)
+            rows.append(r + u0)
+            cols.append(c)
+            counts.append(k)
+        # A unit spanning two slabs has its counts summed by _to_csr.
+        return _to_csr(*map(np.concatenate, (rows, cols, counts)), shape)
+    container = np.zeros(shape, dtype=np.float64)
+    for u0, slab, offsets in iter_ragged_slabs(values, index, slab_size):
+        container[u0 : u0 + len(offsets) - 1] += bin_ragged(slab, offsets, intervals)
+    return container
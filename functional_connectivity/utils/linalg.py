@@ -0,0 +1,79 @@
+try:
+    from sksparse.cholmod import cholesky as cholmod_cholesky
+except ImportError:
+    cholmod_cholesky = None
+
+import numpy as np
+import scipy.sparse as spr
+from scipy.sparse.linalg import splu
+
+
+class SparseCholesky:
+    """Fill-reducing sparse Cholesky factorization of a positive definite matrix.
+
+    The factorization is ``A[p][:, p] = R^T R`` with ``R`` upper triangular. It
+    uses CHOLMOD when ``scikit-sparse`` is installed, and otherwise SuperLU in
+    symmetric mode, where ``A[p][:, p] = L D L^T`` and ``R = D^(1/2) L^T``.
+
+    Args:
+        A (sparse matrix or np.ndarray): Symmetric positive definite matrix.
+    """
+
+    def __init__(self, A):
+        A = spr.csc_matrix(A, dtype=np.float64)
+        self.shape = A.shape
+        if cholmod_cholesky is not None:
+            self._factor = cholmod_cholesky(A)
+            self.perm = self._factor.P()
+            self._lu = None
+        else:
+            self._factor = None
+            self._lu = splu(
+                A,
+                permc_spec="MMD_AT_PLUS_A",
+                diag_pivot_thresh=0,
+                options={"SymmetricMode": True},
+            )
+            if not np.array_equal(self._lu.perm_r, self._lu.perm_c):
+                raise np.linalg.LinAlgError("Matrix is not symmetric.")
+            self.perm = np.argsort(self._lu.perm_c)
+            d = self._lu.U.diagonal()
+            if np.any(d <= 0):
+                raise np.linalg.LinAlgError("Matrix is not positive definite.")
+            # R^T = L D^(1/2)
+            self._Rt = (self._lu.L @ spr.diags(np.sqrt(d))).tocsr()
+
+    def __repr__(self):
+        backend = "cholmod" if self._factor is not None else "superlu"
+        return f"SparseCholesky(shape={self.shape}, backend={backend!r})"
+
+    def solve(self, b):
+        """Solve ``A x = b``, for ``b`` of shape ``(n,)`` or ``(n, k)``."""
+        if self._factor is not None:
+            return self._factor(b)
+        return self._lu.solve(np.asarray(b, dtype=np.float64))
+
+    def sample(self, n_samples=1, rng=None):
+        """Draw zero-mean Gaussian samples whose covariance is ``A^-1``.
+
+        Each sample is ``R^-1 z`` (mapped back through ``p``) for a standard
+        normal ``z``, so the covariance matrix is never formed.
+
+        Args:
+            n_samples (int): Number of samples.
+            rng (np.random.Generator): Source of randomness. Defaults to the
+                global ``np.random`` state.
+
+        Returns:
+            samples (np.ndarray): Array of shape ``(n, n_samples)``.
+        """
+        rng = np.random if rng is None else rng
+        z = rng.standard_normal((self.shape[0], n_samples))
+        if self._factor is not None:
+            x = np.empty_like(z)
+            x[self.perm] = self._factor.solve_Lt(z, use_LDLt_decomposition=False)
+            return x
+        # R^-1 z = A_p^-1 R^T z, with A_p = A[p][:, p].
+        w = np.empty_like(z)
+        w[self.perm] = self._Rt @ z
+        return self._lu.solve(w)
@@ -0,0 +1,97 @@
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import contextlib
+import sys
+import time
+
+import pandas as pd
+
+
+def _bytes_read():
+    """Bytes read by the process so far (files and sockets), or None."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _peak_rss():
+    """Peak resident set size of the process so far, in bytes, or None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Profiler:
+    """Named spans around the stages of a pipeline.
+
+    Each span records its wall time, the bytes the process read meanwhile
+    (from ``/proc/self/io``, so remote reads through sockets count too) and the
+    peak resident set size of the process at its end. Measures that the
+    platform does not provide are None.
+
+    Args:
+        hook (callable): Opt-in hook for external profilers. Called with the
+            name of each span, it returns a context manager entered around the
+            span, e.g. ``lambda name: nvtx.annotate(name)`` or
+            ``lambda name: viztracer.get_tracer().log_event(name)``.
+        enabled (boolean): Whether spans are recorded.
+    """
+
+    def __init__(self, hook=None, enabled=True):
+        self.hook = hook
+        self.enabled = enabled
+        self.spans = []
+
+    def __repr__(self):
+        return f"Profiler({len(self.spans)} spans)"
+
+    @contextlib.contextmanager
+    def span(self, name, **info):
+        """Record the enclosed block as the span ``name``.
+
+        Args:
+            name (str): Name of the stage.
+            **info: Extra columns of the span in :meth:`report`.
+        """
+        if not self.enabled:
+            yield
+            return
+        hook = self.hook(name) if self.hook is not None else contextlib.nullcontext()
+        bytes_before = _bytes_read()
+        start = time.perf_counter()
+        try:
+            with hook:
+                yield
+        finally:
+            wall_time = time.perf_counter() - start
+            bytes_after = _bytes_read()
+            self.spans.append(
+                {
+                    "stage": name,
+                    "wall_time": wall_time,
+                    "bytes_read": (
+                        None if bytes_before is None else bytes_after - bytes_before
+                    ),
+                    "peak_rss": _peak_rss(),
+                    **info,
+                }
+            )
+
+    def report(self):
+        """The spans in the order they ended, as a ``pd.DataFrame``."""
+        columns = ["stage", "wall_time", "bytes_read", "peak_rss"]
+        extra = {key for span in self.spans for key in span} - set(columns)
+        return pd.DataFrame(self.spans, columns=columns + sorted(extra))
+
+    def reset(self):
+        self.spans = []
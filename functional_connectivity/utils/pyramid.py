@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from .utils import sum_segments
+
+
+def _factor(coarse, fine):
+    """Integer ratio ``coarse / fine``, or None if it is not an integer."""
+    factor = round(coarse / fine)
+    if factor >= 1 and np.isclose(factor * fine, coarse):
+        return factor
+    return None
+
+
+class SpikeCountPyramid:
+    """Spike counts at several resolutions, binned once at the finest.
+
+    A coarser level sums consecutive bins of a finer one within each behavior
+    epoch, the way :func:`sum_chunk` sums chunks of columns, so that no bin
+    straddles two epochs. Since the bins of an epoch start at its start time, a
+    level of width ``f * time_to_bin`` has the same bins as
+    :meth:`DandiHandler.get_spike_counts` at that width. Levels are derived on
+    first access, from the coarsest materialized level whose width divides
+    theirs, and kept in :attr:`levels`.
+
+    Args:
+        data_array (xr.DataArray): Spike counts at the finest resolution,
+            e.g. from :meth:`DandiHandler.get_spike_counts`.
+        time_to_bin (double): Width of the bins of ``data_array``.
+        epoch_sizes (array-like): Number of bins of each epoch, in order.
+            Defaults to a single epoch.
+        resolutions (list): Widths that will be requested, checked to be
+            multiples of ``time_to_bin`` but not materialized.
+        sample_dim (str): Dimension holding the time bins.
+    """
+
+    def __init__(
+        self,
+        data_array,
+        time_to_bin,
+        epoch_sizes=None,
+        resolutions=None,
+        sample_dim="time",
+    ):
+        n = data_array.sizes[sample_dim]
+        if epoch_sizes is None:
+            epoch_sizes = [n]
+        self.epoch_sizes = np.asarray(epoch_sizes, dtype=np.int64)
+        if self.epoch_sizes.sum() != n:
+            raise ValueError(
+                f"The epochs have {self.epoch_sizes.sum()} bins, the data has {n}."
+            )
+        self.time_to_bin = time_to_bin
+        self.resolutions = sorted(resolutions or [time_to_bin])
+        for width in self.resolutions:
+            self._check(width)
+        self.sample_dim = sample_dim
+        self.levels = {time_to_bin: data_array}
+
+    def __repr__(self):
+        return f"SpikeCountPyramid(time_to_bin={self.time_to_bin}, levels={sorted(self.levels)})"
+
+    def __getitem__(self, time_to_bin):
+        return self.level(time_to_bin)
+
+    def _check(self, time_to_bin):
+        if _factor(time_to_bin, self.time_to_bin) is None:
+            raise ValueError(
+                f"Bins of {time_to_bin} are not a multiple of the finest bins, "
+                f"of {self.time_to_bin}."
+            )
+
+    def _sizes(self, time_to_bin):
+        """Number of bins of each epoch at the resolution ``time_to_bin``."""
+        factor = _factor(time_to_bin, self.time_to_bin)
+        return -(-self.epoch_sizes // factor)
+
+    def level(self, time_to_bin):
+        """Spike counts in bins of width ``time_to_bin``.
+
+        Args:
+            time_to_bin (double): A multiple of the finest width.
+
+        Returns:
+            data_array (xr.DataArray): Counts with the coordinates of the
+                finest level, the time bins widened and the per-bin labels
+                taken from the first bin of each group.
+        """
+        for width in self.levels:
+            if np.isclose(width, time_to_bin):
+                return self.levels[width]
+        self._check(time_to_bin)
+        source = max(w for w in self.levels if _factor(time_to_bin, w) is not None)
+        self.levels[time_to_bin] = self._reduce(source, time_to_bin)
+        return self.levels[time_to_bin]
+
+    def _reduce(self, source, time_to_bin):
+        factor = _factor(time_to_bin, source)
+        sizes = self._sizes(source)
+        offsets = np.cumsum(sizes) - sizes
+        local = np.arange(sizes.sum()) - np.repeat(offsets, sizes)
+        starts = np.flatnonzero(local % factor == 0)
+        stops = np.r_[starts[1:], sizes.sum()]
+
+        data = self.levels[source]
+        dims = data.dims
+        data = data.transpose(..., self.sample_dim)
+        values = data.data
+        if hasattr(values, "to_scipy_sparse"):
+            # Sparse counts, from ``get_spike_counts(sparse=True)``.
+            counts = sum_segments(values.to_scipy_sparse(), starts)
+            counts = type(values).from_scipy_sparse(counts)
+        else:
+            counts = sum_segments(values.reshape(-1, values.shape[-1]), starts)
+            counts = counts.reshape(*values.shape[:-1], len(starts))
+        coords = data.coords.to_dataset().isel({self.sample_dim: starts})
+        index = data.indexes.get(self.sample_dim)
+        if isinstance(index, pd.IntervalIndex):
+            coords = coords.assign_coords(
+                {
+                    self.sample_dim: pd.IntervalIndex.from_arrays(
+                        index.left[starts], index.right[stops - 1], closed=index.closed
+                    )
+                }
+            )
+        coarse = xr.DataArray(counts, coords=coords.coords, dims=data.dims)
+        return coarse.transpose(*dims)
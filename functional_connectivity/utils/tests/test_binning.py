@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from functional_connectivity.utils import _compat
+from functional_connectivity.utils.binning import (
+    bin_ragged,
+    bin_ragged_slabs,
+    to_ragged,
+)
+
+
+@pytest.fixture(params=[True, False], ids=["numba", "numpy"], autouse=True)
+def use_numba(request, monkeypatch):
+    monkeypatch.setattr(_compat, "HAS_NUMBA", request.param and _compat.HAS_NUMBA)
+
+
+def _brute_force(spike_trains, intervals):
+    container = np.zeros((len(spike_trains), len(intervals)), dtype=np.float64)
+    for i, spikes in enumerate(spike_trains):
+        for j, (start, stop) in enumerate(intervals):
+            container[i, j] = np.sum((start <= spikes) & (spikes < stop))
+    return container
+
+
+def test_to_ragged_sorts_each_unit():
+    values, offsets = to_ragged([np.array([3.0, 1.0, 2.0]), np.array([]), [5.0]])
+    assert offsets.tolist() == [0, 3, 3, 4]
+    assert values.tolist() == [1.0, 2.0, 3.0, 5.0]
+
+
+def test_bin_ragged_matches_brute_force():
+    rng = np.random.default_rng(0)
+    spike_trains = [np.sort(rng.uniform(0, 100, size=n)) for n in (0, 1, 50, 300)]
+    edges = np.arange(0, 101, 7.5)
+    intervals = np.stack([edges[:-1], np.minimum(edges[1:], 100)], axis=1)
+    intervals = np.concatenate([intervals[::2], intervals[1::2]])  # unsorted bins
+    values, offsets = to_ragged(spike_trains)
+    np.testing.assert_array_equal(
+        bin_ragged(values, offsets, intervals), _brute_force(spike_trains, intervals)
+    )
+
+
+def test_bin_ragged_spike_on_edges():
+    values, offsets = to_ragged([[0.0, 1.0, 2.0, 3.0]])
+    counts = bin_ragged(values, offsets, [[0.0, 1.0], [1.0, 3.0], [3.0, 3.0]])
+    assert counts.tolist() == [[1.0, 2.0, 0.0]]
+
+
+def test_bin_ragged_slabs_matches_in_memory():
+    rng = np.random.default_rng(1)
+    spike_trains = [np.sort(rng.uniform(0, 50, size=n)) for n in (10, 0, 0, 123, 7)]
+    intervals = np.stack([np.arange(0, 50, 5.0), np.arange(5, 55, 5.0)], axis=1)
+    values, offsets = to_ragged(spike_trains)
+    expected = bin_ragged(values, offsets, intervals)
+    for slab_size in (1, 6, 64, 10_000):
+        np.testing.assert_array_equal(
+            bin_ragged_slabs(values, offsets[1:], intervals, slab_size), expected
+        )
+
+
+def test_bin_ragged_sparse():
+    rng = np.random.default_rng(2)
+    spike_trains = [np.sort(rng.uniform(0, 50, size=n)) for n in (10, 0, 300, 7)]
+    starts = rng.permutation(np.arange(0, 50, 0.25))
+    intervals = np.stack([starts, starts + 0.25], axis=1)
+    values, offsets = to_ragged(spike_trains)
+    expected = bin_ragged(values, offsets, intervals)
+    counts = bin_ragged(values, offsets, intervals, sparse=True)
+    assert counts.dtype == np.uint8
+    np.testing.assert_array_equal(counts.toarray(), expected)
+    for slab_size in (1, 6, 10_000):
+        counts = bin_ragged_slabs(
+            values, offsets[1:], intervals, slab_size, sparse=True
+        )
+        np.testing.assert_array_equal(counts.toarray(), expected)
+    with pytest.raises(ValueError, match="overlap"):
+        bin_ragged(values, offsets, [[0.0, 2.0], [1.0, 3.0]], sparse=True)
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+import scipy.sparse as spr
+
+from functional_connectivity.utils.linalg import SparseCholesky
+
+
+def _precision(n=40, seed=0):
+    B = spr.random(n, n, 0.05, random_state=seed, format="csr")
+    return (B.T @ B + 0.5 * spr.eye(n)).tocsr()
+
+
+def test_solve():
+    A = _precision()
+    b = np.random.default_rng(0).normal(size=(40, 3))
+    np.testing.assert_allclose(
+        SparseCholesky(A).solve(b), np.linalg.solve(A.toarray(), b)
+    )
+
+
+def test_sample_covariance():
+    A = _precision(10, seed=1)
+    samples = SparseCholesky(A).sample(200_000, rng=np.random.default_rng(1))
+    np.testing.assert_allclose(
+        samples @ samples.T / 200_000, np.linalg.inv(A.toarray()), atol=0.05
+    )
+
+
+def test_not_positive_definite():
+    with pytest.raises(np.linalg.LinAlgError):
+        SparseCholesky(spr.diags([1.0, -1.0, 2.0]))
@@ -0,0 +1,47 @@
+import contextlib
+import time
+
+import pytest
+
+from functional_connectivity.utils.profiling import Profiler
+
+
+def test_spans_and_report():
+    profiler = Profiler()
+    with profiler.span("load"):
+        time.sleep(0.01)
+    with pytest.raises(RuntimeError):
+        with profiler.span("bin", stream=True):
+            raise RuntimeError
+    report = profiler.report()
+    assert report["stage"].tolist() == ["load", "bin"]
+    assert list(report.columns) == [
+        "stage",
+        "wall_time",
+        "bytes_read",
+        "peak_rss",
+        "stream",
+    ]
+    assert report["wall_time"][0] >= 0.01
+    assert (report["peak_rss"] > 0).all()
+
+
+def test_hook_and_disabled():
+    events = []
+
+    @contextlib.contextmanager
+    def hook(name):
+        events.append(f"enter {name}")
+        yield
+        events.append(f"exit {name}")
+
+    profiler = Profiler(hook=hook)
+    with profiler.span("read"):
+        events.append("body")
+    assert events == ["enter read", "body", "exit read"]
+
+    profiler = Profiler(hook=hook, enabled=False)
+    with profiler.span("read"):
+        pass
+    assert profiler.report().empty
+    assert len(events) == 3
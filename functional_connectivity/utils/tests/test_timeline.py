@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from functional_connectivity.utils.timeline import EpochTimeline
+
+
+def _reference(behaviors, time_to_bin):
+    """The per-bin loop previously used by ``DandiHandler.get_spike_counts``."""
+    intervals, labels = [], []
+    for start, stop, label in behaviors.itertuples(index=False):
+        for j in range(int((stop - start) // time_to_bin) + 1):
+            labels.append(label)
+            intervals.append(
+                (start + j * time_to_bin, min(start + (j + 1) * time_to_bin, stop))
+            )
+    return np.array(intervals), np.array(labels, dtype="S16")
+
+
+@pytest.fixture
+def behaviors():
+    return pd.DataFrame(
+        {
+            "start_time": [0.0, 20.0, 35.0, 41.3],
+            "stop_time": [20.0, 35.0, 41.3, 60.0],
+            "label": ["sleep", "wake", "sleep", "rem"],
+        }
+    )
+
+
+@pytest.mark.parametrize("time_to_bin", [0.5, 3.0, 100.0])
+def test_matches_loop(behaviors, time_to_bin):
+    timeline = EpochTimeline.from_behaviors(behaviors, time_to_bin)
+    intervals, labels = _reference(behaviors, time_to_bin)
+    np.testing.assert_array_equal(timeline.intervals, intervals)
+    np.testing.assert_array_equal(timeline.labels(dtype="S16"), labels)
+    assert timeline.epoch_sizes.sum() == len(timeline)
+
+
+def test_queries(behaviors):
+    timeline = EpochTimeline.from_behaviors(behaviors, 1.0)
+    window = timeline.bins(10.5, 21.0)
+    assert timeline.left[window][0] == 10.0
+    assert timeline.right[window][-1] == 21.0
+    assert list(timeline.labels_between(19.0, 36.0)) == ["sleep", "wake"]
+    bins = timeline.label_bins("wake")
+    assert len(bins) == 16
+    assert (timeline.labels()[bins] == "wake").all()
+    assert np.all(np.diff(bins) > 0)
+    assert len(timeline.label_bins("awake")) == 0
+
+
+def test_unsorted_epochs(behaviors):
+    unsorted = behaviors.iloc[[2, 0, 3, 1]]
+    timeline = EpochTimeline.from_behaviors(unsorted, 1.0)
+    intervals, labels = _reference(unsorted, 1.0)
+    # The bins stay in table order.
+    np.testing.assert_array_equal(timeline.intervals, intervals)
+    np.testing.assert_array_equal(timeline.labels(dtype="S16"), labels)
+
+    # Queries match those of the sorted table.
+    expected = EpochTimeline.from_behaviors(behaviors, 1.0)
+    np.testing.assert_array_equal(
+        timeline.intervals[timeline.bins(10.5, 21.0)],
+        expected.intervals[expected.bins(10.5, 21.0)],
+    )
+    np.testing.assert_array_equal(timeline.epochs_between(19.0, 36.0), [1, 3, 0])
+    assert list(timeline.labels_between(19.0, 36.0)) == ["sleep", "wake"]
+    bins = timeline.label_bins("sleep")
+    assert (timeline.labels()[bins] == "sleep").all()
+    assert np.all(np.diff(timeline.left[bins]) > 0)
+
+
+def test_overlapping_epochs():
+    behaviors = pd.DataFrame(
+        {
+            "start_time": [5.0, 0.0],
+            "stop_time": [15.0, 10.0],
+            "label": ["b", "a"],
+        }
+    )
+    timeline = EpochTimeline.from_behaviors(behaviors, 2.0)
+    intervals, labels = _reference(behaviors, 2.0)
+    np.testing.assert_array_equal(timeline.intervals, intervals)
+    np.testing.assert_array_equal(timeline.labels(dtype="S16"), labels)
+    for query in (timeline.bins, timeline.epochs_between):
+        with pytest.raises(ValueError, match="overlap"):
+            query(0.0, 1.0)
+    with pytest.raises(ValueError, match="overlap"):
+        timeline.label_bins("a")
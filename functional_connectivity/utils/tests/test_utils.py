@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from functional_connectivity.utils import _compat
+from functional_connectivity.utils.utils import (
+    sum_chunk,
+    sum_segments,
+    sum_spike_count,
+    sum_spike_count_by_behavior,
+    warmup_kernels,
+)
+
+
+def _units(seed=0):
+    rng = np.random.default_rng(seed)
+    trains = [np.sort(rng.uniform(0, 60, size=n)) for n in (5, 40, 200)]
+    return pd.DataFrame({"spike_times": trains})
+
+
+def _states():
+    return pd.DataFrame(
+        {
+            "start_time": [0.0, 20.0, 35.0],
+            "stop_time": [20.0, 35.0, 60.0],
+            "label": ["sleep", "wake", "sleep"],
+        }
+    )
+
+
+def test_sum_spike_count_counts():
+    df = _units()
+    counts = sum_spike_count(df, 6, log=False, mean=False)
+    t_max = max(t[-1] for t in df["spike_times"])
+    diff = t_max / 6
+    for i, spikes in enumerate(df["spike_times"]):
+        for j in range(6):
+            expected = np.sum((diff * j <= spikes) & (spikes < diff * (j + 1)))
+            assert counts[i, j] == expected
+    rates = sum_spike_count(df, 6, log=False, mean=True)
+    np.testing.assert_allclose(rates, counts / diff)
+
+
+def test_sum_spike_count_by_behavior_masks_and_normalizes():
+    df, states = _units(), _states()
+    counts = sum_spike_count_by_behavior(
+        df, 3, "wake", log=False, mean=False, states=states
+    )
+    t_max = max(t[-1] for t in df["spike_times"])
+    edges = np.linspace(0, t_max, 4)
+    for i, spikes in enumerate(df["spike_times"]):
+        awake = spikes[(20.0 <= spikes) & (spikes < 35.0)]
+        np.testing.assert_array_equal(counts[i], np.histogram(awake, edges)[0])
+
+    rates = sum_spike_count_by_behavior(df, 3, "wake", False, True, states=states)
+    exposure = np.clip(
+        np.minimum(edges[1:], 35.0) - np.maximum(edges[:-1], 20.0), 0, None
+    )
+    expected = np.divide(counts, exposure, out=counts.copy(), where=exposure > 0)
+    np.testing.assert_allclose(rates, expected)
+
+    both = sum_spike_count_by_behavior(
+        df, 3, ["sleep", "wake"], log=False, mean=False, states=states
+    )
+    np.testing.assert_array_equal(both, sum_spike_count(df, 3, log=False, mean=False))
+    with pytest.raises(ValueError, match="states"):
+        sum_spike_count_by_behavior(df, 3, "wake")
+
+
+@pytest.mark.parametrize("use_numba", [True, False], ids=["numba", "numpy"])
+def test_sum_chunk(monkeypatch, use_numba):
+    monkeypatch.setattr(_compat, "HAS_NUMBA", use_numba and _compat.HAS_NUMBA)
+    warmup_kernels()
+    arr = np.arange(22, dtype=np.float64).reshape(2, 11)
+    expected = [[6.0, 22.0], [50.0, 66.0]]
+    np.testing.assert_array_equal(sum_chunk(arr, 4), expected)
+
+
+def test_sum_segments():
+    arr = np.arange(22, dtype=np.float64).reshape(2, 11)
+    np.testing.assert_array_equal(
+        sum_segments(arr, [0, 4, 5]), [[6.0, 4.0, 45.0], [50.0, 15.0, 111.0]]
+    )
+    np.testing.assert_array_equal(
+        sum_segments(arr, [0, 4])[:, :1], sum_chunk(arr, 4)[:, :1]
+    )
+    assert sum_segments(arr, []).shape == (2, 0)
+
+
+def test_sum_chunk_sparse():
+    arr = np.random.default_rng(0).poisson(0.2, size=(3, 23)).astype(np.uint8)
+    counts = sum_chunk(sparse.csr_matrix(arr), 4)
+    assert sparse.issparse(counts) and counts.dtype == np.uint8
+    np.testing.assert_array_equal(counts.toarray(), sum_chunk(arr.astype(float), 4))
+    counts = sum_segments(sparse.csr_matrix(arr), [0, 3, 10])
+    np.testing.assert_array_equal(counts.toarray(), sum_segments(arr, [0, 3, 10]))
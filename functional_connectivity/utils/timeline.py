@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+
+class EpochTimeline:
+    """Time bins of behavior epochs, built and queried with array operations.
+
+    Every epoch ``[start, stop)`` is cut into bins of width ``time_to_bin``
+    from its start, the last one ending at ``stop`` (and empty when the width
+    divides the epoch), as :meth:`DandiHandler.get_spike_counts` bins them.
+    The bins follow the order of the epochs, which may be unsorted and may
+    overlap. A sorted index of the epochs locates a time range or a label by
+    binary search; those queries need disjoint epochs. Labels are kept as
+    categorical codes into :attr:`categories`.
+
+    Args:
+        starts (array-like): Start time of each epoch.
+        stops (array-like): Stop time of each epoch.
+        labels (array-like): Label of each epoch.
+        time_to_bin (double): Width of the bins.
+    """
+
+    def __init__(self, starts, stops, labels, time_to_bin):
+        starts = np.asarray(starts, dtype=np.float64)
+        stops = np.asarray(stops, dtype=np.float64)
+        self.starts, self.stops = starts, stops
+        codes, categories = pd.factorize(np.asarray(labels))
+        self.epoch_codes = codes
+        self.categories = pd.Index(categories)
+        self.time_to_bin = time_to_bin
+
+        self.epoch_sizes = ((self.stops - self.starts) // time_to_bin).astype(
+            np.int64
+        ) + 1
+        self.offsets = np.zeros(len(self.epoch_sizes) + 1, dtype=np.int64)
+        np.cumsum(self.epoch_sizes, out=self.offsets[1:])
+        self.epochs = np.repeat(np.arange(len(self.starts)), self.epoch_sizes)
+        j = np.arange(self.offsets[-1]) - self.offsets[self.epochs]
+        start = self.starts[self.epochs]
+        self.left = start + j * time_to_bin
+        self.right = np.minimum(start + (j + 1) * time_to_bin, self.stops[self.epochs])
+        self.codes = self.epoch_codes[self.epochs]
+
+        # Epochs and bins in time order, for the queries.
+        self._order = np.argsort(starts, kind="stable")
+        self._sorted = bool(np.all(self._order == np.arange(len(starts))))
+        self._overlapping = bool(
+            np.any(stops[self._order][:-1] > starts[self._order][1:])
+        )
+        sizes = self.epoch_sizes[self._order]
+        shift = self.offsets[self._order] - (np.cumsum(sizes) - sizes)
+        self._bin_order = np.arange(len(self.left)) + np.repeat(shift, sizes)
+        # Bins grouped by label, in time order, for label queries.
+        self._by_code = self._bin_order[
+            np.argsort(self.codes[self._bin_order], kind="stable")
+        ]
+        self._code_bounds = np.searchsorted(
+            self.codes[self._by_code], np.arange(len(self.categories) + 1)
+        )
+
+    @classmethod
+    def from_behaviors(cls, behaviors, time_to_bin):
+        """Timeline of a behavior table with ``start_time``, ``stop_time`` and
+        ``label`` columns (see :meth:`DandiHandler.get_behavior_labels`)."""
+        return cls(
+            behaviors["start_time"].to_numpy(),
+            behaviors["stop_time"].to_numpy(),
+            behaviors["label"].to_numpy(),
+            time_to_bin,
+        )
+
+    @classmethod
+    def from_data_array(cls, data_array, time_to_bin, sample_dim="time"):
+        """Timeline of spike counts from :meth:`DandiHandler.get_spike_counts`,
+        rebuilt from their ``time`` bins and ``label`` coordinate (all labels
+        are empty without one), e.g. after a cache hit.
+
+        Epochs are delimited by the ``epoch`` coordinate when present.
+        Otherwise a new epoch starts after each bin narrower than
+        ``time_to_bin`` (every epoch ends with one), at each gap between bins
+        and at each change of label.
+
+        Raises:
+            ValueError: If the bins are not those of the rebuilt epochs.
+        """
+        index = data_array.indexes[sample_dim]
+        left, right = index.left.to_numpy(), index.right.to_numpy()
+        if "label" in data_array.coords:
+            labels = np.asarray(data_array["label"].values)
+        else:
+            labels = np.full(len(left), "")
+        if labels.dtype.kind == "S":
+            labels = labels.astype(str)
+        if "epoch" in data_array.coords:
+            epochs = np.asarray(data_array["epoch"].values)
+            new = epochs[1:] != epochs[:-1]
+        else:
+            short = right - left < time_to_bin * (1 - 1e-9)
+            new = short[:-1] | (left[1:] != right[:-1]) | (labels[1:] != labels[:-1])
+        first = np.flatnonzero(np.r_[True, new]) if len(left) else np.zeros(0, int)
+        last = np.r_[first[1:], len(left)] - 1
+        timeline = cls(left[first], right[last], labels[first], time_to_bin)
+        if not np.array_equal(timeline.intervals, np.column_stack([left, right])):
+            raise ValueError(
+                f"The time bins are not those of epochs binned by {time_to_bin}."
+            )
+        return timeline
+
+    def __repr__(self):
+        return (
+            f"EpochTimeline({len(self.starts)} epochs, {len(self)} bins, "
+            f"time_to_bin={self.time_to_bin})"
+        )
+
+    def __len__(self):
+        return len(self.left)
+
+    @property
+    def intervals(self):
+        """The ``[start, stop)`` of each bin, of shape ``(n_bins, 2)``."""
+        return np.column_stack([self.left, self.right])
+
+    @property
+    def index(self):
+        """The bins as a left-closed ``pd.IntervalIndex``."""
+        return pd.IntervalIndex.from_arrays(self.left, self.right, closed="left")
+
+    def labels(self, dtype=None):
+        """Label of each bin, optionally cast to ``dtype``."""
+        labels = np.asarray(self.categories)[self.codes]
+        return labels if dtype is None else labels.astype(dtype)
+
+    def _check_disjoint(self):
+        if self._overlapping:
+            raise ValueError(
+                "Behavior epochs overlap; time range and label queries need "
+                "disjoint epochs."
+            )
+
+    def _between(self, left, right, order, start, stop):
+        # Positions ``order[lo:hi]`` of the intervals overlapping the range,
+        # as a slice when the intervals are in time order.
+        self._check_disjoint()
+        lo = np.searchsorted(right[order], start, side="right")
+        hi = max(lo, np.searchsorted(left[order], stop, side="left"))
+        if self._sorted:
+            return slice(int(lo), int(hi))
+        return order[lo:hi]
+
+    def bins(self, start=-np.inf, stop=np.inf):
+        """Bins overlapping ``[start, stop)``, in O(log n_bins).
+
+        Empty bins count when they lie inside the range. The bins are a slice
+        when the epochs are in time order, otherwise an array of their indices
+        in time order.
+
+        Raises:
+            ValueError: If epochs overlap.
+        """
+        return self._between(self.left, self.right, self._bin_order, start, stop)
+
+    def epochs_between(self, start=-np.inf, stop=np.inf):
+        """Epochs overlapping ``[start, stop)``, in O(log n_epochs), as a slice
+        or an array of indices like :meth:`bins`.
+
+        Raises:
+            ValueError: If epochs overlap.
+        """
+        return self._between(self.starts, self.stops, self._order, start, stop)
+
+    def labels_between(self, start=-np.inf, stop=np.inf):
+        """Labels of the epochs overlapping ``[start, stop)``, in time order."""
+        codes = self.epoch_codes[self.epochs_between(start, stop)]
+        return np.asarray(self.categories)[pd.unique(codes)]
+
+    def label_bins(self, label):
+        """Indices of the bins of ``label``, in time order.
+
+        Raises:
+            ValueError: If epochs overlap.
+        """
+        self._check_disjoint()
+        code = self.categories.get_indexer([label])[0]
+        if code < 0:
+            return np.zeros(0, dtype=np.int64)
+        return self._by_code[self._code_bounds[code] : self._code_bounds[code + 1]]
@@ -16,66 +16,203 @@
 #
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
-import numba as nb
 import numpy as np
+import scipy.sparse as spr
 
+from . import _compat
+from ._compat import njit, prange
+from .binning import _to_csr, bin_ragged, to_ragged
 
-@nb.njit(parallel=True)
-def sum_chunk(arr, n_bins=4):
+
+@njit(parallel=True)
+def _sum_chunk(arr, n_bins=4):
     container = np.zeros((arr.shape[0], arr.shape[1] // n_bins), dtype=np.float64)
     n = container.shape[1]
-    for i in nb.prange(n):
+    for i in prange(n):
         for j in range(n_bins):
             container[:, i] += arr[:, i * n_bins + j]
     return container
 
 
-def sum_spike_count(df, n_chunks, log=True, mean=True):
-    _max = 0
-    for i in range(len(df)):
-        if df.iloc[i]["spike_times"][-1] > _max:
-            _max = df.iloc[i]["spike_times"][-1]
+def _sum_chunk_numpy(arr, n_bins=4):
+    n = arr.shape[1] // n_bins
+    chunks = arr[:, : n * n_bins].reshape(arr.shape[0], n, n_bins)
+    return chunks.sum(axis=2, dtype=np.float64)
 
-    diff = _max / n_chunks
-    container = np.zeros((len(df), n_chunks), dtype=np.float64)
-    n = container.shape[1]
-    for i in range(len(df)):
-        for j in range(n_chunks):
-            for spike in df.iloc[i]["spike_times"]:
-                if diff * j <= spike < diff * (j + 1):
-                    container[i, j] += 1
-    if log and mean:
-        container = np.log(container / diff)
-    if log and not mean:
-        container = np.log(container)
-    if not log and mean:
-        container = container / diff
-    return container
 
+def _sum_columns(arr, starts, stop):
+    """Sparse :func:`sum_segments` of the columns before ``stop``, as one product
+    with the 0/1 matrix mapping each column to its segment."""
+    arr = spr.csr_matrix(arr)
+    columns = np.arange(stop)
+    segments = np.searchsorted(starts, columns, side="right") - 1
+    integer = np.issubdtype(arr.dtype, np.integer)
+    dtype = np.int64 if integer else np.float64
+    indicator = spr.csr_matrix(
+        (np.ones(stop, dtype=dtype), (columns, segments)),
+        shape=(arr.shape[1], len(starts)),
+    )
+    product = (arr.astype(dtype) @ indicator).tocoo()
+    if integer and not (product.data < 0).any():
+        # Back to the smallest type holding the summed counts.
+        return _to_csr(product.row, product.col, product.data, product.shape)
+    return product.tocsr()
 
-def sum_spike_count_by_behavior(df, n_chunks, behavior, log=True, mean=True):
-    _max = 0
-    for i in range(len(df)):
-        if df.iloc[i]["spike_times"][-1] > _max:
-            _max = df.iloc[i]["spike_times"][-1]
 
-    diff = _max / n_chunks
-    container = np.zeros((len(df), n_chunks), dtype=np.float64)
-    n = container.shape[1]
-    for i in range(len(df)):
-        for j in range(n_chunks):
-            for spike in df.iloc[i]["spike_times"]:
-                if diff * j <= spike < diff * (j + 1):
-                    container[i, j] += 1
-    if log and mean:
-        container = np.log(container / diff)
-    if log and not mean:
-        container = np.log(container)
-    if not log and mean:
-        container = container / diff
+def sum_chunk(arr, n_bins=4):
+    """Sum every ``n_bins`` consecutive columns of ``arr``; leftovers are dropped.
+
+    A sparse ``arr``, such as the counts of ``get_spike_counts(sparse=True)``,
+    gives a sparse result without being densified.
+    """
+    if spr.issparse(arr):
+        n = arr.shape[1] // n_bins
+        return _sum_columns(arr, np.arange(0, n * n_bins, n_bins), n * n_bins)
+    if _compat.HAS_NUMBA:
+        return _sum_chunk(arr, n_bins)
+    return _sum_chunk_numpy(np.asarray(arr), n_bins)
+
+
+def sum_segments(arr, starts):
+    """Sum the columns of ``arr`` over segments of varying width.
+
+    The variable-width counterpart of :func:`sum_chunk`: segment ``i`` spans the
+    columns ``starts[i]`` to ``starts[i + 1]`` (or the last column), so chunks
+    can stop at epoch boundaries.
+
+    Args:
+        arr (np.ndarray or sparse matrix): Array of shape ``(n, m)``.
+        starts (np.ndarray): Increasing first column of each segment, from 0.
+
+    Returns:
+        container (np.ndarray or spr.csr_matrix): Array of shape
+            ``(n, len(starts))``, sparse if ``arr`` is.
+    """
+    if spr.issparse(arr):
+        if len(starts) == 0:
+            return spr.csr_matrix((arr.shape[0], 0), dtype=arr.dtype)
+        return _sum_columns(arr, np.asarray(starts, dtype=np.int64), arr.shape[1])
+    arr = np.asarray(arr)
+    if len(starts) == 0:
+        return np.zeros((arr.shape[0], 0), dtype=arr.dtype)
+    return np.add.reduceat(arr, starts, axis=1)
+
+
+def warmup_kernels():
+    """Compile, or load from the on-disk cache, the numba kernels of this package.
+
+    Call it once per process, e.g. as the ``initializer`` of a worker pool, so
+    that no worker pays the compilation cost in the middle of a task.
+    """
+    if not _compat.HAS_NUMBA:
+        return
+    sum_chunk(np.zeros((1, 2), dtype=np.float64), 2)
+    values, offsets = to_ragged([np.zeros(1)])
+    bin_ragged(values, offsets, np.zeros((1, 2), dtype=np.float64))
+
+
+def _fixed_width_counts(values, offsets, edges, keep=None):
+    n_units = len(offsets) - 1
+    n_chunks = len(edges) - 1
+    idx = np.searchsorted(edges, values, side="right") - 1
+    valid = (idx >= 0) & (idx < n_chunks)
+    if keep is not None:
+        valid &= keep
+    unit = np.repeat(np.arange(n_units), np.diff(offsets))
+    flat = unit[valid] * n_chunks + idx[valid]
+    container = np.bincount(flat, minlength=n_units * n_chunks).astype(np.float64)
+    return container.reshape(n_units, n_chunks)
+
+
+def _to_rate(container, exposure, log, mean):
+    if mean:
+        where = np.broadcast_to(exposure > 0, container.shape)
+        np.divide(container, exposure, out=container, where=where)
+    if log:
+        with np.errstate(divide="ignore"):
+            np.log(container, out=container)
     return container
 
 
+def _epoch_coverage(t, starts, stops):
+    """Total epoch duration before each time in ``t`` (epochs must not overlap)."""
+    lengths = stops - starts
+    cum = np.concatenate([[0.0], np.cumsum(lengths)])
+    k = np.searchsorted(starts, t, side="right") - 1
+    before = k < 0
+    k[before] = 0
+    coverage = cum[k] + np.clip(t - starts[k], 0, lengths[k])
+    coverage[before] = 0.0
+    return coverage
+
+
+def sum_spike_count(df, n_chunks, log=True, mean=True):
+    """Count the spikes of every unit in ``n_chunks`` equal-width time bins.
+
+    The bins span ``[0, t_max)``, where ``t_max`` is the latest spike across all
+    units.
+
+    Args:
+        df (pd.DataFrame): Units table with a ``spike_times`` column.
+        n_chunks (int): Number of bins.
+        log (boolean): Whether to take the log of the counts (or rates).
+        mean (boolean): Whether to divide the counts by the bin width.
+
+    Returns:
+        container (np.ndarray): Array of shape ``(n_units, n_chunks)``.
+    """
+    values, offsets = to_ragged(df["spike_times"].values)
+    diff = values.max() / n_chunks if values.size else 0.0
+    edges = diff * np.arange(n_chunks + 1)
+    container = _fixed_width_counts(values, offsets, edges)
+    return _to_rate(container, np.float64(diff), log, mean)
+
+
+def sum_spike_count_by_behavior(
+    df, n_chunks, behavior, log=True, mean=True, *, states=None
+):
+    """Like :func:`sum_spike_count`, keeping only spikes emitted during ``behavior``.
+
+    With ``mean=True`` the counts are divided by the time each bin spends in the
+    selected behavior, rather than by the full bin width.
+
+    Args:
+        df (pd.DataFrame): Units table with a ``spike_times`` column.
+        n_chunks (int): Number of bins.
+        behavior (str or list): Label(s) in ``states["label"]`` to keep.
+        log (boolean): Whether to take the log of the counts (or rates).
+        mean (boolean): Whether to divide the counts by the behavior time per bin.
+        states (pd.DataFrame): Behavior epochs, with ``start_time``, ``stop_time``
+            and ``label`` columns (see :meth:`DandiHandler.get_behavior_labels`).
+
+    Returns:
+        container (np.ndarray): Array of shape ``(n_units, n_chunks)``.
+    """
+    if states is None:
+        raise ValueError(
+            "Pass the behavior epochs as `states`, e.g. from "
+            "DandiHandler.get_behavior_labels()."
+        )
+    values, offsets = to_ragged(df["spike_times"].values)
+    selected = np.isin(states["label"].values, np.atleast_1d(behavior))
+    starts = states["start_time"].values[selected].astype(np.float64)
+    stops = states["stop_time"].values[selected].astype(np.float64)
+    order = np.argsort(starts)
+    starts, stops = starts[order], stops[order]
+
+    diff = values.max() / n_chunks if values.size else 0.0
+    edges = diff * np.arange(n_chunks + 1)
+    if len(starts) == 0:
+        container = np.zeros((len(offsets) - 1, n_chunks), dtype=np.float64)
+        return _to_rate(container, np.zeros(n_chunks), log, mean)
+
+    k = np.maximum(np.searchsorted(starts, values, side="right") - 1, 0)
+    keep = (starts[k] <= values) & (values < stops[k])
+    container = _fixed_width_counts(values, offsets, edges, keep)
+    exposure = np.diff(_epoch_coverage(edges, starts, stops))
+    return _to_rate(container, exposure, log, mean)
+
+
 def sizeof_fmt(num, suffix="B"):
     for unit in ("", "K", "M", "G", "T", "P", "E", "Z"):
         if abs(num) < 1024.0: